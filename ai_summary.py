@@ -0,0 +1,44 @@
+import streamlit as st
+from dataloader import llm
+
+
+def render_summary(system_prompt, user_content, key, button_label=None, model=llm.MODEL,
+                   temperature=llm.TEMPERATURE, cache=None):
+    """
+    显示 AI 总结：同样的输入在有效期内直接显示缓存的报告，点击“重新生成”才重新请求
+    :param key: 这份报告在页面上的唯一标识，用作按钮的 key
+    :param button_label: 设置后没有缓存时要点击按钮才生成，否则自动生成
+    :return: 报告文本，未生成时返回 None
+    """
+    messages = llm.build_messages(system_prompt, user_content)
+    digest = llm.fingerprint(messages, model, temperature)
+    cache = cache or llm.SummaryCache()
+    entry = cache.get(digest)
+
+    # 报告显示在按钮上方，按钮的状态要先读出来
+    report = st.container()
+    clicked = st.button("重新生成" if entry is not None or button_label is None else button_label,
+                        key=f"summary_{key}")
+    with report:
+        if entry is not None and not clicked:
+            st.markdown(entry["text"])
+            st.caption(f"缓存的报告，生成于 {entry['created_at']}")
+            return entry["text"]
+        if entry is None and button_label is not None and not clicked:
+            st.info("点击按钮 AI助力")
+            return None
+
+        api_key, base_url = llm.api_config()
+        if not api_key:
+            st.error(f"API 密钥未设置。请设置 {llm.API_KEY_ENV} 环境变量。")
+            return None
+
+        # 流式输出按时间或字数分批刷新，生成过程中末尾显示光标
+        message_placeholder = st.empty()
+        full_response = llm.render_stream(
+            llm.stream_chat(messages, model, temperature, api_key=api_key, base_url=base_url, name=key),
+            lambda text, done: message_placeholder.markdown(text if done else text + "▌"))
+
+    if full_response:
+        cache.put(digest, full_response, model=model, temperature=temperature)
+    return full_response
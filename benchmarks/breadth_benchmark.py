@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader.breadth import market_breadth
+
+# 市场宽度计算基准：原来的 groupby/transform 写法 对比 宽矩阵累加和写法
+# python benchmarks/breadth_benchmark.py --stocks 800 --years 5
+
+
+def make_panel(n_stocks=800, years=5, suspend_ratio=0.02, seed=0):
+    # 随机游走生成成份股长表，部分股票上市较晚，并随机剔除一些交易日模拟停牌
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=years * 244, name='日期')
+    frames = []
+    for i in range(n_stocks):
+        listed = dates[rng.integers(0, len(dates) // 3):] if i % 10 == 0 else dates
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(listed))))
+        keep = rng.random(len(listed)) >= suspend_ratio
+        frames.append(pd.DataFrame({'股票代码': f"{i:06d}", '收盘': close[keep]}, index=listed[keep]))
+    return pd.concat(frames).sort_index(kind='stable')
+
+
+def legacy_breadth(all_df, date):
+    # stockwidth.combined_plots 原来的计算方式
+    all_df = all_df.copy()
+    all_df['MA20'] = all_df.groupby('股票代码')['收盘'].transform(lambda x: x.rolling(window=20).mean())
+    all_df['MA50'] = all_df.groupby('股票代码')['收盘'].transform(lambda x: x.rolling(window=50).mean())
+    all_df['MA200'] = all_df.groupby('股票代码')['收盘'].transform(lambda x: x.rolling(window=200).mean())
+    all_df_filtered = all_df.loc[date:, :].reset_index()
+
+    def calculate_market_breadth(df, ma_column):
+        df['高于均线'] = df['收盘'] > df[ma_column]
+        return df.groupby('日期')['高于均线'].mean() * 100
+
+    return pd.DataFrame({
+        'MA20': calculate_market_breadth(all_df_filtered, 'MA20'),
+        'MA50': calculate_market_breadth(all_df_filtered, 'MA50'),
+        'MA200': calculate_market_breadth(all_df_filtered, 'MA200'),
+    })
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="市场宽度计算基准")
+    parser.add_argument("--stocks", type=int, default=800)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    panel = make_panel(args.stocks, args.years)
+    date = panel.index[-240]
+    print(f"面板：{args.stocks} 只股票 × {args.years} 年，共 {len(panel)} 行")
+
+    legacy_time, legacy = best_of(lambda: legacy_breadth(panel, date), args.repeat)
+    vector_time, vector = best_of(lambda: market_breadth(panel, start=date), args.repeat)
+
+    # float32 收盘价与 float64 均线在恰好相等时可能判定不同，只允许极少数差异
+    diff = (legacy - vector).abs().max().max()
+    print(f"groupby/transform：{legacy_time * 1000:.1f} ms")
+    print(f"宽矩阵累加和：    {vector_time * 1000:.1f} ms")
+    print(f"加速比：{legacy_time / vector_time:.1f}x，最大百分比差异：{diff:.4f}")
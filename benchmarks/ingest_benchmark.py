@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from dataloader.providers import set_provider
+from dataloader.scheduler import Scheduler
+from dataloader.synthetic_provider import SyntheticProvider
+
+# 数据下载端到端压测：用模拟数据源代替东方财富接口，在临时目录中运行 run_dataloader 的数据任务，
+# 统计写入行数、吞吐量、请求数、错误和限流次数；第二轮是增量更新，大部分请求应被交易日历跳过
+# python benchmarks/ingest_benchmark.py --latency 0.05 --error-rate 0.02 --throttle-rate 0.01
+# python benchmarks/ingest_benchmark.py --max-rps 5 --rate 10     # 客户端限速高于接口限流时的表现
+
+
+def run_round(jobs, rate_limits, workers, provider):
+    before = provider.stats()
+    start = time.perf_counter()
+    record = Scheduler(jobs, rate_limits=rate_limits, max_workers=workers).run()
+    wall = time.perf_counter() - start
+    after = provider.stats()
+    rows = sum(result["rows"] for result in record["jobs"].values())
+    return {
+        "wall_time": round(wall, 2),
+        "rows": rows,
+        "rows_per_s": round(rows / wall, 1) if wall else None,
+        "calls": after["calls"] - before["calls"],
+        "errors": after["errors"] - before["errors"],
+        "throttled": after["throttled"] - before["throttled"],
+        "calls_avoided": sum(result["calls_avoided"] for result in record["jobs"].values()),
+        "jobs": {name: {key: result[key] for key in ("status", "wall_time", "rows", "error")}
+                 for name, result in record["jobs"].items()},
+    }
+
+
+def main(args):
+    # run_dataloader 里的数据任务（不含 AI 报告）
+    from run_dataloader import jobs as all_jobs, rate_limits
+    jobs = [job for job in all_jobs if job.name != "ai_reports" and (not args.jobs or job.name in args.jobs)]
+    for job in jobs:
+        job.deps = [dep for dep in job.deps if dep in {j.name for j in jobs}]
+    rate_limits = {group: args.rate for group in rate_limits} if args.rate else rate_limits
+
+    provider = SyntheticProvider(seed=args.seed, latency=args.latency, jitter=args.jitter,
+                                 error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                 max_rps=args.max_rps, n_stocks=args.stocks, n_constituents=args.constituents,
+                                 n_funds=args.funds)
+    previous = set_provider(provider)
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bstocks_ingest_")
+    os.chdir(workdir)
+    try:
+        rounds = [run_round(jobs, rate_limits, args.workers, provider) for _ in range(args.rounds)]
+    finally:
+        os.chdir(cwd)
+        set_provider(previous)
+
+    result = {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "workdir": workdir,
+        "rounds": rounds,
+    }
+    print()
+    print(f"{'轮次':<6}{'耗时(s)':>10}{'写入行数':>12}{'行/秒':>12}{'请求':>8}{'错误':>8}{'限流':>8}{'跳过':>8}")
+    for i, r in enumerate(rounds, 1):
+        print(f"{i:<6}{r['wall_time']:>10}{r['rows']:>12}{r['rows_per_s']:>12}{r['calls']:>8}"
+              f"{r['errors']:>8}{r['throttled']:>8}{r['calls_avoided']:>8}")
+        failed = {name: job["error"] for name, job in r["jobs"].items() if job["status"] != "success"}
+        for name, error in failed.items():
+            print(f"    {name}: {error}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="数据下载端到端压测（模拟数据源）")
+    parser.add_argument("--latency", type=float, default=0.02, help="每次请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="额外的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机网络错误的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="随机限流的比例")
+    parser.add_argument("--max-rps", type=float, default=None, help="模拟接口每秒最多处理的请求数")
+    parser.add_argument("--rate", type=float, default=None, help="覆盖客户端限速组的每秒请求数")
+    parser.add_argument("--stocks", type=int, default=1000, help="股票池大小")
+    parser.add_argument("--constituents", type=int, default=300, help="每个指数的成份股数量")
+    parser.add_argument("--funds", type=int, default=2000, help="基金排行中的基金数量")
+    parser.add_argument("--workers", type=int, default=4, help="最大并行任务数")
+    parser.add_argument("--rounds", type=int, default=2, help="运行轮数，第一轮全量，之后为增量")
+    parser.add_argument("--jobs", nargs="+", help="只运行指定的任务")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,73 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 本地的 OpenAI 兼容接口桩，只实现流式 /chat/completions，用于在不调用真实接口时测试 AI 总结
+# python benchmarks/openai_stub.py --port 8765 --delay 0.05
+# 页面或任务中设置：OPENAI_BASE_URL_stocks=http://127.0.0.1:8765  OPENAI_API_KEY_stocks=stub
+
+
+def make_handler(delay=0.05, chunks=20):
+    class Handler(BaseHTTPRequestHandler):
+        # 请求计数，便于确认缓存命中时没有发出请求
+        requests = 0
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            type(self).requests += 1
+            user_content = body.get('messages', [{}])[-1].get('content', '')
+            text = f"**桩接口报告**（第 {type(self).requests} 次请求，输入 {len(user_content)} 字）\n\n" + "数据平稳。" * chunks
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            step = max(1, len(text) // chunks)
+            for i in range(0, len(text), step):
+                self._event({"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": body.get('model', 'stub'),
+                             "choices": [{"index": 0, "delta": {"content": text[i:i + step]}, "finish_reason": None}]})
+                time.sleep(delay)
+            self._event({"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": body.get('model', 'stub'),
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if body.get('stream_options', {}).get('include_usage'):
+                # 用量按字符数粗略估算
+                prompt_tokens = sum(len(m.get('content', '')) for m in body.get('messages', []))
+                self._event({"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": body.get('model', 'stub'), "choices": [],
+                             "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(text),
+                                       "total_tokens": prompt_tokens + len(text)}})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def _event(self, payload):
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(port=8765, delay=0.05, chunks=20, background=False):
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(delay, chunks))
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"OpenAI 兼容桩接口：http://127.0.0.1:{server.server_port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容接口桩")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05, help="每段文本之间的间隔（秒）")
+    parser.add_argument("--chunks", type=int, default=20, help="每次回复分成多少段")
+    args = parser.parse_args()
+    serve(args.port, args.delay, args.chunks)
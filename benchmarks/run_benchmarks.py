@@ -0,0 +1,241 @@
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from breadth_benchmark import make_panel, legacy_breadth
+from dataloader import fund_store, indicators, stock_store
+from dataloader.breadth import market_breadth
+from dataloader.dailyreview_dataloader import IndexAnalyzer
+from dataloader.rolling_state import RollingState
+from dataloader.synthetic_provider import SyntheticProvider
+
+# 性能基准套件：按 股票数 × 年数 生成模拟数据，计时各条热点路径并记录峰值内存，结果写成 JSON，
+# 可以与保存的基线对比，找出变慢的地方
+# python benchmarks/run_benchmarks.py --output baseline.json
+# python benchmarks/run_benchmarks.py --stocks 50 800 5000 --years 1 5 15 --baseline baseline.json
+#
+# 计时取 repeat 次中最快的一次（另记中位数）；峰值内存用 tracemalloc 单独运行一次测得（numpy 的分配也会计入）
+SCALES = {
+    "small": ([50], [1]),
+    "medium": ([800], [5]),
+    "large": ([5000], [15]),
+}
+DEFAULT_STOCKS = [50, 800]
+DEFAULT_YEARS = [1, 5]
+DEFAULT_FUNDS = 20000
+REGRESSION_THRESHOLD = 0.10   # 比基线慢 10% 以上视为变慢
+LEGACY_MAX_STOCKS = 800       # 原来的 groupby 写法在更大规模下太慢，默认只在这个规模以内运行
+
+
+def measure(func, repeat):
+    """
+    :return: (最快耗时, 耗时中位数, 峰值内存 MB, 最后一次的返回值)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), float(np.median(timings)), peak / 1024 / 1024, result
+
+
+def _scale(entry):
+    if entry.get("funds"):
+        return f"{entry['funds']} 只基金"
+    return f"{entry.get('stocks') or '-'}×{entry.get('years') or '-'}"
+
+
+def _record(results, name, func, repeat, stocks=None, years=None, **extra):
+    seconds, median, peak_mb, result = measure(func, repeat)
+    entry = {"name": name, "stocks": stocks, "years": years, "seconds": round(seconds, 6),
+             "median": round(median, 6), "peak_mb": round(peak_mb, 2), **extra}
+    results.append(entry)
+    print(f"{name:<32}{_scale(entry):>12}{seconds * 1000:>12.1f} ms{peak_mb:>10.1f} MB")
+    return result
+
+
+# ---------- 各条热点路径 ----------
+def bench_panel(results, stocks, years, repeat, legacy):
+    # 成份股长表：分区存储读写、市场宽度（全量和增量）
+    panel = make_panel(stocks, years)
+    workdir = tempfile.mkdtemp(prefix="bstocks_bench_")
+    try:
+        counter = iter(range(10 ** 6))
+        _record(results, "storage.append_stocks", lambda: stock_store.append_stocks(
+            panel, os.path.join(workdir, f"append_{next(counter)}")), repeat, stocks, years, rows=len(panel))
+        root = os.path.join(workdir, "append_0")
+        codes = panel['股票代码'].unique().tolist()
+        _record(results, "storage.read_stocks", lambda: stock_store.read_stocks(codes, root, columns=['收盘']),
+                repeat, stocks, years)
+
+        start = panel.index.unique().sort_values()[-240]
+        _record(results, "breadth.market_breadth", lambda: market_breadth(panel, start=start), repeat, stocks, years)
+        if legacy:
+            _record(results, "breadth.legacy_groupby", lambda: legacy_breadth(panel, start), 1, stocks, years)
+
+        last_date = panel.index.max()
+        history = panel[panel.index < last_date]
+        closes = panel[panel.index == last_date].set_index('股票代码')['收盘']
+        state = _record(results, "rolling_state.from_panel",
+                        lambda: RollingState.from_panel(history, windows=(20, 50, 200)), repeat, stocks, years)
+        # 每次在状态的副本上追加最后一个交易日（复制状态的耗时也计入在内）
+        _record(results, "rolling_state.daily_update", lambda: _copy_state(state).breadth(last_date, closes),
+                repeat, stocks, years)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _copy_state(state):
+    return RollingState(state.windows, state.symbols, buffer=state.buffer.copy(), counts=state.counts.copy(),
+                        sums=state.sums.copy(), symbol_dates=state.symbol_dates.copy(), last_date=state.last_date)
+
+
+def index_history(years):
+    provider = SyntheticProvider(start=(pd.Timestamp.today() - pd.DateOffset(years=years)).strftime('%Y-%m-%d'))
+    return provider.index_zh_a_hist("000300")
+
+
+def bench_series(results, years, repeat):
+    # 单个指数的历史：均线、复盘统计、图表规格
+    hist = index_history(years)
+    close = hist.set_index(pd.to_datetime(hist['日期']))['收盘']
+    _record(results, "indicators.moving_averages", lambda: indicators.moving_averages(close), repeat, years=years)
+
+    analyzer = IndexAnalyzer("daily", None, None, [], [])
+    _record(results, "dailyreview.calculate_statistics", lambda: analyzer.calculate_statistics(hist.copy()),
+            repeat, years=years)
+
+    try:
+        import charts
+    except ImportError as e:
+        print(f"{'charts.price_ma_chart':<32} 跳过：{e}")
+        results.append({"name": "charts.price_ma_chart", "stocks": None, "years": years, "skipped": str(e)})
+        return
+    pro_df = close.to_frame().join(indicators.moving_averages(close)).reset_index()
+    pro_df['日期'] = pro_df['日期'].dt.strftime('%Y-%m-%d')
+    spec = _record(results, "charts.price_ma_chart", lambda: charts.price_ma_chart(pro_df, '日期', '收盘').to_json(),
+                   repeat, years=years)
+    results[-1]["payload_bytes"] = len(spec.encode('utf-8'))
+
+
+def bench_funds(results, funds, repeat):
+    # 基金排行：建立查询索引、各类别前后 10 名
+    provider = SyntheticProvider(n_funds=funds)
+    rank = fund_store.build_fund_rank(provider.fund_open_fund_rank_em("全部"), provider.fund_name_em())
+    rank_index = _record(results, "fund_rank.build_index", lambda: fund_store.FundRankIndex(rank), repeat,
+                         funds=funds)
+    _record(results, "fund_rank.top_and_tail",
+            lambda: [rank_index.top_and_tail('今年来', 10, category=category) for category in fund_store.CATEGORIES],
+            repeat, funds=funds)
+
+
+# ---------- 结果 ----------
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "commit": commit,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+
+def _key(entry):
+    return entry["name"], entry.get("stocks"), entry.get("years"), entry.get("funds")
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    与基线逐项对比
+    :return: 变慢的项目列表
+    """
+    base = {_key(entry): entry for entry in baseline["results"] if "seconds" in entry}
+    regressions = []
+    print(f"\n与基线对比（{baseline['meta'].get('time')}，commit {baseline['meta'].get('commit')}）")
+    print(f"{'项目':<32}{'规模':>12}{'基线(ms)':>12}{'本次(ms)':>12}{'比值':>8}{'内存比':>8}")
+    for entry in results:
+        old = base.get(_key(entry))
+        if old is None or "seconds" not in entry:
+            continue
+        ratio = entry["seconds"] / old["seconds"] if old["seconds"] else float('inf')
+        mem_ratio = entry["peak_mb"] / old["peak_mb"] if old["peak_mb"] else float('nan')
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  变慢"
+            regressions.append({**entry, "baseline_seconds": old["seconds"], "ratio": round(ratio, 3)})
+        elif ratio < 1 - threshold:
+            flag = "  变快"
+        print(f"{entry['name']:<32}{_scale(entry):>12}{old['seconds'] * 1000:>12.1f}{entry['seconds'] * 1000:>12.1f}"
+              f"{ratio:>8.2f}{mem_ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(args):
+    stocks, years = args.stocks or DEFAULT_STOCKS, args.years or DEFAULT_YEARS
+    if args.scale:
+        stocks = sorted({s for scale in args.scale for s in SCALES[scale][0]})
+        years = sorted({y for scale in args.scale for y in SCALES[scale][1]})
+
+    results = []
+    print(f"{'项目':<32}{'规模':>12}{'耗时':>15}{'峰值内存':>12}")
+    for y in years:
+        bench_series(results, y, args.repeat)
+    for s in stocks:
+        for y in years:
+            bench_panel(results, s, y, args.repeat, legacy=args.legacy or s <= LEGACY_MAX_STOCKS)
+    bench_funds(results, args.funds, args.repeat)
+
+    report = {"meta": metadata(), "config": {"stocks": stocks, "years": years, "funds": args.funds,
+                                             "repeat": args.repeat}, "results": results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        report["regressions"] = regressions
+        print(f"\n{len(regressions)} 项比基线慢 {args.threshold:.0%} 以上")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="性能基准套件")
+    parser.add_argument("--stocks", type=int, nargs="+", help=f"股票数，默认 {DEFAULT_STOCKS}")
+    parser.add_argument("--years", type=int, nargs="+", help=f"年数，默认 {DEFAULT_YEARS}")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), help="预设规模，覆盖 --stocks/--years")
+    parser.add_argument("--funds", type=int, default=DEFAULT_FUNDS, help="基金排行中的基金数量")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，取最快的一次")
+    parser.add_argument("--legacy", action="store_true", help="所有规模都运行原来的 groupby 市场宽度写法")
+    parser.add_argument("--output", help="把结果写入 JSON 文件（可作为之后的基线）")
+    parser.add_argument("--baseline", help="与之对比的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="判定变慢的比例")
+    parser.add_argument("--fail-on-regression", action="store_true", help="有项目变慢时以状态码 1 退出")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,113 @@
+import logging
+import numpy as np
+import pandas as pd
+import altair as alt
+
+# 走势图的公共构建函数
+# 每张图只把用到的列放进一份数据里，均线用 transform_fold 展开成一个图层，不再为每条线各带一份数据；
+# 点数超过 max_points 时用 LTTB 降采样（保留走势的形状和极值）
+# 发送给浏览器的数据大小只在 charts 日志级别为 DEBUG 时统计（需要额外序列化一次图表）
+CHART_MAX_POINTS = 1000
+MA_COLORS = {'MA20': '#4793AF', 'MA50': '#DD5746', 'MA200': '#8B322C'}
+
+logger = logging.getLogger(__name__)
+
+
+def lttb(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样
+    :param values: 一维数组，按时间顺序排列（横轴按等间距处理）
+    :return: 保留的行号，包含首尾两点
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # 缺失值不参与面积计算
+    y = np.where(np.isnan(values), np.nanmean(values) if np.isfinite(values).any() else 0.0, values)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # 下一个桶的平均点
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        # 当前桶中与前一个选中点、下一个桶平均点组成三角形面积最大的点
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def downsample(df, column, max_points=CHART_MAX_POINTS):
+    # 按某一列的走势降采样，其他列取同样的行
+    if max_points is None or len(df) <= max_points:
+        return df
+    return df.iloc[lttb(df[column].to_numpy(dtype=np.float64), max_points)]
+
+
+def payload_bytes(chart):
+    # 图表规格（含数据）序列化后的大小，即发送给浏览器的内容
+    return len(chart.to_json().encode('utf-8'))
+
+
+def log_payload(chart, name, rows, total_rows):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return None
+    nbytes = payload_bytes(chart)
+    logger.debug("%s: %d/%d 点, %.1f KB", name, rows, total_rows, nbytes / 1024)
+    return nbytes
+
+
+def price_ma_chart(df, x, price, ma_columns=('MA20', 'MA50', 'MA200'), width=1000, height=400,
+                   max_points=CHART_MAX_POINTS, name=None):
+    """
+    价格折线 + 均线
+    :param df: 含 x、price 和均线列的 DataFrame
+    :param x: 日期列名
+    :param price: 价格列名（收盘、单位净值等）
+    """
+    data = downsample(df[[x, price, *ma_columns]], price, max_points)
+    domain = [float(data[price].min()), float(data[price].max())]
+    base = alt.Chart(data).encode(x=alt.X(f'{x}:T', title=x))
+    line = base.mark_line(color='red', size=3).encode(
+        y=alt.Y(f'{price}:Q', title=price, scale=alt.Scale(domain=domain))
+    )
+    ma_lines = base.transform_fold(list(ma_columns), as_=['均线', '值']).mark_line().encode(
+        y=alt.Y('值:Q', scale=alt.Scale(domain=domain)),
+        color=alt.Color('均线:N', scale=alt.Scale(domain=list(ma_columns),
+                                                range=[MA_COLORS.get(col, 'gray') for col in ma_columns]),
+                        title='移动平均线'),
+    )
+    chart = alt.layer(line, ma_lines).properties(width=width, height=height)
+    if name is not None:
+        log_payload(chart, name, len(data), len(df))
+    return chart
+
+
+def breadth_chart(df, x, columns=('MA20', 'MA50', 'MA200'), rules=(15, 85), width=1000, height=400,
+                  max_points=CHART_MAX_POINTS, name=None):
+    """
+    市场宽度（站上各条均线的股票百分比），在 rules 的位置画横线
+    """
+    size_mapping = {'MA20': 1, 'MA50': 3, 'MA200': 5}
+    data = downsample(df[[x, *columns]], columns[0], max_points)
+    lines = alt.Chart(data).transform_fold(list(columns), as_=['key', 'value']).mark_line().encode(
+        x=alt.X(f'{x}:T', title=x),
+        y=alt.Y('value:Q', title='百分比'),
+        color=alt.Color('key:N', scale=alt.Scale(domain=list(columns),
+                                               range=[MA_COLORS.get(col, 'gray') for col in columns]),
+                        title='移动平均线'),
+        size=alt.Size('key:N', scale=alt.Scale(domain=list(columns),
+                                              range=[size_mapping.get(col, 1) for col in columns])),
+        tooltip=[f'{x}:T', 'value:Q'],
+    )
+    rule = alt.Chart(pd.DataFrame({'y': list(rules)})).mark_rule(color='black').encode(y='y:Q')
+    chart = alt.layer(lines, rule).properties(width=width, height=height)
+    if name is not None:
+        log_payload(chart, name, len(data), len(df))
+    return chart
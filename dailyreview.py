@@ -1,89 +1,35 @@
+from dataloader import reports
+from dataloader.reports import PERCENT_COLUMNS
+
+# 百分数列（1.23 表示 1.23%）和价格列，只在展示时格式化
+PRICE_COLUMNS = ["当日数值", "昨日数值", "前日数值", "近30日均值", "布林轨下轨", "布林轨上轨", "最新价"]
+
+
 def statement_func():
     import streamlit as st
-    import pandas as pd
     from streamlit_option_menu import option_menu
-    import os
+    import data_cache
+    import ai_summary
     
 
     st.title("每日复盘")
     st.write("本站用于个人爱好量化分析的项目，数据有可能不准确，请谨慎使用。")
 
-    # 读取 CSV 文件
-    # 读取index_statistics
-    index_statistics = pd.read_csv("data/index_statistics.csv", usecols=lambda x: x not in pd.read_csv("data/index_statistics.csv", nrows=0).columns[:1])
-    index_statistics['指数代码'] = index_statistics['指数代码'].astype(str).str.zfill(6)
-    # 读取etf_statistics1
-    etf_statistics1 = pd.read_csv("data/etf_statistics1.csv", usecols=lambda x: x not in pd.read_csv("data/etf_statistics1.csv", nrows=0).columns[:1])
-    etf_statistics1['ETF代码'] = etf_statistics1['ETF代码'].astype(str).str.zfill(6)
-    # 读取etf_statistics2
-    etf_statistics2 = pd.read_csv("data/etf_statistics2.csv", usecols=lambda x: x not in pd.read_csv("data/etf_statistics2.csv", nrows=0).columns[:1])
-    etf_statistics2['ETF代码'] = etf_statistics2['ETF代码'].astype(str).str.zfill(6)
-    # 读取etf_statistics3
-    etf_statistics3 = pd.read_csv("data/etf_statistics3.csv", usecols=lambda x: x not in pd.read_csv("data/etf_statistics3.csv", nrows=0).columns[:1])
-    etf_statistics3['ETF代码'] = etf_statistics3['ETF代码'].astype(str).str.zfill(6)
-
-    
-
-    # 人工智能自动生成市场总结
-    def summarize_market_data(df):
-        from openai import OpenAI   
-        from dotenv import load_dotenv
-        # 将DataFrame转换为字符串格式
-        df_str = df.to_string()
-        # DeepSeek API的配置
-        load_dotenv()  # 加载 .env 文件中的环境变量
-        api_key = os.getenv("OPENAI_API_KEY_stocks")
-        if not api_key:
-            st.error("API 密钥未设置。请设置 OPENAI_API_KEY_stocks 环境变量。")
-            return
-
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-        # 设置请求消息
-        messages = [
-            {"role": "system", "content": 
-                    '''
-                    ### 角色 
-                    你是投资专家。根据用户提供的数据，简要总结市场情况，并给出基于数据特点的提醒和后续操作建议。
-                    ## 技能 
-                    ### 技能 1：市场总结 
-                    - 分析用户提供的数据，识别市场的主要趋势和变化。
-                    - 用简明的语言总结市场情况，确保普通投资者能理解。
-
-                    ### 技能 2：投资提醒 
-                    - 根据市场总结，给出在投资时需注意的要点和潜在风险。
-                    - 提供具体的提醒，帮助投资者做出明智决定。
-
-                    ### 技能 3：操作建议
-                    - 根据数据特点，给出后续的投资操作建议。
-                    - 确保建议有实际操作性，适合不同风险偏好的投资者。
-
-                    ## 限制
-                    - 只回答与市场总结、投资提醒和操作建议相关的问题。
-                    - 内容使用markdown格式，标题只需要文本加粗即可。
-                    - 遵循用户提供的数据和语言，请勿添加不相关的信息。
-                    - 确保总结和建议简洁明了。
-                    '''
-                    },
-            {"role": "user", "content": f"这是最新的股票或ETF情况:\n\n{df_str}"}
-        ]
-
-        # 发送请求
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=messages,
-            stream=True,
-            temperature=0.7
-        )
-
-        full_response = ""
-        message_placeholder = st.empty()
-        for chunk in response:
-            if chunk.choices[0].delta.content:
-                full_response += chunk.choices[0].delta.content
-                message_placeholder.markdown(full_response + "▌")
-        message_placeholder.markdown(full_response)
-
-        return full_response
+    # 按文件修改时间缓存，文件更新前所有会话共用同一份数据
+    index_statistics = data_cache.read_csv("data/index_statistics.csv", lambda path: reports.read_statistics(path, '指数代码'))
+    etf_statistics1 = data_cache.read_csv("data/etf_statistics1.csv", lambda path: reports.read_statistics(path, 'ETF代码'))
+    etf_statistics2 = data_cache.read_csv("data/etf_statistics2.csv", lambda path: reports.read_statistics(path, 'ETF代码'))
+    etf_statistics3 = data_cache.read_csv("data/etf_statistics3.csv", lambda path: reports.read_statistics(path, 'ETF代码'))
+
+    # 展示格式：百分数列加 %，价格保留两位小数
+    column_config = {col: st.column_config.NumberColumn(col, format="%.2f%%") for col in PERCENT_COLUMNS}
+    for col in PRICE_COLUMNS:
+        column_config[col] = st.column_config.NumberColumn(col, format="%.2f")
+
+    # 人工智能自动生成市场总结，报告在数据下载后已批量生成，同样的数据直接显示缓存的报告
+    def summarize_market_data(df, key, button_label=None):
+        return ai_summary.render_summary(reports.MARKET_PROMPT, reports.market_content(df), key=key,
+                                         button_label=button_label)
     # 导航栏
     choose = option_menu(None, ["大盘情况", "ETF专题", "全球主要ETF"], 
     icons=['house', 'list-task', "list-task"], 
@@ -91,34 +37,28 @@ def statement_func():
     if choose == '大盘情况':
         # 大盘情况
         st.header("一、重要指数表现情况")
-        st.dataframe(index_statistics, hide_index=True)
+        st.dataframe(index_statistics, hide_index=True, column_config=column_config)
         
-        if st.button("AI自动生成 分析报告"):
-            summarize_market_data(index_statistics)
-        else:
-            st.info("点击按钮 AI助力")
+        summarize_market_data(index_statistics, key="index_statistics", button_label="AI自动生成 分析报告")
 
     elif choose == 'ETF专题':
         st.header("二、ETF 专题")
         st.write("以最近一周涨跌排序")
 
         st.markdown("### 国内宽基跟踪")
-        st.dataframe(etf_statistics1, hide_index=True)
+        st.dataframe(etf_statistics1, hide_index=True, column_config=column_config)
 
 
-        if st.button("AI自动生成 分析报告"):
-            summarize_market_data(etf_statistics1)
-        else:
-            st.info("点击按钮 AI助力")
+        summarize_market_data(etf_statistics1, key="etf_statistics1", button_label="AI自动生成 分析报告")
 
         st.markdown("### 行业主要ETF")
-        st.dataframe(etf_statistics3, hide_index=True)
+        st.dataframe(etf_statistics3, hide_index=True, column_config=column_config)
         st.info("AI自动生成市场总结")
-        summarize_market_data(etf_statistics3)
+        summarize_market_data(etf_statistics3, key="etf_statistics3")
     elif choose == '全球主要ETF':
         st.header("全球主要ETF")
-        st.dataframe(etf_statistics2, hide_index=True)
+        st.dataframe(etf_statistics2, hide_index=True, column_config=column_config)
         st.info("AI自动生成市场总结")
-        summarize_market_data(etf_statistics2)
+        summarize_market_data(etf_statistics2, key="etf_statistics2")
 
     return
\ No newline at end of file
@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dataloader.storage import PartitionedStore, STORE_ROOT
+
+# 页面数据缓存：所有会话共用一个进程内缓存（st.cache_resource），
+# 每个条目记录数据版本（数据集的清单校验和或文件的修改时间），版本变化时重新读取；
+# 总内存超过预算时按最近最少使用淘汰
+# 返回的 DataFrame 是缓存内容的副本，页面可以随意修改
+CACHE_BUDGET_MB = 256
+
+
+def _sizeof(value):
+    # 估算缓存对象占用的内存
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_sizeof(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return value
+
+
+class DataCache:
+    def __init__(self, budget_bytes=CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()   # key -> (version, value, nbytes)
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version, loader):
+        """
+        读取缓存，版本不一致或不存在时调用 loader() 重新加载
+        :param key: 数据的标识，如 ("dataset", root, "us_etf/sym_107_SPY")
+        :param version: 数据版本，变化后旧的缓存失效
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry[1])
+            self.misses += 1
+
+        # 加载过程不持有锁，不同数据可以并行读取
+        value = loader()
+        nbytes = _sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            if nbytes <= self.budget_bytes:
+                self._entries[key] = (version, value, nbytes)
+                self.nbytes += nbytes
+                while self.nbytes > self.budget_bytes:
+                    _, (_, _, evicted) = self._entries.popitem(last=False)
+                    self.nbytes -= evicted
+                    self.evictions += 1
+        return _copy(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "条目数": len(self._entries),
+                "占用(MB)": round(self.nbytes / 1024 / 1024, 2),
+                "预算(MB)": round(self.budget_bytes / 1024 / 1024, 2),
+                "命中": self.hits,
+                "未命中": self.misses,
+                "命中率": round(self.hits / total, 3) if total else None,
+                "淘汰": self.evictions,
+            }
+
+
+@st.cache_resource
+def get_cache():
+    # 整个进程只创建一次，所有会话共用
+    return DataCache()
+
+
+def file_version(path):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+
+def read_dataset(dataset, root=STORE_ROOT, **kwargs):
+    # 分区存储中的数据集，以清单校验和为版本
+    store = PartitionedStore(root)
+    key = ("dataset", root, dataset, tuple(sorted(kwargs.items())))
+    return get_cache().get(key, store.version(dataset), lambda: store.read(dataset, **kwargs))
+
+
+def read_csv(path, loader=None):
+    # CSV 文件，以修改时间为版本；loader 为读取后的处理函数，默认直接 pd.read_csv
+    # 缓存键只有路径：同一个文件在各页面上用同一种方式读取，不同的读取方式不能共用同一路径
+    key = ("csv", path)
+    return get_cache().get(key, file_version(path), lambda: loader(path) if loader is not None else pd.read_csv(path))
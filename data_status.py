@@ -0,0 +1,59 @@
+import pandas as pd
+import streamlit as st
+import data_cache
+import page_utils
+from dataloader import llm
+from dataloader.manifest import Manifest
+from dataloader.storage import STORE_ROOT
+from dataloader.scheduler import read_run_log
+
+
+def data_status_page(root=STORE_ROOT):
+    st.title("数据状态")
+
+    # 数据新鲜度：只读取数据清单，不加载任何数据表
+    st.header("数据新鲜度")
+    manifest_df = Manifest(root).to_frame()
+    if manifest_df.empty:
+        st.info("暂无数据清单，请先运行 run_dataloader.py 下载数据。")
+    else:
+        last_dates = pd.to_datetime(manifest_df['最新日期'])
+        manifest_df.insert(3, '距今天数', (pd.Timestamp.now().normalize() - last_dates).dt.days)
+        st.dataframe(manifest_df, hide_index=True)
+
+    # 页面数据缓存的使用情况（所有会话共用）
+    st.header("页面数据缓存")
+    st.dataframe(pd.DataFrame([data_cache.get_cache().stats()]), hide_index=True)
+
+    # 各页面最近的首屏渲染耗时（所有会话共用）
+    st.header("页面渲染耗时")
+    render_times = page_utils.render_times()
+    if not render_times:
+        st.info("暂无渲染记录。")
+    else:
+        st.dataframe(pd.DataFrame([{"页面": page, **record} for page, records in render_times.items()
+                                   for record in records]), hide_index=True)
+
+    # AI 调用的 token 用量
+    st.header("AI 调用用量")
+    usage = llm.read_usage()
+    if not usage:
+        st.info("暂无调用记录。")
+    else:
+        usage_df = pd.DataFrame(usage)
+        st.write(f"最近 {len(usage_df)} 次调用，平均提示词 {usage_df['提示词tokens'].mean():.0f} tokens，"
+                 f"平均生成 {usage_df['生成tokens'].mean():.0f} tokens")
+        st.dataframe(usage_df.iloc[::-1], hide_index=True)
+
+    # 最近一次数据下载任务的运行情况
+    st.header("最近一次下载任务")
+    runs = read_run_log()
+    if not runs:
+        st.info("暂无运行记录。")
+        return
+    last_run = runs[-1]
+    st.write(f"开始时间：{last_run['started']}，总耗时：{last_run['wall_time']}s")
+    jobs_df = pd.DataFrame([{"任务": name, "状态": result["status"], "耗时(s)": result["wall_time"],
+                             "写入行数": result["rows"], "错误": result["error"]}
+                            for name, result in last_run["jobs"].items()])
+    st.dataframe(jobs_df, hide_index=True)
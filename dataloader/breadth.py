@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# 市场宽度计算：把成份股长表一次性转成 日期×股票 的 float32 收盘价矩阵，
+# 用累加和在 NumPy 中一次算出所有窗口的移动平均，再统计每天收盘价高于均线的股票占比
+# 均线按每只股票自己的交易日计算（停牌日不占窗口），与 groupby + rolling 的结果一致
+DEFAULT_WINDOWS = (20, 50, 200)
+
+
+def close_matrix(panel, value_column='收盘', symbol_column='股票代码'):
+    """
+    把长表转换成宽矩阵
+    :param panel: 日期索引、含股票代码列的长表
+    :return: (日期索引, 股票代码索引, float32 矩阵)，没有数据的位置为 NaN
+    """
+    dates = pd.DatetimeIndex(panel.index)
+    date_codes, date_index = pd.factorize(dates, sort=True)
+    symbol_codes, symbol_index = pd.factorize(panel[symbol_column], sort=True)
+    matrix = np.full((len(date_index), len(symbol_index)), np.nan, dtype=np.float32)
+    matrix[date_codes, symbol_codes] = panel[value_column].to_numpy(dtype=np.float32)
+    date_index = pd.DatetimeIndex(date_index, name=panel.index.name or '日期')
+    return date_index, pd.Index(symbol_index, name=symbol_column), matrix
+
+
+def rolling_means(matrix, windows=DEFAULT_WINDOWS):
+    """
+    按列计算多个窗口的移动平均
+    每列先把有效值按时间顺序压到顶部，累加和相减得到窗口和，再放回原来的行
+    :return: {窗口: float32 矩阵}，不足一个窗口的位置为 NaN
+    """
+    valid = ~np.isnan(matrix)
+    # 稳定排序把每列的有效行按原顺序排在前面
+    order = np.argsort(~valid, axis=0, kind='stable')
+    packed = np.take_along_axis(matrix, order, axis=0)
+    counts = valid.sum(axis=0)
+    positions = np.arange(matrix.shape[0])[:, None]
+
+    # 累加和用 float64，避免长序列在 float32 下的精度漂移
+    csum = np.zeros((matrix.shape[0] + 1, matrix.shape[1]), dtype=np.float64)
+    np.cumsum(np.nan_to_num(packed, nan=0.0), axis=0, dtype=np.float64, out=csum[1:])
+
+    means = {}
+    for window in windows:
+        packed_mean = np.full(matrix.shape, np.nan, dtype=np.float32)
+        if window <= matrix.shape[0]:
+            packed_mean[window - 1:] = (csum[window:] - csum[:-window]) / window
+        packed_mean[(positions < window - 1) | (positions >= counts)] = np.nan
+        result = np.full(matrix.shape, np.nan, dtype=np.float32)
+        np.put_along_axis(result, order, packed_mean, axis=0)
+        means[window] = result
+    return means
+
+
+def breadth_from_matrix(matrix, means):
+    """
+    每天收盘价高于均线的股票占当天有数据股票的百分比
+    均线还没有形成的股票计入分母但不计入分子
+    """
+    listed = (~np.isnan(matrix)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {window: (matrix > ma).sum(axis=1) / listed * 100 for window, ma in means.items()}
+
+
+def market_breadth(panel, windows=DEFAULT_WINDOWS, start=None, value_column='收盘', symbol_column='股票代码'):
+    """
+    计算一个成份股面板所有窗口的市场宽度
+    :param panel: 日期索引、含股票代码列和收盘价的长表
+    :param start: 只返回该日期之后的结果（均线仍使用完整历史）
+    :return: 日期索引，列为 MA20 / MA50 / MA200 ... 的百分比 DataFrame
+    """
+    if panel.empty:
+        return pd.DataFrame(columns=[f"MA{w}" for w in windows], index=pd.DatetimeIndex([], name='日期'))
+    dates, _, matrix = close_matrix(panel, value_column, symbol_column)
+    breadth = breadth_from_matrix(matrix, rolling_means(matrix, windows))
+    result = pd.DataFrame({f"MA{w}": breadth[w] for w in windows}, index=dates)
+    if start is not None:
+        result = result.loc[pd.Timestamp(start):]
+    return result
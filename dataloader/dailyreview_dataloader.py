@@ -1,38 +1,51 @@
-import akshare as ak
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader import indicators
+from dataloader.fetcher import fetch_concurrently
+from dataloader.providers import get_provider
+from dataloader.storage import PartitionedStore, STORE_ROOT
+from dataloader.trade_calendar import TradeCalendar
+
+# 统计结果的列，数值列都是浮点数（涨跌幅为百分数，如 1.23 表示 1.23%）
+INDEX_STATISTICS_COLUMNS = ["观察日期", "观察指数", "指数代码", "当日数值", "涨跌幅", "昨日数值", "前日数值",
+                            "近30日均值", "布林轨下轨", "布林轨上轨", "预警"]
+ETF_STATISTICS_COLUMNS = ["ETF名称", "ETF代码", "最新价", "今日涨幅", "近1周涨幅", "近30天涨幅"]
+MAX_WORKERS = 8
 
 # 指数数据下载器
 class IndexAnalyzer:
-    def __init__(self, period, start_date, end_date, index_codes, index_names):
+    def __init__(self, period, start_date, end_date, index_codes, index_names, limiter=None):
         self.period = period
         self.start_date = start_date
         self.end_date = end_date
         self.index_codes = index_codes
         self.index_names = index_names
+        self.limiter = limiter
 
     def get_index_data(self, symbol):
-        index_data = ak.index_zh_a_hist(symbol, self.period, self.start_date, self.end_date)
+        if self.limiter is not None:
+            self.limiter.acquire()
+        index_data = get_provider().index_zh_a_hist(symbol, self.period, self.start_date, self.end_date)
         return index_data
 
     def calculate_statistics(self, data):
         if data.empty or len(data) < 2:
             return data
 
-        data["涨跌幅"] = (data["收盘"].pct_change() * 100).round(2).astype(str) + '%'
-        data["近30日均值"] = data["收盘"].rolling(window=30).mean()
+        # 所有统计列都保持为浮点数，百分号等格式在页面展示时处理
+        data["涨跌幅"] = (data["收盘"].pct_change() * 100).round(2)
+        data["近30日均值"] = indicators.sma(data["收盘"], 30)
 
         # 计算boll轨 MA20 P= 2
-        data["近20日均值"] = data["收盘"].rolling(window=20).mean()
-        data['20日移动标准差'] = data['收盘'].rolling(window=20).std()
-        # 计算布林轨区间
-        data['布林轨下轨'] = data['近20日均值'] - 2 * data['20日移动标准差']
-        data['布林轨上轨'] = data['近20日均值'] + 2 * data['20日移动标准差']
-        data['布林轨区间'] = list(zip((data['布林轨下轨']).round(2), (data['布林轨上轨']).round(2)))
+        data["近20日均值"], data['布林轨下轨'], data['布林轨上轨'] = indicators.bollinger(data["收盘"], 20, 2)
         # 操作提示
-        data["预警"] = data.apply(
-            lambda row: "突破上轨" if row["收盘"] > row['布林轨上轨'] else "突破下轨" if row["收盘"] < row[
-                '布林轨下轨'] else '震荡', axis=1)
+        data["预警"] = np.select([data["收盘"] > data['布林轨上轨'], data["收盘"] < data['布林轨下轨']],
+                               ["突破上轨", "突破下轨"], default='震荡')
 
         return data
 
@@ -50,74 +63,120 @@ class IndexAnalyzer:
             "昨日数值": data.iloc[-2]['收盘'],
             "前日数值": data.iloc[-3]['收盘'],
             "近30日均值": latest_data['近30日均值'],
-            "布林轨区间": latest_data['布林轨区间'],
+            "布林轨下轨": latest_data['布林轨下轨'],
+            "布林轨上轨": latest_data['布林轨上轨'],
             "预警": latest_data['预警']
         }
         return statistics
 
     def get_index_statistics(self, start_date, end_date):
-        # 初始化结果 DataFrame
-        result_df = pd.DataFrame(
-            columns=["观察日期","观察指数", "指数代码", "当日数值", "涨跌幅", "昨日数值", "前日数值", "近30日均值", "布林轨区间",
-                     "预警"])
-
-        # 获取指数数据并计算统计信息
+        # 获取指数数据并计算统计信息，最后一次性构建结果 DataFrame
+        rows = []
         for index_name, index_code in zip(self.index_names, self.index_codes):
             index_data = self.get_index_data(index_code)
             index_data = self.calculate_statistics(index_data)
             statistics = self.get_observation_statistics(index_name, index_code, index_data)
-            # 将字典转换为DataFrame
             if statistics:
-                statistics_df = pd.DataFrame([statistics])
-                # 将statistics_df添加到result_df
-                result_df = pd.concat([result_df, statistics_df], ignore_index=True)
+                rows.append(statistics)
 
-        return result_df
+        return pd.DataFrame(rows, columns=INDEX_STATISTICS_COLUMNS)
     
-# ETF数据下载器
-class ETFAnalyzer:
-    def __init__(self, etf_list, start_date, end_date):
-        self.etf_list = etf_list
+# ETF数据下载器：多个ETF列表合并去重后每个代码只下载一次，
+# 历史数据保存在分区存储中（etf_hist/sym_<代码>），之后只下载缺少的交易日
+class ETFStatsService:
+    def __init__(self, etf_lists, start_date, end_date, limiter=None, root=STORE_ROOT, calendar=None,
+                 max_workers=MAX_WORKERS):
+        """
+        :param etf_lists: {视图名: {ETF名称: ETF代码}}
+        """
+        self.etf_lists = etf_lists
         self.start_date = start_date
         self.end_date = end_date
-        self.result_df = pd.DataFrame(columns=["ETF名称", "ETF代码", "最新价", "今日涨幅", "近1周涨幅", "近30天涨幅"])
-
-    def get_etf_data(self, etf_code):
-        etf_data = ak.fund_etf_hist_em(symbol=etf_code, start_date=self.start_date, end_date=self.end_date)
-        return etf_data
-
-    def calculate_percentage_change(self, data, column_name):
-        data[column_name] = (data[column_name].pct_change() * 100).round(2)
-        return data
-
-    def get_etf_statistics(self, etf_name, etf_code, data):
-        latest_data = data.iloc[-1]
-        statistics = {
-            "ETF名称": etf_name,
-            "ETF代码": etf_code,
-            "最新价": latest_data['收盘'],
-            "今日涨幅": latest_data['涨跌幅'].astype(str) + '%',
-            "近1周涨幅": data['涨跌幅'].tail(5).sum().round(2).astype(str) + '%',
-            "近30天涨幅": data['涨跌幅'].tail(30).sum().round(2).astype(str) + '%',
-        }
-        return statistics
-
-    def get_combined_etf_statistics(self):
-        for etf_name, etf_code in self.etf_list.items():
-            etf_data = self.get_etf_data(etf_code)
-            statistics = self.get_etf_statistics(etf_name, etf_code, etf_data)
-            statistics_df = pd.DataFrame([statistics])
-            self.result_df = pd.concat([self.result_df, statistics_df], ignore_index=True)
-        return self.result_df
+        self.limiter = limiter
+        self.store = PartitionedStore(root)
+        self.calendar = calendar or TradeCalendar("cn")
+        self.max_workers = max_workers
+        # 所有视图中出现的代码，去重并保持出现顺序
+        self.codes = list(dict.fromkeys(code for etf_list in etf_lists.values() for code in etf_list.values()))
+
+    @staticmethod
+    def dataset(etf_code):
+        return f"etf_hist/sym_{etf_code}"
+
+    def get_etf_data(self, etf_code, start_date):
+        etf_data = get_provider().fund_etf_hist_em(symbol=etf_code, start_date=start_date, end_date=self.end_date)
+        etf_data['日期'] = pd.to_datetime(etf_data['日期'])
+        return etf_data.set_index('日期')
+
+    def update_history(self):
+        """
+        并发下载所有代码缺少的交易日并追加到存储；下载成功的代码照常写入，失败的代码不影响其他代码
+        :return: (写入行数, 省掉的请求数, {下载失败的代码: 异常})
+        """
+        last_dates = {code: self.store.last_date(self.dataset(code)) for code in self.codes}
+        pending = [code for code in self.codes if not self.calendar.is_current(last_dates[code], self.end_date)]
+        avoided = len(self.codes) - len(pending)
+
+        def fetch(code):
+            last_date = last_dates[code]
+            start_date = self.start_date if last_date is None else (last_date + pd.Timedelta(days=1)).strftime('%Y%m%d')
+            new_data = self.get_etf_data(code, start_date)
+            return new_data if last_date is None else new_data[new_data.index > last_date]
+
+        rows = 0
+
+        def on_result(code, new_data):
+            nonlocal rows
+            rows += self.store.append(self.dataset(code), new_data)
+
+        _, failures, stats = fetch_concurrently(fetch, pending, max_workers=self.max_workers, limiter=self.limiter,
+                                                on_result=on_result)
+        print(stats.summary("ETF行情"))
+        for code, error in failures.items():
+            print(f"ETF {code} 下载失败: {error}")
+        return rows, avoided, failures
+
+    def compute_statistics(self):
+        """
+        读取所有代码最近的历史数据，按代码分组一次算出全部统计
+        :return: 以 ETF代码 为索引的统计 DataFrame
+        """
+        frames = [self.store.read(self.dataset(code), columns=['收盘', '涨跌幅'], start=self.start_date).assign(ETF代码=code)
+                  for code in self.codes if self.store.exists(self.dataset(code))]
+        if not frames:
+            return pd.DataFrame(columns=ETF_STATISTICS_COLUMNS[2:])
+        history = pd.concat(frames).sort_index(kind='stable')
+        grouped = history.groupby('ETF代码', sort=False)
+        latest = grouped.tail(1).set_index('ETF代码')
+        return pd.DataFrame({
+            "最新价": latest['收盘'],
+            "今日涨幅": latest['涨跌幅'],
+            "近1周涨幅": grouped.tail(5).groupby('ETF代码')['涨跌幅'].sum().round(2),
+            "近30天涨幅": grouped.tail(30).groupby('ETF代码')['涨跌幅'].sum().round(2),
+        })
+
+    def get_views(self):
+        """
+        按各个列表输出统计结果，按近1周涨幅降序排列；同一列表中重复的代码只保留一次
+        :return: {视图名: DataFrame}
+        """
+        statistics = self.compute_statistics()
+        views = {}
+        for view, etf_list in self.etf_lists.items():
+            names = pd.Series(etf_list, name='ETF名称')
+            names = names[~names.duplicated()]
+            view_df = pd.DataFrame({'ETF名称': names.index, 'ETF代码': names.values})
+            view_df = view_df.join(statistics, on='ETF代码', how='inner')
+            views[view] = view_df.sort_values(by='近1周涨幅', ascending=False)[ETF_STATISTICS_COLUMNS]
+        return views
     
-# 主函数
-if __name__ == "__main__":
+def run(limiter=None):
     # 指数数据下载器测试
     index_codes = ["000001", "399001", "399006", "000688"]
     index_names = ["上证指数", "深圳指数", "创业板", "科创板"]
     start_date = (datetime.now() - timedelta(days=60)).strftime("%Y%m%d")
     end_date = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
-    analyzer = IndexAnalyzer("daily", start_date, end_date, index_codes, index_names)
+    analyzer = IndexAnalyzer("daily", start_date, end_date, index_codes, index_names, limiter=limiter)
     result = analyzer.get_index_statistics(start_date, end_date)
     result.to_csv("data/index_statistics.csv")
 
@@ -130,12 +189,6 @@ if __name__ == "__main__":
     "创业板ETF": "159915",
     "恒生ETF": "159920"
     }
-    analyzer = ETFAnalyzer(etf_list1, start_date, end_date)
-    etf_stat_1 = analyzer.get_combined_etf_statistics()
-    etf_stat_1['近1周涨幅'] = etf_stat_1['近1周涨幅'].str.rstrip('%').astype('float')
-    etf_stat_1 = etf_stat_1.sort_values(by='近1周涨幅', ascending=False)
-    etf_stat_1['近1周涨幅'] = (etf_stat_1['近1周涨幅']).round(2).astype(str) + '%'
-    etf_stat_1.to_csv("data/etf_statistics1.csv")
 
     # 全球主要ETF数据下载器
     etf_list2 = {
@@ -150,12 +203,6 @@ if __name__ == "__main__":
     "黄金ETF": "518880",
     "石油ETF": "561360"
     }
-    analyzer = ETFAnalyzer(etf_list2, start_date, end_date)
-    etf_stat_2 = analyzer.get_combined_etf_statistics()
-    etf_stat_2['近1周涨幅'] = etf_stat_2['近1周涨幅'].str.rstrip('%').astype('float')  # 将字符串转换为数值
-    etf_stat_2 = etf_stat_2.sort_values(by='近1周涨幅', ascending=False)
-    etf_stat_2['近1周涨幅'] = (etf_stat_2['近1周涨幅']).round(2).astype(str) + '%'
-    etf_stat_2.to_csv("data/etf_statistics2.csv")
 
     # 行业ETF数据下载器
     etf_list3 = {
@@ -183,10 +230,24 @@ if __name__ == "__main__":
     "通信ETF": "515880",
     "传媒ETF": "512980"
     }
-    analyzer = ETFAnalyzer(etf_list3, start_date, end_date)
-    etf_stat_3 = analyzer.get_combined_etf_statistics()
-    etf_stat_3['近1周涨幅'] = etf_stat_3['近1周涨幅'].str.rstrip('%').astype('float')  # 将字符串转换为数值
-    etf_stat_3 = etf_stat_3.sort_values(by='近1周涨幅', ascending=False)
-    etf_stat_3['近1周涨幅'] = (etf_stat_3['近1周涨幅']).round(2).astype(str) + '%'
-    etf_stat_3.to_csv("data/etf_statistics3.csv")
-    print("数据下载完毕！")
\ No newline at end of file
+
+    # 三个列表合并去重后统一下载，再分别输出
+    calendar = TradeCalendar("cn")
+    calendar.ensure_covers(end_date)
+    service = ETFStatsService({"data/etf_statistics1.csv": etf_list1,
+                               "data/etf_statistics2.csv": etf_list2,
+                               "data/etf_statistics3.csv": etf_list3},
+                              start_date, end_date, limiter=limiter, calendar=calendar)
+    etf_rows, avoided, failures = service.update_history()
+    views = service.get_views()
+    for path, view_df in views.items():
+        view_df.to_csv(path)
+    if failures:
+        # 已下载的数据和统计结果已经写入，任务标记为失败，--failed 重跑时会补齐这些代码
+        raise RuntimeError(f"ETF行情下载失败: {', '.join(failures)}")
+    print("数据下载完毕！")
+    return {"rows": len(result) + etf_rows, "calls_avoided": avoided}
+
+# 主函数
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,202 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader import stock_store, indicators
+from dataloader.breadth import market_breadth
+from dataloader.rolling_state import RollingState
+from dataloader.storage import PartitionedStore, STORE_ROOT
+
+# 市场宽度页面使用的预计算序列，在数据下载后生成，页面只读取这些小表
+# derived/breadth/sym_<指数>：每个交易日成份股高于 MA20/MA50/MA200 的百分比
+# derived/index_ma/sym_<指数>：指数收盘价及 MA20/MA50/MA200
+# 日常更新使用 rolling_state 中的增量状态，只读取新增的交易日；
+# 成份关系变化或补下载了旧日期时整表重算
+BREADTH_PREFIX = "derived/breadth"
+INDEX_MA_PREFIX = "derived/index_ma"
+STATE_DIR = "derived/rolling_state"
+MA_WINDOWS = (20, 50, 200)
+VERIFY_TOLERANCE = 1e-3
+
+
+def breadth_table(symbol):
+    return f"{BREADTH_PREFIX}/sym_{symbol}"
+
+
+def index_ma_table(symbol):
+    return f"{INDEX_MA_PREFIX}/sym_{symbol}"
+
+
+def state_path(name, root=STORE_ROOT):
+    return os.path.join(root, *STATE_DIR.split('/'), f"{name}.npz")
+
+
+def compute_index_ma(symbol, root=STORE_ROOT, windows=MA_WINDOWS):
+    index_df = PartitionedStore(root).read(f"index_data/sym_{symbol}", columns=['收盘'])
+    result = index_df[['收盘']].astype(np.float64)
+    return result.join(indicators.moving_averages(result['收盘'], windows))
+
+
+def compute_breadth(symbol, root=STORE_ROOT, windows=MA_WINDOWS):
+    panel = stock_store.read_index_panel(symbol, root, columns=['收盘'])
+    return market_breadth(panel, windows=windows).astype(np.float32)
+
+
+def _write(store, name, df):
+    df = df.copy()
+    df.index.name = '日期'
+    return store.write_table(name, df.reset_index(), index_name='日期')
+
+
+def _read(name, root):
+    df = PartitionedStore(root).read_table(name)
+    if df is None:
+        return None
+    return df.set_index('日期')
+
+
+def read_breadth(symbol, root=STORE_ROOT):
+    return _read(breadth_table(symbol), root)
+
+
+def read_index_ma(symbol, root=STORE_ROOT):
+    return _read(index_ma_table(symbol), root)
+
+
+# ---------- 全量重算 ----------
+def rebuild_breadth(symbol, root=STORE_ROOT, windows=MA_WINDOWS):
+    members = stock_store.index_members(symbol, root)
+    panel = stock_store.read_stocks(members, root, columns=['收盘'])
+    breadth = market_breadth(panel, windows=windows).astype(np.float32)
+    RollingState.from_panel(panel, windows, symbols=members).save(state_path(f"sym_{symbol}", root))
+    return _write(PartitionedStore(root), breadth_table(symbol), breadth)
+
+
+def rebuild_index_ma(symbol, root=STORE_ROOT, windows=MA_WINDOWS):
+    index_ma = compute_index_ma(symbol, root, windows)
+    panel = index_ma[['收盘']].assign(股票代码=symbol)
+    RollingState.from_panel(panel, windows).save(state_path(f"sym_{symbol}_index", root))
+    return _write(PartitionedStore(root), index_ma_table(symbol), index_ma)
+
+
+# ---------- 增量更新 ----------
+def update_breadth(symbol, root=STORE_ROOT, windows=MA_WINDOWS):
+    """
+    只读取状态之后新增的成份股数据，逐日更新滚动和并追加市场宽度
+    :return: 新增的行数
+    """
+    path = state_path(f"sym_{symbol}", root)
+    state = RollingState.load(path)
+    existing = read_breadth(symbol, root)
+    members = pd.Index(stock_store.index_members(symbol, root))
+    if state is None or existing is None or state.windows != tuple(windows) \
+            or not members.sort_values().equals(state.symbols.sort_values()):
+        print(f"{symbol} 没有可用的增量状态或成份股已变化，全量重算市场宽度")
+        return rebuild_breadth(symbol, root, windows)
+
+    # 水位线超过状态中最新日期的股票才有新数据
+    seen = pd.Series(state.symbol_dates, index=state.symbols)
+    watermarks = stock_store.read_watermarks(root).reindex(members)
+    advanced = watermarks.index[watermarks > seen.reindex(members)]
+    if advanced.empty:
+        return 0
+    if seen[advanced].isna().any():
+        # 之前没有任何数据的成份股补齐了历史
+        return rebuild_breadth(symbol, root, windows)
+
+    new_rows = stock_store.read_stocks(advanced, root, columns=['收盘'],
+                                       start=seen[advanced].min() + pd.Timedelta(days=1))
+    new_rows = new_rows[new_rows.index > seen.reindex(new_rows['股票代码']).to_numpy()]
+    if (new_rows.index <= state.last_date).any():
+        # 补下载了已处理日期的数据，这些日期的宽度需要重算
+        print(f"{symbol} 有早于 {state.last_date.date()} 的新数据，全量重算市场宽度")
+        return rebuild_breadth(symbol, root, windows)
+
+    records = {}
+    for date, group in new_rows.groupby(level=0):
+        breadth = state.breadth(date, group.set_index('股票代码')['收盘'])
+        records[date] = {f"MA{w}": breadth[w] for w in state.windows}
+    added = pd.DataFrame.from_dict(records, orient='index').astype(np.float32)
+    _write(PartitionedStore(root), breadth_table(symbol), pd.concat([existing, added]))
+    state.save(path)
+    return len(added)
+
+
+def update_index_ma(symbol, root=STORE_ROOT, windows=MA_WINDOWS):
+    path = state_path(f"sym_{symbol}_index", root)
+    state = RollingState.load(path)
+    existing = read_index_ma(symbol, root)
+    if state is None or existing is None or state.windows != tuple(windows):
+        return rebuild_index_ma(symbol, root, windows)
+
+    new_rows = PartitionedStore(root).read(f"index_data/sym_{symbol}", columns=['收盘'],
+                                           start=state.last_date + pd.Timedelta(days=1))
+    # 收盘价缺失的日期跳过，与 from_panel 建立状态时一致
+    closes = new_rows['收盘'].dropna() if not new_rows.empty else new_rows
+    if closes.empty:
+        return 0
+    records = {}
+    for date, close in closes.items():
+        _, means = state.update(date, pd.Series({symbol: close}))
+        records[date] = {'收盘': close, **{f"MA{w}": means[w][0] for w in state.windows}}
+    added = pd.DataFrame.from_dict(records, orient='index')
+    _write(PartitionedStore(root), index_ma_table(symbol), pd.concat([existing, added]))
+    state.save(path)
+    return len(added)
+
+
+def verify(symbol, root=STORE_ROOT, windows=MA_WINDOWS, tolerance=VERIFY_TOLERANCE):
+    """
+    把增量结果与全量重算结果逐日比较
+    :return: 超出容差的 (数据, 日期, 列) 列表
+    """
+    mismatches = []
+    for name, stored, full in [("breadth", read_breadth(symbol, root), compute_breadth(symbol, root, windows)),
+                               ("index_ma", read_index_ma(symbol, root), compute_index_ma(symbol, root, windows))]:
+        if stored is None:
+            mismatches.append((name, None, "缺失"))
+            continue
+        stored = stored.reindex(index=full.index, columns=full.columns).astype(np.float64)
+        diff = (stored - full.astype(np.float64)).abs()
+        # 两边都是 NaN 视为一致，只有一边是 NaN 视为不一致
+        diff = diff.where(stored.notna() | full.notna(), 0).fillna(np.inf)
+        for date, column in diff[diff > tolerance].stack().index:
+            mismatches.append((name, date, column))
+    print(f"{symbol} 校验完成：{len(mismatches)} 处不一致")
+    return mismatches
+
+
+def update_width_derived(symbols, root=STORE_ROOT, windows=MA_WINDOWS, verify_result=False):
+    """
+    增量更新各指数的市场宽度和指数均线
+    :param verify_result: 更新后与全量重算结果比较，不一致时抛出异常
+    :return: 新增的行数
+    """
+    rows = 0
+    for symbol in symbols:
+        rows += update_index_ma(symbol, root, windows)
+        rows += update_breadth(symbol, root, windows)
+        print(f"已更新 {symbol} 的市场宽度和指数均线")
+        if verify_result and verify(symbol, root, windows):
+            raise RuntimeError(f"{symbol} 的增量结果与全量重算不一致")
+    return rows
+
+
+if __name__ == "__main__":
+    from dataloader.width_dataloader import INDEX_SYMBOLS
+
+    parser = argparse.ArgumentParser(description="更新市场宽度和指数均线")
+    parser.add_argument("--verify", action="store_true", help="与全量重算结果比较")
+    parser.add_argument("--rebuild", action="store_true", help="丢弃增量状态，全量重算")
+    args = parser.parse_args()
+    for symbol in INDEX_SYMBOLS:
+        if args.rebuild:
+            rebuild_index_ma(symbol)
+            rebuild_breadth(symbol)
+        else:
+            update_width_derived([symbol])
+        if args.verify and verify(symbol):
+            sys.exit(1)
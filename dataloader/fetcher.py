@@ -0,0 +1,105 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# 令牌桶限速器：rate 为每秒补充的令牌数，capacity 为允许的突发请求数
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# 带退避的重试调用，每次尝试前都先从限速器取令牌
+def call_with_retry(func, *args, retries=3, backoff=0.5, limiter=None, **kwargs):
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            if attempt == retries:
+                raise
+            # 指数退避加随机抖动，避免所有线程同时重试
+            time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
+
+
+# 并发抓取结果统计
+class FetchStats:
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        return self.succeeded / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self, label="symbols"):
+        return (f"完成 {self.succeeded}/{self.total} 个{label}，失败 {self.failed} 个，"
+                f"耗时 {self.elapsed:.1f}s，吞吐 {self.throughput:.2f} {label}/sec")
+
+
+def fetch_concurrently(func, items, max_workers=8, rate=None, burst=None, retries=3, backoff=0.5, on_result=None,
+                       limiter=None):
+    """
+    用有界线程池并发执行 func(item)，可选令牌桶限速，单个任务失败按退避重试
+    :param func: 单个任务的抓取函数
+    :param items: 任务参数列表
+    :param max_workers: 最大并发数
+    :param rate: 每秒最多发出的请求数，None 表示不限速
+    :param burst: 令牌桶容量（允许的突发请求数）
+    :param retries: 单个任务失败后的重试次数
+    :param backoff: 退避基础秒数
+    :param on_result: 可选回调 on_result(item, result)，在主线程中逐个处理结果；
+                      传入后结果不再保留在 results 中，便于边下载边写入
+    :param limiter: 可选的共享 TokenBucket，传入时忽略 rate/burst，多个任务可共用同一限速
+    :return: (results, failures, stats)，results/failures 均以 item 为键
+    """
+    if limiter is None and rate:
+        limiter = TokenBucket(rate, burst)
+    results, failures = {}, {}
+    stats = FetchStats()
+    stats.total = len(items)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(call_with_retry, func, item, retries=retries, backoff=backoff, limiter=limiter): item
+            for item in items
+        }
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures[item] = e
+                stats.failed += 1
+                continue
+            stats.succeeded += 1
+            if on_result is not None:
+                on_result(item, result)
+            else:
+                results[item] = result
+    stats.elapsed = time.perf_counter() - start
+
+    return results, failures, stats
@@ -1,33 +1,72 @@
-import akshare as ak
 import pandas as pd
 from datetime import datetime, timedelta
 import os
+import sys
+import argparse
 
-def download_latest_fund_data(symbol, hdf5_path):
-    # 确保目录存在
-    os.makedirs(os.path.dirname(hdf5_path), exist_ok=True)
-    # 处理符号名称，使其符合Python标识符的命名规则
-    symbol_key = f"sym_{symbol}"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader import fund_store
+from dataloader.fetcher import fetch_concurrently
+from dataloader.providers import get_provider
+from dataloader.storage import STORE_ROOT
+from dataloader.trade_calendar import TradeCalendar
 
-    # 获取最新的基金数据
+MAX_WORKERS = 8
+
+# 基金列表(相信人类)
+FUND_SYMBOLS = ["040046","164701","007721","007380","006282","160416","162411","015016","008763","013308","000043","000893","001668","000369","006105","016630","006105","016630","005613","164824","206011"]
+
+# 下载单只基金的单位净值，只保留水位线之后的净值日期
+# 接口不支持按日期下载，只能取回完整历史后在本地截取
+def download_latest_fund_data(symbol, last_date=None):
     """获取基金的单位净值数据"""
-    fund_data = ak.fund_open_fund_info_em(symbol=symbol, indicator="单位净值走势")
-    fund_data = fund_data[['净值日期', '单位净值', '日增长率']]
+    fund_data = get_provider().fund_open_fund_info_em(symbol=symbol, indicator="单位净值走势")
+    fund_data = fund_data[['净值日期', '单位净值', '日增长率']].copy()
+    fund_data['净值日期'] = pd.to_datetime(fund_data['净值日期'])
     new_data = fund_data.set_index('净值日期')
+    if last_date is not None and not pd.isna(last_date):
+        new_data = new_data[new_data.index > last_date]
+    new_data['基金代码'] = symbol
+    return new_data
+
+# 增量更新基金净值：去重后并发下载，所有新增净值一次写入存储
+# 返回 ({基金代码: 新增行数}, 省掉的请求数)
+def update_funds(symbols, root=STORE_ROOT, limiter=None, calendar=None, end_date=None, dry_run=False,
+                 max_workers=MAX_WORKERS):
+    calendar = calendar or TradeCalendar("cn")
+    end_date = end_date or (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    symbols = list(dict.fromkeys(symbols))
+    watermarks = fund_store.nav_watermarks(root)
+
+    # 水位线已覆盖 end_date 之前最近一个交易日的基金不发请求
+    pending = [symbol for symbol in symbols if not calendar.is_current(watermarks.get(symbol), end_date)]
+    avoided = len(symbols) - len(pending)
+
+    results, failures, stats = fetch_concurrently(lambda symbol: download_latest_fund_data(symbol, watermarks.get(symbol)),
+                                                  pending, max_workers=max_workers, limiter=limiter)
+    print(stats.summary("基金净值"))
+    for symbol, error in failures.items():
+        print(f"基金 {symbol} 下载失败: {error}")
 
-    # 将新数据写回HDF5文件
-    with pd.HDFStore(hdf5_path) as store:
-        store[symbol_key] = new_data
-    print(f"数据已成功下载并保存到 {hdf5_path} 中，符号: {symbol}")
+    added = {symbol: len(results[symbol]) for symbol in pending if symbol in results}
+    for symbol, rows in added.items():
+        print(f"{'[dry-run] ' if dry_run else ''}{symbol}：新增 {rows} 行")
+    if not dry_run and results:
+        fund_store.append_navs(pd.concat(results.values()), root)
+    if failures:
+        raise RuntimeError(f"基金净值下载失败: {', '.join(failures)}")
+    return added, avoided
 
-def update_indices(symbols,hdf5_path):
-    for symbol in symbols:
-        print(f"Updating data for symbol: {symbol}")
-        download_latest_fund_data(symbol,hdf5_path)
+def run(limiter=None, dry_run=False):
+    calendar = TradeCalendar("cn")
+    calendar.ensure_covers(datetime.now() - timedelta(days=1))
+    added, avoided = update_funds(FUND_SYMBOLS, limiter=limiter, calendar=calendar, dry_run=dry_run)
+    print(f"相信人类组合基金明细下载完毕! 按交易日历跳过 {avoided} 次请求")
+    return {"rows": 0 if dry_run else sum(added.values()), "calls_avoided": avoided}
 
 # 主函数
 if __name__ == "__main__":
-    # 基金列表(相信人类)
-    symbols = ["040046","164701","007721","007380","006282","160416","162411","015016","008763","013308","000043","000893","001668","000369","006105","016630","006105","016630","005613","164824","206011"]
-    update_indices(symbols,hdf5_path="data/fund_human.h5")
-    print("相信人类组合基金明细下载完毕!")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="增量更新基金净值")
+    parser.add_argument("--dry-run", action="store_true", help="只统计每只基金会新增的行数，不写入存储")
+    args = parser.parse_args()
+    run(dry_run=args.dry_run)
@@ -1,15 +1,22 @@
-import akshare as ak
-import pandas as pd
-from datetime import datetime, timedelta
+import os
+import sys
 
-# 指数数据下载器
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader import fund_store
+from dataloader.providers import get_provider
+from dataloader.storage import STORE_ROOT
+
+# 公募基金排行下载器：只下载“全部”排行，各类别的排行由基金类型映射在本地筛选
 class IndexAnalyzer:
-    def __init__(self, symbol):
+    def __init__(self, symbol, limiter=None):
         self.symbol = symbol
+        self.limiter = limiter
 
     def get_fund_rank(self):
         try:
-            df_fund_rank = ak.fund_open_fund_rank_em(self.symbol)
+            if self.limiter is not None:
+                self.limiter.acquire()
+            df_fund_rank = get_provider().fund_open_fund_rank_em(self.symbol)
             if df_fund_rank.empty:
                 print(f"Warning: No data returned for symbol '{self.symbol}'.")
                 return None
@@ -18,17 +25,30 @@ class IndexAnalyzer:
             print(f"Error occurred while fetching data for symbol '{self.symbol}': {e}")
             return None
 
+# 基金类型映射，超过一周才重新下载
+def update_fund_types(root=STORE_ROOT, limiter=None):
+    if not fund_store.types_outdated(root):
+        return fund_store.read_fund_types(root)
+    if limiter is not None:
+        limiter.acquire()
+    fund_types = get_provider().fund_name_em()
+    fund_store.write_fund_types(fund_types, root)
+    print(f"基金类型映射已更新，共 {len(fund_types)} 只基金")
+    return fund_store.read_fund_types(root)
+
+def run(limiter=None, root=STORE_ROOT):
+    # 公募基金下载器
+    result = IndexAnalyzer("全部", limiter=limiter).get_fund_rank()
+    if result is None:
+        raise RuntimeError("公募基金排行下载失败: 全部")
+    fund_types = update_fund_types(root, limiter=limiter)
+
+    fund_rank = fund_store.build_fund_rank(result, fund_types)
+    rows = fund_store.write_fund_rank(fund_rank, root)
+    print(fund_rank['类别'].value_counts().to_string())
+    print("基金排序下载完成！")
+    return rows
+
 # 主函数
 if __name__ == "__main__":
-    # 公募基金下载器
-    symbols = {"全部", "股票型", "混合型", "债券型", "指数型", "QDII", "FOF"}
-    
-    for symbol in symbols:
-        analyzer = IndexAnalyzer(symbol)
-        result = analyzer.get_fund_rank()
-        if result is not None:
-            result.to_csv(f"data/fund_rank_{symbol}.csv")
-            print(f"{symbol} 公募基金数据下载完毕！")
-        else:
-            print(f"{symbol} 公募基金数据下载失败！")
-    print("基金排序下载完成！")
\ No newline at end of file
+    run()
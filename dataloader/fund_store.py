@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from dataloader.storage import PartitionedStore, STORE_ROOT
+
+# 基金净值和公募基金排行存储
+# fund_nav/navs：所有基金的单位净值长表（净值日期索引 + 基金代码列），只追加写入，
+#                每只基金的水位线（已入库的最新净值日期）记录在数据清单中
+# fund_rank/ranks：全部基金的排行（只下载一次“全部”），每只基金带一个“类别”列，
+#                  各类别的排行在本地按类别筛选得到，数值列都是浮点数
+# fund_rank/fund_types：基金代码 -> 基金类型 的映射，每周刷新一次
+NAV_DATASET = "fund_nav/navs"
+FUND_RANK_TABLE = "fund_rank/ranks"
+FUND_TYPES_TABLE = "fund_rank/fund_types"
+TYPES_REFRESH_DAYS = 7
+
+# 页面展示的类别；“全部”表示不筛选
+CATEGORIES = ["全部", "股票型", "混合型", "债券型", "指数型", "QDII", "FOF"]
+NUMERIC_COLUMNS = ['单位净值', '累计净值', '日增长率', '近1周', '近1月', '近3月', '近6月', '近1年', '近2年', '近3年',
+                   '今年来', '成立来']
+
+
+def nav_watermarks(root=STORE_ROOT):
+    # 每只基金已入库的最新净值日期
+    watermarks = PartitionedStore(root).manifest.symbol_last_dates(NAV_DATASET)
+    return watermarks if watermarks is not None else pd.Series(dtype='datetime64[ns]')
+
+
+def append_navs(nav_data, root=STORE_ROOT):
+    """
+    一次写入多只基金的新增净值
+    :param nav_data: 净值日期索引、含基金代码列的长表
+    """
+    if nav_data.empty:
+        return 0
+    nav_data = nav_data.copy()
+    nav_data.index.name = '净值日期'
+    nav_data['基金代码'] = nav_data['基金代码'].astype(str)
+    return PartitionedStore(root).append(NAV_DATASET, nav_data, keys=['基金代码'])
+
+
+def read_nav(symbol, root=STORE_ROOT, columns=None):
+    # 读取单只基金的净值，返回以净值日期为索引的 DataFrame
+    df = PartitionedStore(root).read(NAV_DATASET, columns=columns, filters=ds.field('基金代码') == str(symbol))
+    return df.drop(columns=['基金代码'], errors='ignore')
+
+
+def category_of(fund_types):
+    # 基金类型形如 "混合型-偏股"、"QDII-普通股票"，取 "-" 之前的部分作为类别
+    return fund_types.astype(str).str.split('-', n=1).str[0]
+
+
+def types_outdated(root=STORE_ROOT, now=None):
+    entry = PartitionedStore(root).manifest.get(FUND_TYPES_TABLE)
+    if entry is None or not entry.get("updated"):
+        return True
+    updated = datetime.strptime(entry["updated"], '%Y-%m-%d %H:%M:%S')
+    return (now or datetime.now()) - updated > timedelta(days=TYPES_REFRESH_DAYS)
+
+
+def write_fund_types(fund_types, root=STORE_ROOT):
+    """
+    :param fund_types: 含 基金代码、基金类型 两列的 DataFrame
+    """
+    fund_types = fund_types[['基金代码', '基金类型']].copy()
+    fund_types['基金代码'] = fund_types['基金代码'].astype(str).str.zfill(6)
+    fund_types['基金类型'] = fund_types['基金类型'].fillna('').astype(str)
+    return PartitionedStore(root).write_table(FUND_TYPES_TABLE, fund_types.drop_duplicates('基金代码'))
+
+
+def read_fund_types(root=STORE_ROOT):
+    return PartitionedStore(root).read_table(FUND_TYPES_TABLE)
+
+
+def build_fund_rank(rank_all, fund_types):
+    """
+    把“全部”排行整理为带类型的表，并按映射加上类别列
+    """
+    df = rank_all.drop(columns=['序号'], errors='ignore').copy()
+    df['基金代码'] = df['基金代码'].astype(str).str.zfill(6)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float64)
+    df['日期'] = pd.to_datetime(df['日期'], errors='coerce')
+    df['手续费'] = df['手续费'].astype(str)
+    types = fund_types.set_index('基金代码')['基金类型']
+    df['类别'] = pd.Categorical(category_of(df['基金代码'].map(types).fillna('')))
+    return df
+
+
+def write_fund_rank(df, root=STORE_ROOT):
+    return PartitionedStore(root).write_table(FUND_RANK_TABLE, df)
+
+
+def read_fund_rank(category="全部", root=STORE_ROOT, columns=None):
+    """
+    读取某个类别的基金排行
+    :param category: CATEGORIES 中的类别，“全部”返回所有基金
+    :return: DataFrame，没有数据时返回 None
+    """
+    filters = None if category == "全部" else ds.field('类别') == category
+    return PartitionedStore(root).read_table(FUND_RANK_TABLE, columns=columns, filters=filters)
+
+
+class FundRankIndex:
+    """
+    基金排行的查询层：加载一次后常驻内存
+    收益率列存为 float32 矩阵，类别和手续费存为分类编码，C 类份额标记预先算好，
+    前/后 N 名用 argpartition 部分选择，自选基金按基金代码索引查找
+    """
+    _instances = {}
+
+    def __init__(self, df):
+        df = df.drop_duplicates('基金代码')
+        self.codes = pd.Index(df['基金代码'].astype(str))
+        self.names = df['基金简称'].astype(str).to_numpy()
+        self.dates = pd.to_datetime(df['日期']).to_numpy()
+        self.fees = pd.Categorical(df['手续费'].astype(str))
+        self.categories = pd.Categorical(df['类别'].astype(str))
+        self.columns = [col for col in NUMERIC_COLUMNS if col in df.columns]
+        self.values = df[self.columns].to_numpy(dtype=np.float32)
+        # 剔除 C 类份额时使用的标记（简称中包含 C）
+        self.is_c_share = df['基金简称'].astype(str).str.contains('C', case=False).to_numpy()
+
+    @classmethod
+    def load(cls, root=STORE_ROOT):
+        # 按数据版本复用已加载的实例，排行表更新后自动重新加载
+        store = PartitionedStore(root)
+        version = store.version(FUND_RANK_TABLE)
+        if version is None:
+            return None
+        key = (root, version)
+        if key not in cls._instances:
+            df = store.read_table(FUND_RANK_TABLE)
+            cls._instances = {key: cls(df)}
+        return cls._instances[key]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _mask(self, category, exclude_c):
+        mask = np.ones(len(self), dtype=bool)
+        if category != "全部":
+            code = self.categories.categories.get_indexer([category])[0]
+            mask &= (self.categories.codes == code) if code >= 0 else False
+        if exclude_c:
+            mask &= ~self.is_c_share
+        return mask
+
+    def frame(self, rows, columns=None):
+        """
+        把行号转换为展示用的 DataFrame
+        """
+        data = {'基金代码': self.codes[rows], '基金简称': self.names[rows], '日期': self.dates[rows]}
+        for i, col in enumerate(self.columns):
+            data[col] = self.values[rows, i]
+        data['手续费'] = self.fees[rows]
+        df = pd.DataFrame(data)
+        return df if columns is None else df[columns]
+
+    def top_and_tail(self, column='今年来', n=10, category="全部", exclude_c=True, columns=None):
+        """
+        按某个收益率列取前 n 名和后 n 名，缺失值按 0 处理，两者都按该列降序排列
+        """
+        rows = np.flatnonzero(self._mask(category, exclude_c))
+        values = np.nan_to_num(self.values[rows, self.columns.index(column)], nan=0.0)
+        k = min(n, len(rows))
+        if k == 0:
+            empty = self.frame(rows, columns)
+            return empty, empty
+        top = np.argpartition(-values, k - 1)[:k]
+        tail = np.argpartition(values, k - 1)[:k]
+        top = rows[top[np.argsort(-values[top], kind='stable')]]
+        tail = rows[tail[np.argsort(-values[tail], kind='stable')]]
+        return self.frame(top, columns), self.frame(tail, columns)
+
+    def lookup(self, fund_codes, columns=None):
+        """
+        按基金代码查找，结果按传入的顺序排列，重复和不存在的代码会被忽略
+        """
+        positions = self.codes.get_indexer(list(dict.fromkeys(fund_codes)))
+        return self.frame(positions[positions >= 0], columns)
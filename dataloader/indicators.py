@@ -0,0 +1,233 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# 技术指标库：所有指标都按列在 日期×品种 的二维数组上一次算完，
+# 传入 Series/DataFrame 时返回同样索引的 Series/DataFrame，传入 ndarray 时返回 ndarray
+# 滚动类指标与 pandas rolling(window) 一致：窗口不满或窗口内有缺失值时为 NaN
+# 传入 key（通常是 (数据集名, 数据版本)）时按 key + 指标 + 参数 + 输入的列名和索引类型缓存结果，数据更新后版本变化自动失效
+# 缓存的结果是共享对象，调用方不要原地修改
+CACHE_SIZE = 256
+TRADING_DAYS = 252
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# ---------- 输入输出 ----------
+def _to_2d(values):
+    if isinstance(values, (pd.Series, pd.DataFrame)):
+        arr = values.to_numpy(dtype=np.float64)
+    else:
+        arr = np.asarray(values, dtype=np.float64)
+    return arr.reshape(len(arr), -1)
+
+
+def _wrap(result, like):
+    # 按输入的类型和形状返回结果
+    if isinstance(like, pd.Series):
+        return pd.Series(result[:, 0], index=like.index, name=like.name)
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(result, index=like.index, columns=like.columns)
+    if np.ndim(like) == 1:
+        return result[:, 0]
+    return result
+
+
+def _signature(values):
+    # 输入的列名、索引类型和形状也是缓存键的一部分：同一数据集的不同列、或索引类型不同的调用方不会拿到彼此的结果
+    if isinstance(values, pd.Series):
+        return "series", values.name, str(values.index.dtype), len(values)
+    if isinstance(values, pd.DataFrame):
+        return "frame", tuple(values.columns), str(values.index.dtype), len(values)
+    return "array", np.shape(values)
+
+
+def memoize(key, name, params, compute, like=None):
+    """
+    按 (key, 指标名, 参数, 输入的列名/索引类型/形状) 缓存计算结果
+    :param key: 数据的唯一标识，None 表示不缓存
+    :param like: 指标的输入，用于区分同一 key 下的不同列和不同索引
+    """
+    if key is None:
+        return compute()
+    cache_key = (key, name, params, _signature(like))
+    with _cache_lock:
+        if cache_key in _cache:
+            _cache.move_to_end(cache_key)
+            return _cache[cache_key]
+    result = compute()
+    with _cache_lock:
+        _cache[cache_key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+# ---------- 基础计算 ----------
+def _rolling_sum(arr, window):
+    # 累加和相减得到窗口和，窗口内有 NaN 的位置置为 NaN
+    out = np.full(arr.shape, np.nan)
+    if window > len(arr):
+        return out
+    csum = np.zeros((len(arr) + 1, arr.shape[1]))
+    np.cumsum(np.nan_to_num(arr, nan=0.0), axis=0, out=csum[1:])
+    nans = np.zeros((len(arr) + 1, arr.shape[1]), dtype=np.int64)
+    np.cumsum(np.isnan(arr), axis=0, out=nans[1:])
+    out[window - 1:] = csum[window:] - csum[:-window]
+    out[window - 1:][(nans[window:] - nans[:-window]) > 0] = np.nan
+    return out
+
+
+def _rolling_std(arr, window, ddof=1):
+    # 由 x 和 x² 的滚动和求方差，与 _rolling_sum 一样只占用 O(n) 内存
+    # 先减去每列的均值再平方，避免价格较大时平方和公式的精度损失
+    out = np.full(arr.shape, np.nan)
+    if window > len(arr):
+        return out
+    with np.errstate(invalid='ignore'):
+        centered = arr - np.nan_to_num(np.nanmean(arr, axis=0))
+    sums = _rolling_sum(centered, window)
+    squares = _rolling_sum(centered ** 2, window)
+    variance = (squares - sums ** 2 / window) / (window - ddof)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def _ewm(arr, alpha):
+    # 递推式指数平均，与 pandas ewm(alpha=..., adjust=False) 一致，从每列第一个有效值开始
+    # 缺失值的处理也与 pandas（ignore_na=False）相同：缺失期间旧值的权重继续按 (1 - alpha) 衰减，
+    # 缺失的位置沿用上一个值
+    out = np.full(arr.shape, np.nan)
+    prev = np.full(arr.shape[1], np.nan)
+    old_weight = np.ones(arr.shape[1])
+    for t in range(len(arr)):
+        row = arr[t]
+        valid = ~np.isnan(row)
+        started = ~np.isnan(prev)
+        old_weight = np.where(started, old_weight * (1 - alpha), old_weight)
+        with np.errstate(invalid='ignore'):
+            blended = (old_weight * prev + alpha * row) / (old_weight + alpha)
+        prev = np.where(valid, np.where(started, blended, row), prev)
+        old_weight = np.where(valid, 1.0, old_weight)
+        out[t] = prev
+    return out
+
+
+def _shift(arr, periods=1):
+    out = np.full(arr.shape, np.nan)
+    out[periods:] = arr[:-periods]
+    return out
+
+
+# ---------- 指标 ----------
+def sma(values, window, key=None):
+    """简单移动平均"""
+    return memoize(key, "sma", (window,),
+                   lambda: _wrap(_rolling_sum(_to_2d(values), window) / window, values), values)
+
+
+def moving_averages(values, windows=(20, 50, 200), key=None):
+    """
+    一次计算多条均线
+    :param values: 一维价格序列，或 日期×品种 的二维价格表
+    :return: 一维输入时列为 MA20 / MA50 / MA200 ... 的 DataFrame；
+             二维输入时列为 (MA20, 品种) ... 的两层列索引
+    """
+    def compute():
+        arr = _to_2d(values)
+        index = getattr(values, "index", None)
+        if arr.shape[1] == 1 and np.ndim(values) == 1:
+            return pd.DataFrame({f"MA{w}": (_rolling_sum(arr, w) / w)[:, 0] for w in windows}, index=index)
+        symbols = values.columns if isinstance(values, pd.DataFrame) else pd.RangeIndex(arr.shape[1])
+        frames = {f"MA{w}": pd.DataFrame(_rolling_sum(arr, w) / w, index=index, columns=symbols) for w in windows}
+        return pd.concat(frames, axis=1)
+    return memoize(key, "moving_averages", tuple(windows), compute, values)
+
+
+def ema(values, span, key=None):
+    """指数移动平均，alpha = 2 / (span + 1)"""
+    return memoize(key, "ema", (span,),
+                   lambda: _wrap(_ewm(_to_2d(values), 2 / (span + 1)), values), values)
+
+
+def rolling_std(values, window, key=None):
+    """滚动样本标准差（ddof=1，与 pandas 一致）"""
+    return memoize(key, "rolling_std", (window,),
+                   lambda: _wrap(_rolling_std(_to_2d(values), window), values), values)
+
+
+def bollinger(values, window=20, num_std=2, key=None):
+    """
+    布林轨
+    :return: (中轨, 下轨, 上轨)
+    """
+    def compute():
+        arr = _to_2d(values)
+        mid = _rolling_sum(arr, window) / window
+        std = _rolling_std(arr, window)
+        return _wrap(mid, values), _wrap(mid - num_std * std, values), _wrap(mid + num_std * std, values)
+    return memoize(key, "bollinger", (window, num_std), compute, values)
+
+
+def rsi(values, window=14, key=None):
+    """相对强弱指标，涨跌幅使用 Wilder 平滑（alpha = 1 / window）"""
+    def compute():
+        arr = _to_2d(values)
+        change = arr - _shift(arr)
+        gain = _ewm(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), 1 / window)
+        loss = _ewm(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), 1 / window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = 100 - 100 / (1 + gain / loss)
+        result[:window] = np.nan
+        return _wrap(result, values)
+    return memoize(key, "rsi", (window,), compute, values)
+
+
+def macd(values, fast=12, slow=26, signal=9, key=None):
+    """
+    MACD
+    :return: (DIF, DEA, 柱)
+    """
+    def compute():
+        arr = _to_2d(values)
+        dif = _ewm(arr, 2 / (fast + 1)) - _ewm(arr, 2 / (slow + 1))
+        dea = _ewm(dif, 2 / (signal + 1))
+        return _wrap(dif, values), _wrap(dea, values), _wrap(dif - dea, values)
+    return memoize(key, "macd", (fast, slow, signal), compute, values)
+
+
+def atr(high, low, close, window=14, key=None):
+    """平均真实波幅，真实波幅使用 Wilder 平滑"""
+    def compute():
+        h, l, c = _to_2d(high), _to_2d(low), _to_2d(close)
+        prev_close = _shift(c)
+        true_range = np.fmax(h - l, np.fmax(np.abs(h - prev_close), np.abs(l - prev_close)))
+        result = _ewm(true_range, 1 / window)
+        result[:window - 1] = np.nan
+        return _wrap(result, close)
+    return memoize(key, "atr", (window,), compute, close)
+
+
+def rolling_volatility(values, window=20, annualize=TRADING_DAYS, key=None):
+    """对数收益率的滚动年化波动率"""
+    def compute():
+        arr = _to_2d(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.log(arr / _shift(arr))
+        return _wrap(_rolling_std(returns, window) * np.sqrt(annualize), values)
+    return memoize(key, "rolling_volatility", (window, annualize), compute, values)
+
+
+def drawdown(values, key=None):
+    """相对历史最高点的回撤（0 表示处于新高，-0.2 表示回撤 20%）"""
+    def compute():
+        arr = _to_2d(values)
+        peak = np.fmax.accumulate(arr, axis=0)
+        return _wrap(arr / peak - 1, values)
+    return memoize(key, "drawdown", (), compute, values)
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+# AI 总结的模型调用和结果缓存（不依赖 streamlit，页面和后台任务共用）
+# 缓存键是 消息（系统提示词 + 输入数据）+ 模型 + 温度 的哈希，输入数据没变就直接复用上次的报告；
+# 每份报告保存为 SUMMARY_ROOT 下的一个 JSON 文件，超过有效期后重新生成
+# 接口地址可以用环境变量 OPENAI_BASE_URL_stocks 指向本地的 OpenAI 兼容服务（如 benchmarks/openai_stub.py）
+SUMMARY_ROOT = "data/ai_cache"
+SUMMARY_TTL_HOURS = 24
+MODEL = "deepseek-chat"
+TEMPERATURE = 0.7
+API_KEY_ENV = "OPENAI_API_KEY_stocks"
+BASE_URL_ENV = "OPENAI_BASE_URL_stocks"
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+# 每次调用的 token 用量（请求时带 stream_options.include_usage，最后一段返回用量），一行一条 JSON
+USAGE_LOG_PATH = "data/llm_usage.jsonl"
+# 流式输出的刷新节奏：距上次刷新超过 RENDER_INTERVAL 秒或新增超过 RENDER_MIN_CHARS 个字符才刷新一次
+RENDER_INTERVAL = 0.1
+RENDER_MIN_CHARS = 200
+
+# 同一个接口地址共用一个客户端（复用底层的 HTTP 连接池）
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def api_config():
+    # 返回 (api_key, base_url)，先加载 .env 文件中的环境变量
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv(API_KEY_ENV), os.getenv(BASE_URL_ENV, DEFAULT_BASE_URL)
+
+
+def build_messages(system_prompt, user_content):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def fingerprint(messages, model=MODEL, temperature=TEMPERATURE):
+    payload = json.dumps({"messages": messages, "model": model, "temperature": temperature},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, root=SUMMARY_ROOT, ttl_hours=SUMMARY_TTL_HOURS):
+        self.root = root
+        self.ttl_seconds = ttl_hours * 3600
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def _expired(self, entry, now=None):
+        return (now or time.time()) - entry.get("created", 0) > self.ttl_seconds
+
+    def get(self, key):
+        """
+        :return: {"text", "created", "created_at", "model", "temperature"}，不存在或已过期时返回 None
+        """
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return None if self._expired(entry) else entry
+
+    def put(self, key, text, **meta):
+        os.makedirs(self.root, exist_ok=True)
+        now = time.time()
+        entry = {"text": text, "created": now,
+                 "created_at": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)), **meta}
+        # 先写临时文件再替换，避免并发读到写了一半的文件
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+        return entry
+
+    def purge(self):
+        # 删除过期的报告，返回删除的数量
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    expired = self._expired(json.load(f), now)
+            except (OSError, ValueError):
+                expired = True
+            if expired:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+def record_usage(name, model, usage, first_token=None, elapsed=None, log_path=USAGE_LOG_PATH):
+    """
+    记录一次调用的 token 用量和耗时
+    :param usage: 接口返回的 usage（含 prompt_tokens / completion_tokens），没有返回时为 None
+    :param first_token: 从发出请求到收到第一段文本的秒数
+    :param elapsed: 整个流式响应的秒数
+    """
+    entry = {"时间": time.strftime('%Y-%m-%d %H:%M:%S'), "名称": name, "模型": model,
+             "提示词tokens": getattr(usage, "prompt_tokens", None),
+             "生成tokens": getattr(usage, "completion_tokens", None),
+             "首字耗时(s)": None if first_token is None else round(first_token, 3),
+             "总耗时(s)": None if elapsed is None else round(elapsed, 3)}
+    print(f"[llm] {name}: 提示词 {entry['提示词tokens']} tokens，生成 {entry['生成tokens']} tokens，"
+          f"首字 {entry['首字耗时(s)']}s，总计 {entry['总耗时(s)']}s")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
+
+
+def read_usage(log_path=USAGE_LOG_PATH, limit=500):
+    # 最近 limit 次调用的 token 用量
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, encoding='utf-8') as f:
+        lines = f.readlines()[-limit:]
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def get_client(api_key=None, base_url=None):
+    if api_key is None:
+        api_key, default_url = api_config()
+        base_url = base_url or default_url
+    base_url = base_url or DEFAULT_BASE_URL
+    with _clients_lock:
+        if (api_key, base_url) not in _clients:
+            from openai import OpenAI
+            _clients[(api_key, base_url)] = OpenAI(api_key=api_key, base_url=base_url)
+        return _clients[(api_key, base_url)]
+
+
+def stream_chat(messages, model=MODEL, temperature=TEMPERATURE, api_key=None, base_url=None, name=None,
+                client=None):
+    """
+    流式请求 OpenAI 兼容接口，逐段返回生成的文本，结束后记录 token 用量、首字耗时和总耗时
+    :param client: 不传时使用 get_client 共用的客户端，测试时可以传入假的客户端
+    """
+    client = client or get_client(api_key, base_url)
+    start = time.perf_counter()
+    first_token = None
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        temperature=temperature,
+        stream_options={"include_usage": True},
+    )
+    usage = None
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            yield chunk.choices[0].delta.content
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+    record_usage(name, model, usage, first_token, time.perf_counter() - start)
+
+
+def render_stream(chunks, render, interval=RENDER_INTERVAL, min_chars=RENDER_MIN_CHARS):
+    """
+    分批渲染流式文本，避免每收到一段就把全部内容重新发送一遍
+    :param chunks: 逐段返回文本的迭代器（如 stream_chat）
+    :param render: render(目前的全部文本, 是否已结束)
+    :return: 完整文本
+    """
+    parts, pending = [], 0
+    last = time.perf_counter()
+    for text in chunks:
+        parts.append(text)
+        pending += len(text)
+        now = time.perf_counter()
+        if now - last >= interval or pending >= min_chars:
+            render("".join(parts), False)
+            last, pending = now, 0
+    full_response = "".join(parts)
+    render(full_response, True)
+    return full_response
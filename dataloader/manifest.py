@@ -0,0 +1,149 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+import pandas as pd
+
+# 数据清单：记录每个数据集（以及带股票代码键的数据集中每只股票）的
+# 起止日期、行数、schema 版本和校验和，每次写入存储时同步更新
+# 判断是否需要下载时只读这个小文件，不再加载整张表
+MANIFEST_FILE = "_manifest.json"
+SCHEMA_VERSION = 1
+
+_lock = threading.Lock()
+
+
+def _fmt(ts):
+    return None if ts is None or pd.isna(ts) else pd.Timestamp(ts).strftime('%Y-%m-%d')
+
+
+def frame_checksum(df):
+    # 按行内容计算的哈希，与行顺序无关
+    if df.empty:
+        return hashlib.sha1(b"").hexdigest()
+    row_hash = pd.util.hash_pandas_object(df, index=True).values
+    return hashlib.sha1(row_hash.sum(dtype='uint64').tobytes()).hexdigest()
+
+
+class Manifest:
+    def __init__(self, root):
+        self.path = os.path.join(root, MANIFEST_FILE)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, entries):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get(self, dataset):
+        return self.load().get(dataset)
+
+    def last_date(self, dataset, symbol=None):
+        entry = self.get(dataset)
+        if entry is None:
+            return None
+        if symbol is not None:
+            entry = entry.get("symbols", {}).get(symbol)
+            if entry is None:
+                return None
+        return pd.Timestamp(entry["last_date"]) if entry.get("last_date") else None
+
+    def symbol_last_dates(self, dataset):
+        entry = self.get(dataset)
+        if entry is None or "symbols" not in entry:
+            return None
+        return pd.Series({symbol: pd.Timestamp(info["last_date"]) for symbol, info in entry["symbols"].items()},
+                         dtype='datetime64[ns]')
+
+    def record_append(self, dataset, df, index_name, symbol_column=None):
+        """
+        追加写入后更新清单：起止日期取并集，行数累加，校验和按批次链式累积
+        :param df: 本次写入的行（日期为普通列）
+        :param symbol_column: 数据集中区分股票的列，提供时同时维护每只股票的统计
+        """
+        dates = pd.to_datetime(df[index_name])
+        with _lock:
+            entries = self.load()
+            entry = entries.get(dataset, {"rows": 0, "checksum": ""})
+            _merge_span(entry, dates.min(), dates.max(), len(df))
+            entry["checksum"] = hashlib.sha1((entry["checksum"] + frame_checksum(df)).encode()).hexdigest()
+            entry["columns"] = [col for col in df.columns if col != index_name]
+            entry["schema_version"] = SCHEMA_VERSION
+            entry["updated"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if symbol_column is not None:
+                symbols = entry.setdefault("symbols", {})
+                stats = pd.DataFrame({"symbol": df[symbol_column].astype(str), "date": dates}) \
+                    .groupby("symbol")["date"].agg(["min", "max", "count"])
+                for symbol, row in stats.iterrows():
+                    symbols[symbol] = _merge_span(symbols.get(symbol, {"rows": 0}),
+                                                  row["min"], row["max"], int(row["count"]))
+            entries[dataset] = entry
+            self._save(entries)
+
+    def record_snapshot(self, dataset, df, index_name=None, symbol_column=None):
+        """
+        用完整数据重建一个条目（整表写入、合并小文件、迁移后调用）
+        """
+        with _lock:
+            entries = self.load()
+            entry = {
+                "rows": len(df),
+                "checksum": frame_checksum(df),
+                "columns": [col for col in df.columns if col != index_name],
+                "schema_version": SCHEMA_VERSION,
+                "updated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            if index_name is not None and not df.empty:
+                dates = pd.to_datetime(df[index_name])
+                entry["first_date"] = _fmt(dates.min())
+                entry["last_date"] = _fmt(dates.max())
+                if symbol_column is not None:
+                    stats = pd.DataFrame({"symbol": df[symbol_column].astype(str), "date": dates}) \
+                        .groupby("symbol")["date"].agg(["min", "max", "count"])
+                    entry["symbols"] = {symbol: {"first_date": _fmt(row["min"]), "last_date": _fmt(row["max"]),
+                                                 "rows": int(row["count"])}
+                                        for symbol, row in stats.iterrows()}
+            entries[dataset] = entry
+            self._save(entries)
+
+    def remove(self, dataset):
+        with _lock:
+            entries = self.load()
+            if entries.pop(dataset, None) is not None:
+                self._save(entries)
+
+    def to_frame(self):
+        # 数据新鲜度面板使用的汇总表
+        rows = []
+        for dataset, entry in sorted(self.load().items()):
+            rows.append({
+                "数据集": dataset,
+                "起始日期": entry.get("first_date"),
+                "最新日期": entry.get("last_date"),
+                "行数": entry.get("rows"),
+                "股票数": len(entry["symbols"]) if "symbols" in entry else None,
+                "schema版本": entry.get("schema_version"),
+                "校验和": (entry.get("checksum") or "")[:12],
+                "更新时间": entry.get("updated"),
+            })
+        return pd.DataFrame(rows)
+
+
+def _merge_span(info, first, last, rows):
+    # 把一批新数据的日期范围和行数合并进已有统计
+    if info.get("first_date"):
+        first = min(first, pd.Timestamp(info["first_date"]))
+    if info.get("last_date"):
+        last = max(last, pd.Timestamp(info["last_date"]))
+    info["first_date"] = _fmt(first)
+    info["last_date"] = _fmt(last)
+    info["rows"] = info.get("rows", 0) + rows
+    return info
@@ -0,0 +1,108 @@
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader.storage import PartitionedStore, STORE_ROOT
+from dataloader import stock_store, fund_store
+
+# 旧的 HDF5 文件 -> 分区存储中的数据集前缀，每个 key 迁移为 <前缀>/<key>
+H5_DATASETS = {
+    "data/index_data.h5": "index_data",
+    "data/us_etf.h5": "us_etf",
+}
+FUND_H5 = "data/fund_human.h5"
+
+
+def migrate_h5(h5_path, prefix, root=STORE_ROOT, overwrite=False):
+    store = PartitionedStore(root)
+    migrated = 0
+    with pd.HDFStore(h5_path, mode='r') as h5:
+        for key in h5.keys():
+            dataset = f"{prefix}/{key.lstrip('/')}"
+            if store.exists(dataset):
+                if not overwrite:
+                    print(f"跳过已存在的数据集 {dataset}")
+                    continue
+                store.drop(dataset)
+            df = h5[key]
+            df.index = pd.to_datetime(df.index)
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+            rows = store.append(dataset, df)
+            store.compact(dataset)
+            print(f"{h5_path}:{key} -> {dataset}，{rows} 行")
+            migrated += 1
+    return migrated
+
+
+def migrate_index_all(old_path="data/index_all.h5", root=STORE_ROOT):
+    # 把旧的 index_all.h5（每个指数一份成份股数据）迁移为共享存储
+    members = {}
+    frames = []
+    with pd.HDFStore(old_path, mode='r') as store:
+        for key in store.keys():
+            df = store[key]
+            members[key.split('sym_')[-1]] = df['股票代码'].astype(str).unique().tolist()
+            frames.append(df)
+    if not frames:
+        return
+    all_df = pd.concat(frames).reset_index().drop_duplicates(subset=['日期', '股票代码'], keep='last')
+    all_df = all_df.sort_values(['股票代码', '日期']).set_index('日期')
+    stock_store.append_stocks(all_df, root)
+    stock_store.write_membership(members, root)
+    print(f"迁移完成：{len(members)} 个指数，{all_df['股票代码'].nunique()} 只股票")
+
+
+def migrate_fund_nav(root=STORE_ROOT, h5_path=FUND_H5):
+    """
+    把旧的 fund_human.h5（每只基金一个 sym_<代码>）合并为一张基金净值长表
+    """
+    if not os.path.exists(h5_path):
+        return 0
+    frames = []
+    with pd.HDFStore(h5_path, mode='r') as h5:
+        for key in h5.keys():
+            frames.append(h5[key].assign(基金代码=key.split('sym_')[-1]))
+    if not frames:
+        return 0
+    navs = pd.concat(frames)
+    navs.index = pd.to_datetime(navs.index)
+    navs.index.name = '净值日期'
+    navs = navs.reset_index().drop_duplicates(subset=['净值日期', '基金代码'], keep='last').set_index('净值日期')
+    rows = fund_store.append_navs(navs, root)
+    PartitionedStore(root).compact(fund_store.NAV_DATASET)
+    print(f"基金净值 -> {fund_store.NAV_DATASET}，{navs['基金代码'].nunique()} 只基金，{rows} 行")
+    return rows
+
+
+def migrate_all(root=STORE_ROOT, overwrite=False):
+    for h5_path, prefix in H5_DATASETS.items():
+        if os.path.exists(h5_path):
+            migrate_h5(h5_path, prefix, root, overwrite)
+
+    if overwrite:
+        PartitionedStore(root).drop(fund_store.NAV_DATASET)
+    if not PartitionedStore(root).exists(fund_store.NAV_DATASET):
+        migrate_fund_nav(root)
+    else:
+        print(f"跳过已存在的数据集 {fund_store.NAV_DATASET}")
+
+    # 成份股数据：从旧的 index_all.h5 迁移为共享个股存储
+    if not os.path.exists("data/index_all.h5"):
+        return
+    if PartitionedStore(root).exists(stock_store.STOCKS_DATASET) and not overwrite:
+        print(f"跳过已存在的数据集 {stock_store.STOCKS_DATASET}")
+        return
+    store = PartitionedStore(root)
+    store.drop(stock_store.STOCKS_DATASET)
+    migrate_index_all("data/index_all.h5", root)
+    store.compact(stock_store.STOCKS_DATASET)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 data/ 下的 HDF5 文件迁移到分区 Parquet 存储")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的数据集")
+    args = parser.parse_args()
+    migrate_all(overwrite=args.overwrite)
+    print("迁移完成.")
@@ -0,0 +1,40 @@
+import os
+import threading
+
+# 数据源：下载器都通过 get_provider() 调用与 akshare 同名、同参数、同列结构的接口
+# 默认使用 akshare；设置环境变量 BSTOCKS_PROVIDER=synthetic 或调用 set_provider() 可以换成
+# 离线的模拟数据源（dataloader/synthetic_provider.py），用于压测和故障复现
+PROVIDER_ENV = "BSTOCKS_PROVIDER"
+
+_provider = None
+_lock = threading.Lock()
+
+
+def make_provider(name="akshare", **kwargs):
+    if name == "akshare":
+        import akshare
+        return akshare
+    if name == "synthetic":
+        from dataloader.synthetic_provider import SyntheticProvider
+        return SyntheticProvider(**kwargs)
+    raise ValueError(f"不支持的数据源: {name}")
+
+
+def get_provider():
+    global _provider
+    with _lock:
+        if _provider is None:
+            _provider = make_provider(os.getenv(PROVIDER_ENV, "akshare"))
+        return _provider
+
+
+def set_provider(provider):
+    """
+    替换当前数据源
+    :param provider: akshare 模块、SyntheticProvider 实例等，None 表示恢复按环境变量选择
+    :return: 原来的数据源
+    """
+    global _provider
+    with _lock:
+        previous, _provider = _provider, provider
+        return previous
@@ -0,0 +1,460 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader import fund_store, indicators, llm
+from dataloader.fund_price_downloader import FUND_SYMBOLS
+from dataloader.storage import PartitionedStore, STORE_ROOT
+from dataloader.us_dataloader import US_ETF_SYMBOLS
+
+# AI 报告：提示词和输入数据的构造（页面和批量任务共用，保证同样的数据得到同样的缓存键），
+# 以及数据下载完成后批量预先生成报告的任务
+# 批量任务并发请求所有复盘表格、美股 ETF 和基金的总结（asyncio，最多 MAX_CONCURRENCY 个同时进行），
+# 结果写入 llm.SummaryCache，页面打开时直接显示；有效期内已生成的报告不会重复请求
+MAX_CONCURRENCY = 4
+HISTORY_DAYS = 240
+# 单个品种的报告只发送关键指标和抽样后的走势，不再发送 240 行全部列
+SAMPLE_STEP = 5          # 走势序列每 5 个交易日取一个点
+CROSS_LOOKBACK = 21      # 统计最近一个月内的均线交叉
+MA_COLUMNS = ['MA20', 'MA50', 'MA200']
+
+# 每日复盘的统计表：名称 -> (文件路径, 代码列)
+STATISTICS_FILES = {
+    "index_statistics": ("data/index_statistics.csv", '指数代码'),
+    "etf_statistics1": ("data/etf_statistics1.csv", 'ETF代码'),
+    "etf_statistics2": ("data/etf_statistics2.csv", 'ETF代码'),
+    "etf_statistics3": ("data/etf_statistics3.csv", 'ETF代码'),
+}
+# 百分数列（1.23 表示 1.23%）
+PERCENT_COLUMNS = ["涨跌幅", "今日涨幅", "近1周涨幅", "近30天涨幅"]
+
+
+# ---------- 输入数据 ----------
+def read_statistics(path, code_column):
+    # 统计数据中的数值列都是浮点数，格式只在展示时处理
+    df = pd.read_csv(path, index_col=0, dtype={code_column: str})
+    df[code_column] = df[code_column].str.zfill(6)
+    # 兼容旧版本写入的 "1.23%" 字符串
+    for col in PERCENT_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = pd.to_numeric(df[col].str.rstrip('%'), errors='coerce')
+    return df
+
+
+def us_etf_dataset(symbol):
+    return f"us_etf/sym_{symbol.replace('.', '_')}"
+
+
+def recent_with_ma(df, price_column, key=None, days=HISTORY_DAYS):
+    # 最近 days 个交易日的数据加上 MA20/MA50/MA200
+    df = df.copy()
+    df.index = df.index.astype(str)
+    df = df.join(indicators.moving_averages(df[price_column], key=key))
+    return df.iloc[-days:].reset_index()
+
+
+def market_content(df):
+    return f"这是最新的股票或ETF情况:\n\n{df.to_string()}"
+
+
+def _pct_change(price, periods):
+    if len(price) <= periods or not price[-periods - 1]:
+        return np.nan
+    return (price[-1] / price[-periods - 1] - 1) * 100
+
+
+def _crosses(dates, fast, slow, fast_name, slow_name, lookback=CROSS_LOOKBACK):
+    # fast 与 slow 的差值变号的位置就是交叉点，只看最近 lookback 个交易日
+    sign = np.sign(fast - slow)
+    valid = ~np.isnan(sign[1:]) & ~np.isnan(sign[:-1]) & (sign[1:] != 0)
+    changed = np.flatnonzero(valid & (sign[1:] != sign[:-1])) + 1
+    changed = changed[changed >= len(sign) - lookback]
+    return [f"{dates[i]} {fast_name}{'上穿' if sign[i] > 0 else '下穿'}{slow_name}" for i in changed]
+
+
+def feature_digest(df, price_column, volume_column=None):
+    """
+    把最近一段时间的数据压缩为提示词需要的信号
+    :param df: recent_with_ma 的结果（第一列是日期，含价格列和 MA20/MA50/MA200）
+    :return: {指标: 值}
+    """
+    dates = df.iloc[:, 0].astype(str).to_numpy()
+    price = df[price_column].to_numpy(dtype=np.float64)
+    valid = price[~np.isnan(price)]
+    last, low, high = price[-1], valid.min(), valid.max()
+    digest = {
+        "最新日期": dates[-1],
+        "最新价": last,
+        "区间最高": high,
+        "区间最低": low,
+        "区间位置(%)": (last - low) / (high - low) * 100 if high > low else 50.0,
+        "价格分位(%)": (valid <= last).mean() * 100,
+        "近1月涨跌(%)": _pct_change(price, 21),
+        "近3月涨跌(%)": _pct_change(price, 63),
+        "区间涨跌(%)": _pct_change(price, len(price) - 1),
+        "区间最大回撤(%)": np.nanmin(indicators.drawdown(price)) * 100,
+    }
+    ma = {col: df[col].to_numpy(dtype=np.float64) for col in MA_COLUMNS}
+    for col in MA_COLUMNS:
+        digest[col] = ma[col][-1]
+        digest[f"相对{col}(%)"] = (last / ma[col][-1] - 1) * 100
+    ma20, ma50, ma200 = (ma[col][-1] for col in MA_COLUMNS)
+    digest["均线排列"] = "多头排列" if ma20 > ma50 > ma200 else "空头排列" if ma20 < ma50 < ma200 else "交织"
+
+    crosses = []
+    for col in MA_COLUMNS:
+        crosses += _crosses(dates, price, ma[col], "价格", col)
+    crosses += _crosses(dates, ma['MA20'], ma['MA50'], "MA20", "MA50")
+    crosses += _crosses(dates, ma['MA50'], ma['MA200'], "MA50", "MA200")
+    digest["近1月均线交叉"] = "；".join(sorted(crosses)) or "无"
+
+    if volume_column is not None and volume_column in df.columns:
+        volume = df[volume_column].to_numpy(dtype=np.float64)
+        ratio = np.nanmean(volume[-20:]) / np.nanmean(volume[-60:])
+        digest["近20日/近60日均量"] = ratio
+        digest["成交量趋势"] = "放量" if ratio > 1.2 else "缩量" if ratio < 0.8 else "持平"
+    return digest
+
+
+def digest_text(digest):
+    lines = []
+    for name, value in digest.items():
+        if isinstance(value, (float, np.floating)):
+            value = "无数据" if np.isnan(value) else f"{value:.3f}"
+        lines.append(f"- {name}: {value}")
+    return "\n".join(lines)
+
+
+def sampled_series(df, price_column, step=SAMPLE_STEP):
+    # 从最新一天往前每 step 个交易日取一个点，保留日期、价格和三条均线
+    sampled = df.iloc[::-step].iloc[::-1]
+    return sampled[[df.columns[0], price_column, *MA_COLUMNS]].to_csv(index=False, float_format='%.3f')
+
+
+def us_etf_content(symbol, index_df, key=None):
+    pro_df = recent_with_ma(index_df, '收盘', key=key)
+    return (f"这是名为{symbol} etf情况，最近240个交易日的关键指标如下:\n\n"
+            f"{digest_text(feature_digest(pro_df, '收盘', volume_column='成交量'))}\n\n"
+            f"每{SAMPLE_STEP}个交易日取样的走势:\n\n{sampled_series(pro_df, '收盘')}")
+
+
+def fund_content(symbol, nav_df, key=None):
+    pro_df = recent_with_ma(nav_df, '单位净值', key=key)
+    return (f"这是名为{symbol} 基金的净值情况，最近240日净值的关键指标如下:\n\n"
+            f"{digest_text(feature_digest(pro_df, '单位净值'))}\n\n"
+            f"每{SAMPLE_STEP}个交易日取样的净值走势:\n\n{sampled_series(pro_df, '单位净值')}")
+
+
+def report_requests(root=STORE_ROOT):
+    """
+    批量生成的报告列表
+    :return: [(名称, messages), ...]，缺少数据的品种会被跳过
+    """
+    requests = []
+    for name, (path, code_column) in STATISTICS_FILES.items():
+        if os.path.exists(path):
+            requests.append((name, llm.build_messages(MARKET_PROMPT, market_content(read_statistics(path, code_column)))))
+
+    store = PartitionedStore(root)
+    for symbol in dict.fromkeys(US_ETF_SYMBOLS):
+        if store.exists(us_etf_dataset(symbol)):
+            content = us_etf_content(symbol, store.read(us_etf_dataset(symbol)))
+            requests.append((f"us_{symbol}", llm.build_messages(US_ETF_PROMPT, content)))
+
+    if store.exists(fund_store.NAV_DATASET):
+        for symbol in dict.fromkeys(FUND_SYMBOLS):
+            nav_df = fund_store.read_nav(symbol, root)
+            if not nav_df.empty:
+                requests.append((f"fund_{symbol}", llm.build_messages(FUND_PROMPT, fund_content(symbol, nav_df))))
+    return requests
+
+
+# ---------- 批量生成 ----------
+async def _complete(client, semaphore, name, messages, model, temperature):
+    async with semaphore:
+        start = time.perf_counter()
+        first_token = None
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            temperature=temperature,
+            stream_options={"include_usage": True},
+        )
+        text, usage = "", None
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                text += chunk.choices[0].delta.content
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+        llm.record_usage(name, model, usage, first_token, time.perf_counter() - start)
+        return text
+
+
+async def generate_reports(requests, cache, api_key, base_url, model=llm.MODEL, temperature=llm.TEMPERATURE,
+                           max_concurrency=MAX_CONCURRENCY, client=None):
+    """
+    并发生成缓存中没有的报告
+    :param client: 不传时按 api_key/base_url 新建 AsyncOpenAI 客户端，用完关闭；测试时可以传入假的异步客户端
+    :return: (生成的数量, 命中缓存的数量, {名称: 错误})
+    """
+    pending = []
+    for name, messages in requests:
+        key = llm.fingerprint(messages, model, temperature)
+        if cache.get(key) is None:
+            pending.append((name, key, messages))
+    cached = len(requests) - len(pending)
+    if not pending:
+        return 0, cached, {}
+
+    own_client = client is None
+    if own_client:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*[_complete(client, semaphore, name, messages, model, temperature)
+                                     for name, _, messages in pending], return_exceptions=True)
+    if own_client:
+        await client.close()
+
+    generated, failures = 0, {}
+    for (name, key, _), result in zip(pending, results):
+        if isinstance(result, Exception):
+            failures[name] = f"{type(result).__name__}: {result}"
+        elif result:
+            cache.put(key, result, model=model, temperature=temperature, name=name)
+            generated += 1
+        else:
+            failures[name] = "返回内容为空"
+    return generated, cached, failures
+
+
+def run(limiter=None, root=STORE_ROOT, max_concurrency=MAX_CONCURRENCY, dry_run=False):
+    # AI 报告任务不访问行情接口，limiter 只为与其他任务保持同样的调用方式
+    requests = report_requests(root)
+    if dry_run:
+        cache = llm.SummaryCache()
+        missing = [name for name, messages in requests if cache.get(llm.fingerprint(messages)) is None]
+        print(f"共 {len(requests)} 份报告，需要生成 {len(missing)} 份: {', '.join(missing)}")
+        return {"rows": 0, "calls_avoided": len(requests) - len(missing)}
+
+    api_key, base_url = llm.api_config()
+    if not api_key:
+        print(f"未设置 {llm.API_KEY_ENV}，跳过 AI 报告生成")
+        return {"rows": 0, "calls_avoided": 0}
+
+    cache = llm.SummaryCache()
+    removed = cache.purge()
+    generated, cached, failures = asyncio.run(
+        generate_reports(requests, cache, api_key, base_url, max_concurrency=max_concurrency))
+    print(f"AI 报告：生成 {generated} 份，有效期内已有 {cached} 份，清理过期 {removed} 份")
+    if failures:
+        raise RuntimeError(f"{len(failures)} 份报告生成失败: " +
+                           "; ".join(f"{name}: {error}" for name, error in failures.items()))
+    return {"rows": generated, "calls_avoided": cached}
+
+
+# ---------- 提示词 ----------
+# 每日复盘统计表
+MARKET_PROMPT = '''\
+### 角色 
+你是投资专家。根据用户提供的数据，简要总结市场情况，并给出基于数据特点的提醒和后续操作建议。
+## 技能 
+### 技能 1：市场总结 
+- 分析用户提供的数据，识别市场的主要趋势和变化。
+- 用简明的语言总结市场情况，确保普通投资者能理解。
+
+### 技能 2：投资提醒 
+- 根据市场总结，给出在投资时需注意的要点和潜在风险。
+- 提供具体的提醒，帮助投资者做出明智决定。
+
+### 技能 3：操作建议
+- 根据数据特点，给出后续的投资操作建议。
+- 确保建议有实际操作性，适合不同风险偏好的投资者。
+
+## 限制
+- 只回答与市场总结、投资提醒和操作建议相关的问题。
+- 内容使用markdown格式，标题只需要文本加粗即可。
+- 遵循用户提供的数据和语言，请勿添加不相关的信息。
+- 确保总结和建议简洁明了。
+'''
+
+# 单只美股 ETF
+US_ETF_PROMPT = '''\
+### 角色 
+你是投资专家。根据用户提供的数据，简要分析该ETF最近240个交易日的情况，特别关注当前价格的位置在整体里的情况，同时结合MA20，MA50，MA200，三个均线指标以及成交量分析近期变化，确认后续是否买入卖出或持有，并给出基于数据特点的提醒和后续操作建议，特别要关注最近一个月的表现情况。
+## 技能 
+### 技能 1：市场总结 
+- 分析用户提供的数据，识别股票的主要趋势和变化。
+- 用简明的语言总结市场情况，确保普通投资者能理解。
+- 根据均线理论：20日均线、50日均线和200日均线是技术分析中常用的移动平均线指标，它们分别代表不同时间周期的市场平均成本，帮助投资者判断市场趋势和交易时机。以下是这些均线的一些常见交易理论：
+
+    20日均线（短期趋势）：
+
+    短期趋势判断：20日均线通常用于判断短期市场的趋势。当股价位于20日均线之上时，表明短期市场趋势偏多；反之，则偏空。
+
+    交易信号：股价上穿20日均线可能被视为买入信号，而下穿则可能被视为卖出信号。
+
+    50日均线（中期趋势）：
+
+    中期趋势判断：50日均线用于判断中期市场的趋势。股价位于50日均线之上，通常表明中期市场趋势偏多；反之，则偏空。
+
+    交易信号：股价上穿50日均线可能被视为较强的买入信号，而下穿则可能被视为较强的卖出信号。
+
+    200日均线（长期趋势）：
+
+    长期趋势判断：200日均线用于判断长期市场的趋势。股价位于200日均线之上，通常表明长期市场趋势偏多；反之，则偏空。
+
+    交易信号：股价上穿200日均线可能被视为非常强的买入信号，而下穿则可能被视为非常强的卖出信号。
+
+    综合应用：
+
+    金叉与死叉：当短期均线（如20日均线）上穿长期均线（如50日或200日均线）时，形成“金叉”，通常被视为买入信号；反之，短期均线下穿长期均线形成“死叉”，通常被视为卖出信号。
+
+    支撑与阻力：均线也可以作为支撑和阻力的参考。例如，股价在下跌过程中遇到200日均线可能会反弹，而在上涨过程中遇到200日均线可能会回落。
+
+    注意事项：
+
+    市场环境：不同的市场环境（如牛市、熊市、震荡市）对均线的反应可能不同，因此需要结合其他技术指标和市场信息综合判断。
+
+    风险管理：均线交易理论并非绝对准确，实际操作中应结合风险管理策略，如设置止损点，以控制潜在的亏损。
+
+    这些交易理论在实际应用中需要结合个人的交易策略和市场分析，灵活运用。
+- 结合成交量来分析20日均线、50日均线和200日均线的交易理论。成交量是衡量市场活跃度和趋势强度的关键指标，与均线结合使用时，根据用户提供的数据提供更全面的市场分析。以下是一些结合成交量的交易理论：
+
+    1. **成交量确认趋势**：
+    - **上涨趋势**：当股价位于20日、50日或200日均线之上，并且成交量逐渐放大，表明上涨趋势得到成交量的支持，趋势可能更加可靠。
+    - **下跌趋势**：当股价位于20日、50日或200日均线之下，并且成交量逐渐放大，表明下跌趋势得到成交量的支持，趋势可能更加可靠。
+
+    2. **成交量确认突破**：
+    - **均线突破**：当股价突破20日、50日或200日均线时，如果伴随着成交量的显著增加，突破信号的可靠性更高。例如，股价上穿200日均线且成交量放大，可能预示着长期上涨趋势的开始。
+    - **均线回踩**：在股价回踩均线时，如果成交量减少，可能表明卖压减弱，股价有可能再次上涨。
+
+    3. **成交量与均线交叉**：
+    - **金叉**：当20日均线上穿50日或200日均线时，如果伴随着成交量的增加，金叉信号的强度和可靠性更高。
+    - **死叉**：当20日均线下穿50日或200日均线时，如果伴随着成交量的增加，死叉信号的强度和可靠性更高。
+
+    4. **成交量与均线支撑/阻力**：
+    - **支撑**：当股价在下跌过程中遇到20日、50日或200日均线并反弹时，如果成交量增加，支撑的有效性更高。
+    - **阻力**：当股价在上涨过程中遇到20日、50日或200日均线并回落时，如果成交量增加，阻力的有效性更高。
+
+    **注意事项**：
+    - **成交量的一致性**：在分析成交量时，应关注其与价格变动的一致性。例如，价格上涨时成交量应增加，价格下跌时成交量应减少。
+    - **成交量的高低**：成交量的绝对值也很重要。高成交量通常表明市场参与度高，趋势可能更持久；低成交量可能表明市场参与度低，趋势可能较弱。
+
+    结合成交量和均线进行交易决策时，应综合考虑多个因素，包括市场环境、其他技术指标和基本面分析，以制定更全面和稳健的交易策略。
+
+### 技能 2：投资提醒 
+- 根据市场总结，给出在投资时需注意的要点和潜在风险。
+- 提供具体的提醒，帮助投资者做出明智决定。
+
+### 技能 3：操作建议
+- 根据均线理论和结合成交量情况，给出后续的投资操作建议。
+- 确保建议有实际操作性，适合不同风险偏好的投资者。
+
+## 限制
+- 只回答与市场总结、投资提醒和操作建议相关的问题。
+- 内容使用markdown格式，标题只需要文本加粗即可。
+- 遵循用户提供的数据和语言，请勿添加不相关的信息。
+- 确保总结和建议简洁明了。
+'''
+
+# 单只基金
+FUND_PROMPT = '''\
+### 角色 
+你是基金投资专家。根据用户提供的基金历史净值数据，简要分析该基金最近240个净值走势的情况，特别关注当前价格的位置在整体里的情况，同时结合MA20，MA50，MA200，三个均线指标近期变化，确认后续是否买入卖出或持有，并给出基于数据特点的提醒和后续操作建议，特别要关注最近一个月的表现情况。
+## 技能 
+### 技能 1：市场总结 
+- 分析用户提供的数据，识别股票的主要趋势和变化。
+- 用简明的语言总结市场情况，确保普通投资者能理解。
+- 根据均线理论：20日均线、50日均线和200日均线是技术分析中常用的移动平均线指标，它们分别代表不同时间周期的市场平均成本，帮助投资者判断市场趋势和交易时机。以下是这些均线的一些常见交易理论：
+
+    20日均线（短期趋势）：
+
+    短期趋势判断：20日均线通常用于判断短期市场的趋势。当股价位于20日均线之上时，表明短期市场趋势偏多；反之，则偏空。
+
+    交易信号：股价上穿20日均线可能被视为买入信号，而下穿则可能被视为卖出信号。
+
+    50日均线（中期趋势）：
+
+    中期趋势判断：50日均线用于判断中期市场的趋势。股价位于50日均线之上，通常表明中期市场趋势偏多；反之，则偏空。
+
+    交易信号：股价上穿50日均线可能被视为较强的买入信号，而下穿则可能被视为较强的卖出信号。
+
+    200日均线（长期趋势）：
+
+    长期趋势判断：200日均线用于判断长期市场的趋势。股价位于200日均线之上，通常表明长期市场趋势偏多；反之，则偏空。
+
+    交易信号：股价上穿200日均线可能被视为非常强的买入信号，而下穿则可能被视为非常强的卖出信号。
+
+    综合应用：
+
+    金叉与死叉：当短期均线（如20日均线）上穿长期均线（如50日或200日均线）时，形成“金叉”，通常被视为买入信号；反之，短期均线下穿长期均线形成“死叉”，通常被视为卖出信号。
+
+    支撑与阻力：均线也可以作为支撑和阻力的参考。例如，股价在下跌过程中遇到200日均线可能会反弹，而在上涨过程中遇到200日均线可能会回落。
+
+    注意事项：
+
+    市场环境：不同的市场环境（如牛市、熊市、震荡市）对均线的反应可能不同，因此需要结合其他技术指标和市场信息综合判断。
+
+    风险管理：均线交易理论并非绝对准确，实际操作中应结合风险管理策略，如设置止损点，以控制潜在的亏损。
+
+    这些交易理论在实际应用中需要结合个人的交易策略和市场分析，灵活运用。
+
+
+### 技能 2：投资提醒 
+- 根据市场总结，给出在投资时需注意的要点和潜在风险。
+- 提供具体的提醒，帮助投资者做出明智决定。
+
+### 技能 3：操作建议
+- 根据均线理论及自身走势，给出后续的投资操作建议。
+- 确保建议有实际操作性，适合不同风险偏好的投资者。
+
+## 限制
+- 只回答与市场总结、投资提醒和操作建议相关的问题。
+- 内容使用markdown格式，标题只需要文本加粗即可。
+- 遵循用户提供的数据和语言，请勿添加不相关的信息。
+- 确保总结和建议简洁明了。
+'''
+
+# 自选基金和组合
+PORTFOLIO_PROMPT = '''\
+# 角色
+你是投资专家，擅长分析投资组合，并给出建议。你能够简要总结基金数据情况，并基于数据提供后续操作建议。
+
+## 技能
+### 技能 1: 总结数据情况
+- 读取用户提供的基金数据。
+- 简要总结数据情况，组合中持仓有的数量，今年来上涨的的数量，下跌的数量，近3月上涨的的数量，下跌的数量，同时特别分析在'近1周', '近1月', '近3月','今年来'的情况，结合日增长率，观察是否有可能反转，不用一一列举，说明整个组合的情况及其中特殊的情况即可。
+
+### 技能 2: 基于数据的操作建议
+- 分析总结后的数据，识别所有异常数据（例如，显著的增长或亏损）。
+- 针对这些异常情况，建议适当的投资组合调整或操作策略。
+- 格式例子:
+=====
+-  组合操作建议：
+- 操作有：增持，减持，清仓
+-  建议将 <基金代码> 进行 <操作>，因为 <原因>。
+-  <其他操作建议，原因，同上>
+=====
+
+## 限制:
+- 格式要尽量简明扼要。
+- 内容使用markdown格式，标题只需要文本加粗即可。
+- 仅回答与基金数据总结和投资建议相关的问题。如果遇到其他领域的提问，不予回答。
+'''
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量生成 AI 报告")
+    parser.add_argument("--dry-run", action="store_true", help="只列出需要生成的报告，不发请求")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="最多同时进行的请求数")
+    args = parser.parse_args()
+    run(max_concurrency=args.concurrency, dry_run=args.dry_run)
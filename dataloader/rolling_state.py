@@ -0,0 +1,128 @@
+import os
+import uuid
+import numpy as np
+import pandas as pd
+
+# 移动平均的增量状态：每只股票保存最近 max(windows) 个收盘价的环形缓冲区、
+# 每个窗口的滚动和以及已有的观测数，新增一个交易日只需 O(股票数 × 窗口数) 的更新，
+# 不需要重新读取历史数据
+# 均线按每只股票自己的交易日计算（停牌日不占窗口），与 breadth.rolling_means 一致
+
+
+class RollingState:
+    def __init__(self, windows, symbols=(), buffer=None, counts=None, sums=None, symbol_dates=None, last_date=None):
+        self.windows = tuple(int(w) for w in windows)
+        self.capacity = max(self.windows)
+        self.symbols = pd.Index(list(symbols), dtype=object)
+        n = len(self.symbols)
+        self.buffer = buffer if buffer is not None else np.full((self.capacity, n), np.nan)
+        self.counts = counts if counts is not None else np.zeros(n, dtype=np.int64)
+        self.sums = sums if sums is not None else np.zeros((len(self.windows), n))
+        self.symbol_dates = symbol_dates if symbol_dates is not None else np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.last_date = pd.Timestamp(last_date) if last_date is not None else None
+
+    # ---------- 更新 ----------
+    def _add_symbols(self, symbols):
+        new = pd.Index(symbols).difference(self.symbols)
+        if new.empty:
+            return
+        n = len(new)
+        self.symbols = self.symbols.append(pd.Index(new, dtype=object))
+        self.buffer = np.hstack([self.buffer, np.full((self.capacity, n), np.nan)])
+        self.counts = np.concatenate([self.counts, np.zeros(n, dtype=np.int64)])
+        self.sums = np.hstack([self.sums, np.zeros((len(self.windows), n))])
+        self.symbol_dates = np.concatenate([self.symbol_dates, np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')])
+
+    def update(self, date, closes):
+        """
+        追加一个交易日
+        :param closes: 以股票代码为索引的当日收盘价，当天停牌的股票不出现
+        :return: (当日有数据的股票位置, {窗口: 当日均线})，均线未形成时为 NaN
+        """
+        closes = closes.dropna()
+        self._add_symbols(closes.index)
+        cols = self.symbols.get_indexer(closes.index)
+        values = closes.to_numpy(dtype=np.float64)
+        counts = self.counts[cols]
+
+        means = {}
+        for i, window in enumerate(self.windows):
+            # 窗口已满时减去滑出窗口的那个收盘价
+            full = counts >= window
+            outgoing = np.where(full, self.buffer[(counts - window) % self.capacity, cols], 0.0)
+            self.sums[i, cols] += values - outgoing
+            means[window] = np.where(counts + 1 >= window, self.sums[i, cols] / window, np.nan)
+
+        self.buffer[counts % self.capacity, cols] = values
+        self.counts[cols] = counts + 1
+        self.symbol_dates[cols] = np.datetime64(pd.Timestamp(date))
+        self.last_date = pd.Timestamp(date)
+        return cols, means
+
+    def breadth(self, date, closes):
+        """
+        追加一个交易日并返回当天收盘价高于各均线的股票百分比
+        """
+        closes = closes.dropna()
+        if closes.empty:
+            self.last_date = pd.Timestamp(date)
+            return {window: np.nan for window in self.windows}
+        _, means = self.update(date, closes)
+        values = closes.to_numpy(dtype=np.float64)
+        return {window: float((values > ma).sum() / len(values) * 100) for window, ma in means.items()}
+
+    def current_means(self):
+        # 每只股票最近一个交易日的均线
+        result = {}
+        for i, window in enumerate(self.windows):
+            result[f"MA{window}"] = np.where(self.counts >= window, self.sums[i] / window, np.nan)
+        return pd.DataFrame(result, index=self.symbols)
+
+    # ---------- 构建 ----------
+    @classmethod
+    def from_panel(cls, panel, windows, symbols=None, value_column='收盘', symbol_column='股票代码'):
+        """
+        用长表的完整历史初始化状态
+        :param panel: 日期索引、含股票代码列的长表
+        :param symbols: 状态中包含的全部股票，其中还没有数据的股票观测数为 0
+        """
+        state = cls(windows)
+        df = panel[[symbol_column, value_column]].dropna().reset_index()
+        date_column = df.columns[0]
+        df = df.sort_values([symbol_column, date_column], kind='stable')
+        state._add_symbols(pd.Index(df[symbol_column].unique()).union(pd.Index(symbols if symbols is not None else [])))
+        for symbol, group in df.groupby(symbol_column, sort=False):
+            col = state.symbols.get_loc(symbol)
+            values = group[value_column].to_numpy(dtype=np.float64)
+            count = len(values)
+            tail = values[-state.capacity:]
+            # 按环形缓冲区的位置放入最近的收盘价
+            state.buffer[np.arange(count - len(tail), count) % state.capacity, col] = tail
+            state.counts[col] = count
+            for i, window in enumerate(state.windows):
+                state.sums[i, col] = values[-window:].sum()
+            state.symbol_dates[col] = np.datetime64(group[date_column].iloc[-1])
+        if not df.empty:
+            state.last_date = pd.Timestamp(df[date_column].max())
+        return state
+
+    # ---------- 持久化 ----------
+    def save(self, path):
+        # 先写临时文件再改名，避免中断时留下损坏的状态文件
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp-{uuid.uuid4().hex[:8]}.npz")
+        np.savez(tmp_path, windows=np.array(self.windows), symbols=np.array(self.symbols, dtype=str),
+                 buffer=self.buffer, counts=self.counts, sums=self.sums, symbol_dates=self.symbol_dates,
+                 last_date=np.array([np.datetime64(self.last_date) if self.last_date is not None else np.datetime64('NaT')],
+                                    dtype='datetime64[ns]'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            last_date = data["last_date"][0]
+            return cls(data["windows"].tolist(), data["symbols"].tolist(), buffer=data["buffer"],
+                       counts=data["counts"], sums=data["sums"], symbol_dates=data["symbol_dates"],
+                       last_date=None if np.isnat(last_date) else last_date)
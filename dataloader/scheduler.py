@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from dataloader.fetcher import TokenBucket
+
+RUN_LOG_PATH = "data/run_log.json"
+RUN_LOG_KEEP = 30   # 运行日志保留的最近次数
+
+
+# 单个数据任务：func(limiter=...) 返回写入的行数，
+# 或 {"rows": 行数, "calls_avoided": 按交易日历省掉的请求数}
+class Job:
+    def __init__(self, name, func, deps=(), rate_group=None):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.rate_group = rate_group
+
+
+class Scheduler:
+    """
+    进程内的任务调度器：按依赖关系并发执行数据任务
+    同一 rate_group 的任务共用一个令牌桶，依赖失败的任务会被跳过
+    """
+
+    def __init__(self, jobs, rate_limits=None, max_workers=4, log_path=RUN_LOG_PATH):
+        self.jobs = {job.name: job for job in jobs}
+        self.max_workers = max_workers
+        self.log_path = log_path
+        self.limiters = {group: TokenBucket(rate) for group, rate in (rate_limits or {}).items()}
+        for job in jobs:
+            for dep in job.deps:
+                if dep not in self.jobs:
+                    raise ValueError(f"任务 {job.name} 依赖的 {dep} 不存在")
+        self._check_cycles()
+
+    def _check_cycles(self):
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"任务依赖存在环: {name}")
+            visiting.add(name)
+            for dep in self.jobs[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.jobs:
+            visit(name)
+
+    def _run_job(self, job):
+        start = time.perf_counter()
+        limiter = self.limiters.get(job.rate_group)
+        try:
+            output = job.func(limiter=limiter)
+            if not isinstance(output, dict):
+                output = {"rows": output}
+            return {"status": "success", "wall_time": round(time.perf_counter() - start, 2),
+                    "rows": int(output.get("rows") or 0),
+                    "calls_avoided": int(output.get("calls_avoided") or 0), "error": None}
+        except Exception as e:
+            traceback.print_exc()
+            return {"status": "failed", "wall_time": round(time.perf_counter() - start, 2),
+                    "rows": 0, "calls_avoided": 0, "error": f"{type(e).__name__}: {e}"}
+
+    def run(self, only=None):
+        """
+        执行任务
+        :param only: 只执行这些任务（及其未成功的依赖之外的部分），None 表示全部
+        :return: 本次运行记录
+        """
+        selected = set(self.jobs) if only is None else set(only)
+        unknown = sorted(selected - set(self.jobs))
+        if unknown:
+            raise ValueError(f"不存在的任务: {', '.join(unknown)}，可选: {', '.join(self.jobs)}")
+        results = {}
+        pending = {name for name in self.jobs if name in selected}
+        running = {}
+        started = datetime.now()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # 依赖失败或被跳过的任务直接标记为跳过
+                for name in sorted(pending):
+                    failed_deps = [dep for dep in self.jobs[name].deps
+                                   if results.get(dep, {}).get("status") in ("failed", "skipped")]
+                    if failed_deps:
+                        results[name] = {"status": "skipped", "wall_time": 0, "rows": 0, "calls_avoided": 0,
+                                         "error": f"依赖任务未成功: {', '.join(failed_deps)}"}
+                        pending.discard(name)
+                        print(f"[{name}] 跳过：依赖任务未成功")
+
+                # 提交所有依赖已满足的任务；不在本次范围内的依赖视为已满足
+                ready = [name for name in sorted(pending)
+                         if all(dep not in selected or results.get(dep, {}).get("status") == "success"
+                                for dep in self.jobs[name].deps)]
+                for name in ready:
+                    print(f"[{name}] 开始运行")
+                    running[executor.submit(self._run_job, self.jobs[name])] = name
+                    pending.discard(name)
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    result = results[name]
+                    print(f"[{name}] {result['status']}，耗时 {result['wall_time']}s，写入 {result['rows']} 行，"
+                          f"跳过 {result['calls_avoided']} 次请求")
+
+        record = {
+            "started": started.strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_time": round((datetime.now() - started).total_seconds(), 2),
+            "jobs": results,
+        }
+        self._append_log(record)
+        return record
+
+    def failed_jobs(self):
+        # 最近一次运行中失败或被跳过的任务
+        runs = read_run_log(self.log_path)
+        if not runs:
+            return []
+        return [name for name, result in runs[-1]["jobs"].items()
+                if result["status"] in ("failed", "skipped") and name in self.jobs]
+
+    def _append_log(self, record):
+        runs = read_run_log(self.log_path)
+        runs.append(record)
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            json.dump(runs[-RUN_LOG_KEEP:], f, ensure_ascii=False, indent=2)
+
+
+def read_run_log(log_path=RUN_LOG_PATH):
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, encoding="utf-8") as f:
+        return json.load(f)
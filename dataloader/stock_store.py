@@ -0,0 +1,83 @@
+import pandas as pd
+import pyarrow.dataset as ds
+
+from dataloader.storage import PartitionedStore, STORE_ROOT
+
+# 个股历史数据共享存储：所有指数的成份股只存一份，按股票代码区分
+# stock_hist/stocks：按年分区的长表（日期索引 + 股票代码列），只追加写入
+# stock_hist/membership：指数代码 -> 股票代码 的成份关系
+# 每只股票已入库的最新日期（水位线）记录在数据清单中，用于增量下载和断点续传
+STOCKS_DATASET = "stock_hist/stocks"
+MEMBERSHIP_TABLE = "stock_hist/membership"
+
+
+def read_membership(root=STORE_ROOT):
+    membership = PartitionedStore(root).read_table(MEMBERSHIP_TABLE)
+    if membership is None:
+        return pd.DataFrame(columns=['指数代码', '股票代码'])
+    return membership
+
+
+def write_membership(index_members, root=STORE_ROOT):
+    """
+    覆盖写入成份关系
+    :param index_members: {指数代码: [股票代码, ...]}，未出现的指数保留原有成份
+    """
+    membership = read_membership(root)
+    membership = membership[~membership['指数代码'].isin(list(index_members))]
+    new_rows = pd.DataFrame(
+        [(index_code, str(stock)) for index_code, stocks in index_members.items() for stock in stocks],
+        columns=['指数代码', '股票代码'])
+    membership = pd.concat([membership, new_rows], ignore_index=True).drop_duplicates()
+    PartitionedStore(root).write_table(MEMBERSHIP_TABLE, membership)
+    return membership
+
+
+def index_members(index_code, root=STORE_ROOT):
+    membership = read_membership(root)
+    return membership.loc[membership['指数代码'] == index_code, '股票代码'].tolist()
+
+
+def stock_last_dates(root=STORE_ROOT):
+    # 只读取日期和股票代码两列，得到每只股票的最新日期
+    df = PartitionedStore(root).read(STOCKS_DATASET, columns=['股票代码'])
+    if df.empty:
+        return pd.Series(dtype='datetime64[ns]')
+    return df.reset_index().groupby('股票代码')['日期'].max()
+
+
+def read_watermarks(root=STORE_ROOT):
+    """
+    从数据清单读取每只股票的水位线（已入库的最新日期）
+    清单中没有记录时，从个股数据中推算一次
+    """
+    watermarks = PartitionedStore(root).manifest.symbol_last_dates(STOCKS_DATASET)
+    if watermarks is None:
+        return stock_last_dates(root)
+    return watermarks
+
+
+def append_stocks(stock_data, root=STORE_ROOT):
+    """
+    追加写入个股数据，写入后数据清单中这些股票的水位线随之推进
+    """
+    if stock_data.empty:
+        return 0
+    stock_data = stock_data.copy()
+    stock_data.index.name = '日期'
+    stock_data['股票代码'] = stock_data['股票代码'].astype(str)
+    return PartitionedStore(root).append(STOCKS_DATASET, stock_data, keys=['股票代码'])
+
+
+def read_stocks(stock_codes, root=STORE_ROOT, columns=None, start=None):
+    # 读取时按股票代码过滤，只扫描需要的列和分区
+    return PartitionedStore(root).read(STOCKS_DATASET, columns=columns, start=start,
+                                       filters=ds.field('股票代码').isin(list(stock_codes)))
+
+
+def read_index_panel(index_code, root=STORE_ROOT, columns=None, start=None):
+    """
+    通过成份关系和共享个股数据拼出指定指数的成份股面板
+    :return: 日期索引、含股票代码列的长表
+    """
+    return read_stocks(index_members(index_code, root), root, columns=columns, start=start)
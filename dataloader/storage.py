@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import uuid
+import glob
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from dataloader.manifest import Manifest
+
+# 只追加的分区 Parquet 存储
+# 每个数据集一个目录，按年（或月）分区，每次写入只新增一个 part 文件：
+#   data/store/<dataset>/year=2024/part-<时间戳>-<随机串>.parquet
+# 读取时按 keys 去重（同一键保留最后写入的一行），compact() 把分区内的小文件合并成一个
+# 小表（成份关系、预计算的衍生序列等）整表保存为 data/store/<name>.parquet
+# 每次写入都会同步更新 data/store/_manifest.json（见 manifest.py）
+STORE_ROOT = "data/store"
+META_FILE = "_meta.json"
+
+
+def _atomic_write_table(table, path):
+    # 先写临时文件再改名，避免中断时留下半个 parquet 文件
+    # 临时文件以 "." 开头，读取数据集时会被自动忽略
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp-{uuid.uuid4().hex[:8]}")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _part_name():
+    return f"part-{time.time_ns()}-{uuid.uuid4().hex[:6]}.parquet"
+
+
+def _normalize(df):
+    # 各批次的列类型必须一致，数值列统一为 float64，其余列统一为字符串
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        if pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype('float64')
+        else:
+            df[col] = df[col].astype(str)
+    return df
+
+
+class PartitionedStore:
+    def __init__(self, root=STORE_ROOT):
+        self.root = root
+        self.manifest = Manifest(root)
+
+    def dataset_path(self, dataset):
+        return os.path.join(self.root, *dataset.split('/'))
+
+    def table_path(self, name):
+        return os.path.join(self.root, *name.split('/')) + ".parquet"
+
+    # ---------- 元数据 ----------
+    def read_meta(self, dataset):
+        path = os.path.join(self.dataset_path(dataset), META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_meta(self, dataset, meta):
+        path = os.path.join(self.dataset_path(dataset), META_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def exists(self, dataset):
+        return self.read_meta(dataset) is not None
+
+    def datasets(self):
+        metas = glob.glob(os.path.join(self.root, "**", META_FILE), recursive=True)
+        return sorted(os.path.relpath(os.path.dirname(p), self.root).replace(os.sep, '/') for p in metas)
+
+    def _partition_dirs(self, dataset, meta):
+        key = meta["partition"]
+        pattern = os.path.join(self.dataset_path(dataset), f"{key}=*")
+        return sorted(glob.glob(pattern), key=lambda p: int(p.rsplit('=', 1)[-1]))
+
+    # ---------- 写入 ----------
+    def append(self, dataset, df, keys=None, partition="year"):
+        """
+        追加写入一批数据，只新增 part 文件，不改写已有数据
+        :param dataset: 数据集名称，如 "index_data/sym_000300"
+        :param df: 以日期为索引的 DataFrame
+        :param keys: 去重键中除日期外的列，如 ['股票代码']；只在第一次写入时记录
+        :param partition: "year" 或 "month"，只在第一次写入时记录
+        :return: 写入的行数
+        """
+        if df is None or df.empty:
+            return 0
+        index_name = df.index.name or '日期'
+        meta = self.read_meta(dataset)
+        if meta is None:
+            meta = {"index": index_name, "keys": [index_name] + list(keys or []), "partition": partition}
+            self._write_meta(dataset, meta)
+        elif self.manifest.get(dataset) is None:
+            # 清单出现之前写入的数据集，先补建清单条目，累加才有意义
+            self.refresh_manifest(dataset)
+
+        df = _normalize(df.reset_index().rename(columns={df.index.name or 'index': meta["index"]}))
+        dates = pd.to_datetime(df[meta["index"]])
+        df[meta["index"]] = dates
+        if meta["partition"] == "month":
+            part_values = dates.dt.year * 100 + dates.dt.month
+        else:
+            part_values = dates.dt.year
+
+        for value, group in df.groupby(part_values):
+            path = os.path.join(self.dataset_path(dataset), f"{meta['partition']}={value}", _part_name())
+            _atomic_write_table(pa.Table.from_pandas(group, preserve_index=False), path)
+        self.manifest.record_append(dataset, df, meta["index"], symbol_column=_symbol_column(meta))
+        return len(df)
+
+    def write_table(self, name, df, index_name=None):
+        # 小表整表覆盖写入；index_name 为日期列名时，清单中同时记录起止日期
+        _atomic_write_table(pa.Table.from_pandas(df, preserve_index=False), self.table_path(name))
+        self.manifest.record_snapshot(name, df, index_name)
+        return len(df)
+
+    def read_table(self, name, columns=None, filters=None):
+        # filters 为 pyarrow 表达式，读取时只解码满足条件的行
+        path = self.table_path(name)
+        if not os.path.exists(path):
+            return None
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+
+    # ---------- 读取 ----------
+    def read(self, dataset, columns=None, start=None, end=None, filters=None):
+        """
+        读取数据集，返回以日期为索引、按日期排序并去重后的 DataFrame
+        :param columns: 只读取这些列（日期索引和去重键会自动带上）
+        :param start/end: 日期范围，会同时用于分区裁剪
+        :param filters: pyarrow 表达式，如 ds.field('股票代码').isin([...])
+        """
+        meta = self.read_meta(dataset)
+        if meta is None:
+            return pd.DataFrame()
+        index_name, part_key = meta["index"], meta["partition"]
+        dataset_obj = ds.dataset(self.dataset_path(dataset), format="parquet", partitioning="hive",
+                                 exclude_invalid_files=True)
+
+        expr = filters
+        if start is not None:
+            start = pd.Timestamp(start)
+            start_part = start.year * 100 + start.month if part_key == "month" else start.year
+            cond = (ds.field(part_key) >= start_part) & (ds.field(index_name) >= start)
+            expr = cond if expr is None else expr & cond
+        if end is not None:
+            end = pd.Timestamp(end)
+            end_part = end.year * 100 + end.month if part_key == "month" else end.year
+            cond = (ds.field(part_key) <= end_part) & (ds.field(index_name) <= end)
+            expr = cond if expr is None else expr & cond
+
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(meta["keys"] + list(columns)))
+        table = dataset_obj.to_table(columns=read_columns, filter=expr)
+        df = table.to_pandas()
+        if part_key in df.columns:
+            df = df.drop(columns=[part_key])
+        if df.empty:
+            return df.set_index(index_name)
+
+        # 同一键保留最后写入的一行（part 文件名按写入时间排序）
+        df = df.drop_duplicates(subset=meta["keys"], keep='last')
+        df = df.sort_values(meta["keys"], kind='stable').set_index(index_name)
+        return df
+
+    def last_date(self, dataset):
+        # 优先读取数据清单；清单中没有时只读取最新分区的日期列，开销与历史长度无关
+        last_date = self.manifest.last_date(dataset)
+        if last_date is not None:
+            return last_date
+        meta = self.read_meta(dataset)
+        if meta is None:
+            return None
+        part_dirs = self._partition_dirs(dataset, meta)
+        if not part_dirs:
+            return None
+        table = ds.dataset(part_dirs[-1], format="parquet", exclude_invalid_files=True).to_table(columns=[meta["index"]])
+        if table.num_rows == 0:
+            return None
+        return pd.Timestamp(table.column(0).to_pandas().max())
+
+    def version(self, dataset):
+        # 数据版本：清单中的校验和，每次写入都会变化，用于指标缓存的失效判断
+        entry = self.manifest.get(dataset)
+        return None if entry is None else entry.get("checksum")
+
+    # ---------- 维护 ----------
+    def compact(self, dataset):
+        """
+        把每个分区内的多个 part 文件合并为一个，并按去重键去重
+        :return: 合并的分区数
+        """
+        meta = self.read_meta(dataset)
+        if meta is None:
+            return 0
+        compacted = 0
+        for part_dir in self._partition_dirs(dataset, meta):
+            files = sorted(glob.glob(os.path.join(part_dir, "part-*.parquet")))
+            if len(files) <= 1:
+                continue
+            df = pd.concat([pq.read_table(f).to_pandas() for f in files], ignore_index=True)
+            df = df.drop_duplicates(subset=meta["keys"], keep='last').sort_values(meta["keys"], kind='stable')
+            # 先写合并后的文件再删除旧文件，中断时最多留下重复行，读取时会去重
+            _atomic_write_table(pa.Table.from_pandas(df, preserve_index=False), os.path.join(part_dir, _part_name()))
+            for f in files:
+                os.remove(f)
+            compacted += 1
+        if compacted:
+            self.refresh_manifest(dataset)
+        return compacted
+
+    def refresh_manifest(self, dataset):
+        # 用数据集的完整内容重建清单条目，修正追加过程中累积的行数偏差
+        meta = self.read_meta(dataset)
+        if meta is None:
+            return
+        df = self.read(dataset).reset_index()
+        self.manifest.record_snapshot(dataset, df, meta["index"], symbol_column=_symbol_column(meta))
+
+    def drop(self, dataset):
+        path = self.dataset_path(dataset)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        self.manifest.remove(dataset)
+
+
+def _symbol_column(meta):
+    # 去重键为 [日期, 股票代码] 这类形式时，清单中额外记录每只股票的统计
+    return meta["keys"][1] if len(meta["keys"]) == 2 else None
+
+
+if __name__ == "__main__":
+    # 合并所有数据集的小文件，并重建数据清单
+    store = PartitionedStore()
+    for name in store.datasets():
+        count = store.compact(name)
+        if count:
+            print(f"{name}: 合并了 {count} 个分区")
+        else:
+            store.refresh_manifest(name)
+    print("存储合并完成.")
@@ -0,0 +1,228 @@
+import time
+import zlib
+import random
+import threading
+from collections import Counter, deque
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from dataloader.trade_calendar import us_sessions
+
+# 离线模拟数据源：接口名、参数和返回的列与 akshare 一致，数据由代码和随机种子确定，
+# 同一品种每次返回的历史完全相同（增量下载可以正确衔接）
+# 可以模拟接口延迟、随机错误和限流（超过每秒请求数或按比例返回 429），用于压测下载流程和复现故障
+HIST_COLUMNS = ['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
+RANK_COLUMNS = ['序号', '基金代码', '基金简称', '日期', '单位净值', '累计净值', '日增长率', '近1周', '近1月', '近3月',
+                '近6月', '近1年', '近2年', '近3年', '今年来', '成立来', '手续费']
+FUND_TYPES = ["股票型", "混合型-偏股", "混合型-灵活", "债券型-长债", "指数型-股票", "QDII-普通股票", "FOF-稳健型"]
+
+
+class ThrottledError(ConnectionError):
+    """模拟接口返回 429 Too Many Requests"""
+
+
+class SyntheticProvider:
+    def __init__(self, seed=0, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, max_rps=None,
+                 n_stocks=1000, n_constituents=300, n_funds=2000, start="2015-01-05"):
+        """
+        :param latency: 每次调用的固定延迟（秒）
+        :param jitter: 额外的随机延迟上限（秒）
+        :param error_rate: 随机抛出 ConnectionError 的比例
+        :param throttle_rate: 随机返回限流（ThrottledError）的比例
+        :param max_rps: 每秒最多处理的请求数，超过的请求返回限流，None 表示不限
+        :param n_stocks: 股票池大小，各指数的成份股从中抽取
+        :param n_constituents: 每个指数的成份股数量
+        :param n_funds: 基金排行中的基金数量
+        """
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.n_stocks = n_stocks
+        self.n_constituents = n_constituents
+        self.n_funds = n_funds
+        self.start = pd.Timestamp(start)
+        self.calls = Counter()
+        self.errors = Counter()
+        self.throttled = Counter()
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._history = {}
+
+    # ---------- 故障模拟 ----------
+    def _request(self, name):
+        with self._lock:
+            self.calls[name] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            draw = self._random.random()
+            now = time.monotonic()
+            over_limit = False
+            if self.max_rps is not None:
+                while self._recent and now - self._recent[0] > 1:
+                    self._recent.popleft()
+                over_limit = len(self._recent) >= self.max_rps
+                if not over_limit:
+                    self._recent.append(now)
+        if delay:
+            time.sleep(delay)
+        if over_limit or draw < self.throttle_rate:
+            with self._lock:
+                self.throttled[name] += 1
+            raise ThrottledError(f"429 Too Many Requests: {name}")
+        if draw < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.errors[name] += 1
+            raise ConnectionError(f"模拟的网络错误: {name}")
+
+    def stats(self):
+        with self._lock:
+            return {"calls": sum(self.calls.values()), "errors": sum(self.errors.values()),
+                    "throttled": sum(self.throttled.values()), "by_api": dict(self.calls)}
+
+    # ---------- 数据生成 ----------
+    def _rng(self, *key):
+        return np.random.default_rng([self.seed, zlib.crc32("/".join(map(str, key)).encode('utf-8'))])
+
+    def _sessions(self, market):
+        today = pd.Timestamp(datetime.now().date())
+        if market == "us":
+            days = us_sessions(self.start.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d'))
+        else:
+            days = pd.bdate_range(self.start, today)
+        return days[days <= today]
+
+    def _ohlcv(self, kind, symbol, market="cn"):
+        # 每个品种的完整历史只生成一次
+        key = (kind, symbol, market)
+        with self._lock:
+            cached = self._history.get(key)
+        if cached is not None:
+            return cached
+        rng = self._rng(kind, symbol)
+        days = self._sessions(market)
+        n = len(days)
+        base = float(rng.uniform(5, 500))
+        change = rng.normal(0.0003, 0.015, n)
+        close = base * np.exp(np.cumsum(change))
+        prev_close = np.concatenate([[base], close[:-1]])
+        open_ = prev_close * (1 + rng.normal(0, 0.005, n))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, n)))
+        volume = rng.lognormal(13, 0.4, n).round()
+        df = pd.DataFrame({
+            '日期': days.date,
+            '开盘': open_.round(2),
+            '收盘': close.round(2),
+            '最高': high.round(2),
+            '最低': low.round(2),
+            '成交量': volume.astype(np.int64),
+            '成交额': (volume * close).round(2),
+            '振幅': ((high - low) / prev_close * 100).round(2),
+            '涨跌幅': ((close / prev_close - 1) * 100).round(2),
+            '涨跌额': (close - prev_close).round(2),
+            '换手率': rng.uniform(0.1, 5, n).round(2),
+        }, columns=HIST_COLUMNS)
+        with self._lock:
+            self._history[key] = df
+        return df
+
+    @staticmethod
+    def _between(df, start_date, end_date, column='日期'):
+        dates = pd.to_datetime(df[column])
+        mask = (dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))
+        return df[mask.to_numpy()].reset_index(drop=True)
+
+    def _fund_codes(self):
+        rng = self._rng("fund_codes")
+        return [f"{code:06d}" for code in np.sort(rng.choice(1_000_000, self.n_funds, replace=False))]
+
+    # ---------- 与 akshare 同名的接口 ----------
+    def index_zh_a_hist(self, symbol="000859", period="daily", start_date="19700101", end_date="22220101"):
+        self._request("index_zh_a_hist")
+        return self._between(self._ohlcv("index", symbol), start_date, end_date)
+
+    def stock_zh_a_hist(self, symbol="000001", period="daily", start_date="19700101", end_date="20500101",
+                        adjust=""):
+        self._request("stock_zh_a_hist")
+        df = self._between(self._ohlcv("stock", symbol), start_date, end_date)
+        df.insert(1, '股票代码', symbol)
+        return df
+
+    def index_stock_cons(self, symbol="399639"):
+        self._request("index_stock_cons")
+        rng = self._rng("cons", symbol)
+        codes = np.sort(rng.choice(self.n_stocks, min(self.n_constituents, self.n_stocks), replace=False))
+        return pd.DataFrame({
+            '品种代码': [f"{code:06d}" for code in codes],
+            '品种名称': [f"股票{code:06d}" for code in codes],
+            '纳入日期': self.start.date(),
+        })
+
+    def stock_us_hist(self, symbol="105.MSFT", period="daily", start_date="19700101", end_date="22220101",
+                      adjust=""):
+        self._request("stock_us_hist")
+        df = self._between(self._ohlcv("us", symbol, market="us"), start_date, end_date)
+        df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
+        return df
+
+    def fund_etf_hist_em(self, symbol="159707", period="daily", start_date="19700101", end_date="20500101",
+                         adjust=""):
+        self._request("fund_etf_hist_em")
+        return self._between(self._ohlcv("etf", symbol), start_date, end_date)
+
+    def fund_open_fund_info_em(self, symbol="710001", indicator="单位净值走势", period="成立来"):
+        self._request("fund_open_fund_info_em")
+        hist = self._ohlcv("fund", symbol)
+        nav = (hist['收盘'] / hist['收盘'].iloc[0]).round(4)
+        return pd.DataFrame({
+            '净值日期': hist['日期'],
+            '单位净值': nav,
+            '日增长率': (nav.pct_change() * 100).round(2).fillna(0.0),
+        })
+
+    def fund_open_fund_rank_em(self, symbol="全部"):
+        self._request("fund_open_fund_rank_em")
+        codes = self._fund_codes()
+        rng = self._rng("fund_rank", symbol)
+        n = len(codes)
+        returns = {col: rng.normal(0, scale, n).round(2) for col, scale in
+                   [('近1周', 2), ('近1月', 4), ('近3月', 8), ('近6月', 12), ('近1年', 20), ('近2年', 28),
+                    ('近3年', 35), ('今年来', 15), ('成立来', 60)]}
+        # 成立时间较短的基金没有长期收益
+        for col, ratio in [('近2年', 0.15), ('近3年', 0.25), ('近1年', 0.05)]:
+            returns[col][rng.random(n) < ratio] = np.nan
+        nav = rng.uniform(0.5, 4, n).round(4)
+        df = pd.DataFrame({
+            '序号': np.arange(1, n + 1),
+            '基金代码': codes,
+            '基金简称': [f"模拟基金{code}{'C' if i % 3 == 0 else 'A'}" for i, code in enumerate(codes)],
+            '日期': self._sessions("cn")[-1].date(),
+            '单位净值': nav,
+            '累计净值': (nav * rng.uniform(1, 2, n)).round(4),
+            '日增长率': rng.normal(0, 1, n).round(2),
+            **returns,
+            '手续费': np.where(rng.random(n) < 0.3, "0.00%", "0.15%"),
+        }, columns=RANK_COLUMNS)
+        return df.sort_values('今年来', ascending=False, na_position='last').assign(序号=np.arange(1, n + 1))
+
+    def fund_name_em(self):
+        self._request("fund_name_em")
+        codes = self._fund_codes()
+        rng = self._rng("fund_name")
+        return pd.DataFrame({
+            '基金代码': codes,
+            '拼音缩写': [f"MNJJ{code}" for code in codes],
+            '基金简称': [f"模拟基金{code}" for code in codes],
+            '基金类型': rng.choice(FUND_TYPES, len(codes)),
+            '拼音全称': [f"MONIJIJIN{code}" for code in codes],
+        })
+
+    def tool_trade_date_hist_sina(self):
+        self._request("tool_trade_date_hist_sina")
+        # 与 akshare 一样包含当年剩余的交易日
+        days = pd.bdate_range(self.start, f"{datetime.now().year}-12-31")
+        return pd.DataFrame({'trade_date': days.date})
@@ -0,0 +1,152 @@
+import os
+import shutil
+import argparse
+from datetime import datetime, timedelta
+import pandas as pd
+from pandas.tseries.holiday import (AbstractHolidayCalendar, Holiday, GoodFriday, USMartinLutherKingJr,
+                                    USPresidentsDay, USMemorialDay, USLaborDay, USThanksgivingDay,
+                                    nearest_workday, sunday_to_monday)
+
+# 本地交易日历：判断某个日期之前最近一个应有数据的交易日，已是最新的品种直接跳过网络请求
+# 优先使用 data/calendar/ 下的缓存，其次使用随代码发布的 dataloader/calendar/ 下的文件，
+# 都没有覆盖到的日期按周一到周五处理
+CACHE_DIR = "data/calendar"
+BUNDLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calendar")
+MARKETS = ("cn", "us")
+
+
+# 纽交所休市规则（元旦逢周六不补休）
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday('NewYearsDay', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('IndependenceDay', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+# 纽交所临时休市日
+NYSE_SPECIAL_CLOSURES = [
+    "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",   # 9·11
+    "2004-06-11",   # 里根国葬
+    "2007-01-02",   # 福特国葬
+    "2012-10-29", "2012-10-30",   # 飓风桑迪
+    "2018-12-05",   # 老布什国葬
+    "2025-01-09",   # 卡特国葬
+]
+
+
+def us_sessions(start="2000-01-01", end=None):
+    # 按规则生成美股交易日
+    end = end or f"{datetime.now().year + 1}-12-31"
+    holidays = NYSEHolidayCalendar().holidays(start, end)
+    holidays = holidays.union(pd.DatetimeIndex(NYSE_SPECIAL_CLOSURES))
+    days = pd.bdate_range(start, end)
+    return days[~days.isin(holidays)]
+
+
+def fetch_cn_sessions():
+    # 从新浪获取A股交易日历（包含当年剩余的交易日）
+    from dataloader.providers import get_provider
+    dates = get_provider().tool_trade_date_hist_sina()['trade_date']
+    return pd.DatetimeIndex(pd.to_datetime(dates))
+
+
+def _read_dates(path):
+    if not os.path.exists(path):
+        return None
+    return pd.DatetimeIndex(pd.to_datetime(pd.read_csv(path)['trade_date']))
+
+
+def _write_dates(sessions, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame({'trade_date': sessions.strftime('%Y-%m-%d')}).to_csv(path, index=False)
+
+
+class TradeCalendar:
+    def __init__(self, market="cn", cache_dir=CACHE_DIR, bundle_dir=BUNDLE_DIR):
+        if market not in MARKETS:
+            raise ValueError(f"不支持的市场: {market}")
+        self.market = market
+        self.cache_path = os.path.join(cache_dir, f"{market}_trade_dates.csv")
+        self.bundle_path = os.path.join(bundle_dir, f"{market}_trade_dates.csv")
+        self._sessions = None
+
+    def sessions(self):
+        if self._sessions is None:
+            sessions = _read_dates(self.cache_path)
+            if sessions is None:
+                sessions = _read_dates(self.bundle_path)
+            if sessions is None and self.market == "us":
+                sessions = us_sessions()
+            self._sessions = sessions if sessions is not None else pd.DatetimeIndex([])
+        return self._sessions
+
+    def refresh(self, offline=False):
+        """
+        刷新磁盘缓存
+        :param offline: True 时从随代码发布的文件恢复缓存，不访问网络
+        """
+        if offline:
+            if not os.path.exists(self.bundle_path):
+                raise FileNotFoundError(f"没有找到内置的交易日历: {self.bundle_path}")
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            shutil.copyfile(self.bundle_path, self.cache_path)
+        else:
+            sessions = fetch_cn_sessions() if self.market == "cn" else us_sessions()
+            _write_dates(sessions, self.cache_path)
+        self._sessions = None
+        return self.sessions()
+
+    def ensure_covers(self, as_of):
+        # 缓存没有覆盖到 as_of 时尝试联网刷新，失败则保留现有日历
+        sessions = self.sessions()
+        if len(sessions) and sessions[-1] >= pd.Timestamp(as_of):
+            return True
+        try:
+            self.refresh()
+            return True
+        except Exception as e:
+            print(f"{self.market} 交易日历刷新失败，未覆盖的日期按工作日处理: {e}")
+            return False
+
+    def last_session(self, as_of):
+        """
+        as_of 当天或之前最近的一个交易日
+        日历没有覆盖到的日期按周一到周五处理
+        """
+        as_of = pd.Timestamp(as_of).normalize()
+        sessions = self.sessions()
+        if len(sessions) and sessions[0] <= as_of <= sessions[-1]:
+            return sessions[sessions.searchsorted(as_of, side='right') - 1]
+        while as_of.weekday() >= 5:
+            as_of -= timedelta(days=1)
+        return as_of
+
+    def is_current(self, last_date, end_date):
+        # 本地最新日期已经覆盖 end_date 之前最近的交易日，就没有新数据可下载
+        return last_date is not None and pd.Timestamp(last_date) >= self.last_session(end_date)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="刷新本地交易日历缓存")
+    parser.add_argument("--offline", action="store_true", help="从内置文件恢复缓存，不访问网络")
+    parser.add_argument("--bundle", action="store_true", help="联网刷新后同时更新内置文件")
+    args = parser.parse_args()
+    for market in MARKETS:
+        calendar = TradeCalendar(market)
+        try:
+            sessions = calendar.refresh(offline=args.offline)
+        except FileNotFoundError as e:
+            # 某个市场没有内置文件时跳过，不影响其它市场
+            print(f"{market} 交易日历跳过：{e}")
+            continue
+        if args.bundle and not args.offline:
+            _write_dates(sessions, calendar.bundle_path)
+        print(f"{market} 交易日历：{sessions[0].date()} ~ {sessions[-1].date()}，共 {len(sessions)} 天")
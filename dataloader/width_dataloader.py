@@ -1,141 +1,163 @@
 import os
+import sys
 import pandas as pd
-import akshare as ak
 from datetime import datetime, timedelta
 import copy
 
-print("开始更新市场宽度数据...")
-
-# 下载指数数据
-def fetch_index_data(symbol, start_date, end_date, period="daily", hdf5_path="data/index_data.h5"):
-    # 确保目录存在
-    os.makedirs(os.path.dirname(hdf5_path), exist_ok=True)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataloader.fetcher import fetch_concurrently, call_with_retry
+from dataloader.storage import PartitionedStore, STORE_ROOT
+from dataloader import stock_store, derived_store
+from dataloader.providers import get_provider
+from dataloader.trade_calendar import TradeCalendar
+
+# 成份股并发抓取的默认参数
+MAX_WORKERS = 8     # 最大并发数
+RATE_LIMIT = 10     # 每秒最多请求数
+RETRIES = 3         # 单只股票失败重试次数
+BACKOFF = 0.5       # 重试退避基础秒数
+CHECKPOINT_EVERY = 50   # 每下载多少只股票写入一次存储
+
+# 下载指数数据，只把新增的行追加到分区存储
+# 返回追加的行数；本地已有最近一个交易日的数据时不发请求，返回 None
+def fetch_index_data(symbol, start_date, end_date, period="daily", root=STORE_ROOT, limiter=None, calendar=None):
+    store = PartitionedStore(root)
+    calendar = calendar or TradeCalendar("cn")
 
     # 处理符号名称，使其符合Python标识符的命名规则
-    symbol_key = f"sym_{symbol}"
-
-    # 尝试从HDF5文件中读取已有数据
-    try:
-        with pd.HDFStore(hdf5_path) as store:
-            existing_data = store[symbol_key]
-    except KeyError:
-        existing_data = pd.DataFrame()
-
-    # 获取本地数据的最新日期
-    if not existing_data.empty:
-        last_date = existing_data.index.max()
-        # 如果本地数据的最新日期在请求的结束日期之前，则需要下载缺失的数据
-        if last_date < pd.to_datetime(end_date):
+    dataset = f"index_data/sym_{symbol}"
+
+    # 从数据清单获取本地数据的最新日期
+    last_date = store.last_date(dataset)
+    if last_date is not None:
+        # 如果本地数据的最新日期在结束日期之前最近的交易日之前，则需要下载缺失的数据
+        if not calendar.is_current(last_date, end_date):
             print(f"Fetching missing data for {symbol}...")
             local_start_date = (last_date + pd.Timedelta(days=1)).strftime('%Y%m%d')
         else:
             print(f"Local data for {symbol} is already up-to-date")
-            return existing_data  # 本地数据已经是最新的，不需要下载
+            return None  # 本地数据已经是最新的，不需要下载
     else:
         local_start_date = start_date
 
     # 获取最新数据
-    index_data = ak.index_zh_a_hist(symbol=symbol, period=period, start_date=local_start_date, end_date=end_date)
+    if limiter is not None:
+        limiter.acquire()
+    index_data = get_provider().index_zh_a_hist(symbol=symbol, period=period, start_date=local_start_date, end_date=end_date)
     new_data = pd.DataFrame(index_data)
     new_data['日期'] = pd.to_datetime(new_data['日期'])
     new_data.set_index('日期', inplace=True)
+    if last_date is not None:
+        new_data = new_data[new_data.index > last_date]
 
-    # 合并已有数据和新数据
-    if not existing_data.empty:
-        combined_data = pd.concat([existing_data, new_data])
-        combined_data = combined_data[~combined_data.index.duplicated(keep='last')]
-    else:
-        combined_data = new_data
-
-    # 将合并后的数据写回HDF5文件
-    with pd.HDFStore(hdf5_path) as store:
-        store[symbol_key] = combined_data
-
-    return combined_data
+    # 追加写入新的分区文件
+    return store.append(dataset, new_data)
 
 # 下载指数成份股的历史数据
-def fetch_index_all(symbol, start_date, end_date, period="daily", hdf5_path="data/index_all.h5"):
-    # 确保目录存在
-    os.makedirs(os.path.dirname(hdf5_path), exist_ok=True)
-
-    # 处理符号名称，使其符合Python标识符的命名规则
-    symbol_key = f"sym_{symbol}"
-
-    # 尝试从HDF5文件中读取已有数据
-    try:
-        with pd.HDFStore(hdf5_path) as store:
-            existing_data = store[symbol_key]
-    except KeyError:
-        existing_data = pd.DataFrame()
-
-    # 获取本地数据的最新日期
-    if not existing_data.empty:
-        last_date = existing_data.index.max()
-        # 如果本地数据的最新日期在请求的结束日期之前，则需要下载缺失的数据
-        if last_date < pd.to_datetime(end_date):
-            print(f"Fetching missing data for {symbol}...")
-            local_start_date = (last_date + pd.Timedelta(days=1)).strftime('%Y%m%d')
-        else:
-            print(f"Local data for {symbol} is already up-to-date")
-            return existing_data  # 本地数据已经是最新的，不需要下载
-    else:
-        local_start_date = start_date
-
-    # 指数成份股
-    hs300_stocks = ak.index_stock_cons(symbol=symbol)
-    stock_list = hs300_stocks['品种代码'].tolist()
-
-    # 获取所有成份股的历史数据
-    all_stock_data = pd.DataFrame()
+# 所有跟踪指数的成份股取并集后只下载一次，写入共享的个股存储
+# 每只股票按自己的水位线增量下载，每 checkpoint_every 只写入一次，中断后重跑即可从断点继续
+# 返回 (写入行数, 因已是最新而跳过的股票数)
+def fetch_index_all(symbols, start_date, end_date, period="daily", root=STORE_ROOT,
+                    max_workers=MAX_WORKERS, rate=RATE_LIMIT, retries=RETRIES, backoff=BACKOFF,
+                    checkpoint_every=CHECKPOINT_EVERY, provider=None, limiter=None, calendar=None):
+    provider = provider or get_provider()
+    calendar = calendar or TradeCalendar("cn")
+    # 更新各指数的成份关系，与个股请求一样按退避重试并共用限速器
+    index_members = {}
+    for symbol in symbols:
+        cons = call_with_retry(provider.index_stock_cons, symbol=symbol, retries=retries, backoff=backoff,
+                               limiter=limiter)
+        index_members[symbol] = cons['品种代码'].astype(str).drop_duplicates().tolist()
+    stock_store.write_membership(index_members, root)
+
+    # 只下载新加入或已过期的股票，起始日期取各自的水位线
+    stock_list = list(dict.fromkeys(stock for stocks in index_members.values() for stock in stocks))
+    watermarks = stock_store.read_watermarks(root)
+    start_dates = {}
     for stock in stock_list:
-        stock_data = ak.stock_zh_a_hist(symbol=stock, period=period, start_date=local_start_date, end_date=end_date)
+        last_date = watermarks.get(stock)
+        if last_date is None or pd.isna(last_date):
+            start_dates[stock] = start_date
+        elif not calendar.is_current(last_date, end_date):
+            start_dates[stock] = (last_date + pd.Timedelta(days=1)).strftime('%Y%m%d')
+    skipped = len(stock_list) - len(start_dates)
+    print(f"成份股共 {len(stock_list)} 只（去重后），需要更新 {len(start_dates)} 只，跳过已是最新的 {skipped} 只")
+    if not start_dates:
+        return 0, skipped
+
+    def fetch_stock(stock):
+        stock_data = provider.stock_zh_a_hist(symbol=stock, period=period, start_date=start_dates[stock], end_date=end_date)
         stock_data['日期'] = pd.to_datetime(stock_data['日期'])
         stock_data.set_index('日期', inplace=True)
         stock_data['股票代码'] = stock
-        all_stock_data = pd.concat([all_stock_data, stock_data])
-
-    # 检查并删除重复的股票代码和日期
-    all_stock_data = all_stock_data.reset_index().drop_duplicates(subset=['日期', '股票代码']).set_index('日期')    
-
-    # 确保每个股票代码和日期的组合是唯一的
-    all_stock_data = all_stock_data.dropna(subset=['收盘'])
-
-    all_data = pd.DataFrame(all_stock_data)
-
-    # 合并已有数据和新数据
-    if not existing_data.empty:
-        combined_data_all = pd.concat([existing_data, all_data])
-        # 确保合并后的数据中没有重复的日期和股票代码组合
-        combined_data_all = combined_data_all.reset_index().drop_duplicates(subset=['日期', '股票代码']).set_index('日期')
-    else:
-        combined_data_all = all_data
-
-    # 将合并后的数据写回HDF5文件
-    with pd.HDFStore(hdf5_path) as store:
-        store[symbol_key] = combined_data_all
-
-    return combined_data_all
-
-# 更新指数数据
-def update_indices(symbols, start_date, end_date, period="daily"):
+        return stock_data
+
+    # 下载结果先进入缓冲区，攒够 checkpoint_every 只就写入存储并推进水位线
+    buffer = []
+    rows_written = 0
+
+    def flush():
+        nonlocal rows_written
+        if not buffer:
+            return
+        batch = pd.concat(buffer)
+        buffer.clear()
+        # 检查并删除重复的股票代码和日期，确保每个股票代码和日期的组合是唯一的
+        batch = batch.reset_index().drop_duplicates(subset=['日期', '股票代码']).set_index('日期')
+        batch = batch.dropna(subset=['收盘'])
+        rows_written += stock_store.append_stocks(batch, root)
+
+    def on_result(stock, stock_data):
+        last_date = watermarks.get(stock)
+        if last_date is not None and not pd.isna(last_date):
+            stock_data = stock_data[stock_data.index > last_date]
+        if not stock_data.empty:
+            buffer.append(stock_data)
+        if len(buffer) >= checkpoint_every:
+            flush()
+
+    # 并发获取成份股的历史数据
+    _, failures, stats = fetch_concurrently(fetch_stock, list(start_dates), max_workers=max_workers,
+                                            rate=rate, retries=retries, backoff=backoff, on_result=on_result,
+                                            limiter=limiter)
+    flush()
+    print(f"成份股下载：{stats.summary('symbols')}，写入 {rows_written} 行")
+    for stock, error in failures.items():
+        print(f"Failed to fetch {stock}: {error}")
+    if failures:
+        # 已下载的股票已经写入，任务标记为失败，--failed 重跑时只会下载这些股票
+        raise RuntimeError(f"成份股下载失败: {', '.join(failures)}")
+
+    return rows_written, skipped
+
+# 更新指数数据，返回 (写入行数, 省掉的请求数)
+def update_indices(symbols, start_date, end_date, period="daily", limiter=None, calendar=None):
+    rows, avoided = 0, 0
     for symbol in symbols:
         print(f"Updating data for symbol: {symbol}")
-        fetch_index_data(symbol, start_date, end_date, period)
+        added = fetch_index_data(symbol, start_date, end_date, period, limiter=limiter, calendar=calendar)
+        if added is None:
+            avoided += 1
+        else:
+            rows += added
+    return rows, avoided
 
 # 更新指数成份股的历史数据
-def update_indices_all(symbols, start_date, end_date, period="daily"):
-    for symbol in symbols:
-        print(f"Updating data for symbol: {symbol}")
-        fetch_index_all(symbol, start_date, end_date, period)
-
-# 主函数
-if __name__ == "__main__":
-    symbols = ["000300", # 沪深300指数
-               "399006", # 创业板指数
-               "000016", # 上证50指数
-               "399673", # 创业50指数
-               "000905", # 中证500指数
-            ]
+def update_indices_all(symbols, start_date, end_date, period="daily", limiter=None, calendar=None):
+    print(f"Updating constituents for symbols: {', '.join(symbols)}")
+    return fetch_index_all(symbols, start_date, end_date, period, limiter=limiter, calendar=calendar)
+
+# 需要计算市场宽度的指数
+INDEX_SYMBOLS = ["000300", # 沪深300指数
+                 "399006", # 创业板指数
+                 "000016", # 上证50指数
+                 "399673", # 创业50指数
+                 "000905", # 中证500指数
+                ]
+
+def run(limiter=None):
+    print("开始更新市场宽度数据...")
+    symbols = INDEX_SYMBOLS
     start_date = "20200101"
     yesterday = datetime.now() - timedelta(days=1)
     end_date = yesterday.strftime("%Y%m%d")
@@ -143,7 +165,17 @@ if __name__ == "__main__":
     # 使用深拷贝来避免原始参数被修改
     start_date_copy = copy.deepcopy(start_date)
     end_date_copy = copy.deepcopy(end_date)
+
+    calendar = TradeCalendar("cn")
+    calendar.ensure_covers(end_date_copy)
     
-    update_indices(symbols, start_date_copy, end_date_copy)
-    update_indices_all(symbols, start_date_copy, end_date_copy)
-    print("市场宽度数据更新完毕.")
\ No newline at end of file
+    rows, avoided = update_indices(symbols, start_date_copy, end_date_copy, limiter=limiter, calendar=calendar)
+    rows_all, avoided_all = update_indices_all(symbols, start_date_copy, end_date_copy, limiter=limiter, calendar=calendar)
+    # 增量更新市场宽度和指数均线，页面只读取结果
+    derived_store.update_width_derived(symbols)
+    print(f"市场宽度数据更新完毕. 按交易日历跳过 {avoided + avoided_all} 次请求")
+    return {"rows": rows + rows_all, "calls_avoided": avoided + avoided_all}
+
+# 主函数
+if __name__ == "__main__":
+    run()
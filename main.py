@@ -24,7 +24,7 @@ if __name__ == "__main__":
     st.sidebar.markdown("作者：尾灯白（GitHub：jasonbai）")
     st.sidebar.markdown("项目介绍：[stockdashboard](https://github.com/jasonbai)")
     selection = st.sidebar.radio("当前支持的分析图表：",
-                                 ["复盘日报","国内市场宽度", "海外市场","基金专题", "模型专题", "开发测试"])
+                                 ["复盘日报","国内市场宽度", "海外市场","基金专题", "模型专题", "数据状态", "开发测试"])
     if  selection == "复盘日报":
         from dailyreview import statement_func
         statement_func()
@@ -40,6 +40,9 @@ if __name__ == "__main__":
     elif selection == "模型专题":
         from test import test_func
         test_func()
+    elif selection == "数据状态":
+        from data_status import data_status_page
+        data_status_page()
     elif selection == "开发测试":
         from test import test_func
         test_func()
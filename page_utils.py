@@ -0,0 +1,46 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+import streamlit as st
+
+# 页面渲染的公共工具
+# fragment：st.fragment（requirements.txt 要求 streamlit 1.37+），片段内的控件（如日期滑块）变化只重新运行该片段；
+#           兼容 1.33+ 的 st.experimental_fragment，更旧的版本退化为普通函数，整页重新运行
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+# 每个页面保留最近的首屏耗时记录，所有会话共用
+RENDER_HISTORY = 20
+_render_times = {}
+_render_lock = threading.Lock()
+
+
+@contextmanager
+def first_paint_timer(page, **info):
+    """
+    统计页面从开始运行到所有选中内容渲染完成的耗时，显示在页面底部并记录下来
+    用法：with first_paint_timer("海外市场", 品种数=len(selected)): ...
+    """
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    record = {"时间": time.strftime('%Y-%m-%d %H:%M:%S'), "耗时(s)": round(elapsed, 3), **info}
+    with _render_lock:
+        _render_times.setdefault(page, deque(maxlen=RENDER_HISTORY)).append(record)
+    st.caption(f"首屏渲染耗时 {elapsed:.2f}s")
+
+
+def render_times():
+    # 各页面最近的渲染耗时，{页面: [记录, ...]}
+    with _render_lock:
+        return {page: list(records) for page, records in _render_times.items()}
+
+
+def pick_symbols(label, options, key, default=None):
+    """
+    多选框选择要展示的品种，默认只展示第一个
+    :param options: {代码: 名称}
+    """
+    default = list(options)[:1] if default is None else default
+    return st.multiselect(label, options=list(options), default=default, key=key,
+                          format_func=lambda code: f"{code} - {options[code]}")
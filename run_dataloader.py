@@ -1,20 +1,50 @@
-import time
-import subprocess
-
-# 定义爬虫文件列表
-crawler_files = [
-    r'dataloader\dailyreview_dataloader.py',
-    r'dataloader\fund_price_downloader.py',
-    r'dataloader\fund_rank_dataloader.py',
-    r'dataloader\us_dataloader.py',
-    r'dataloader\width_dataloader.py'
+import os
+import sys
+import argparse
+
+from dataloader.scheduler import Job, Scheduler
+from dataloader import (dailyreview_dataloader, fund_price_downloader, fund_rank_dataloader, reports,
+                        us_dataloader, width_dataloader)
+
+# 定义数据任务：所有任务都访问东方财富接口，共用同一个限速组
+jobs = [
+    Job("dailyreview", dailyreview_dataloader.run, rate_group="eastmoney"),
+    Job("fund_price", fund_price_downloader.run, rate_group="eastmoney"),
+    Job("fund_rank", fund_rank_dataloader.run, rate_group="eastmoney"),
+    Job("us_etf", us_dataloader.run, rate_group="eastmoney"),
+    Job("width", width_dataloader.run, rate_group="eastmoney"),
+    # AI 报告在行情数据下载完成后批量生成，不占用东方财富的限速
+    Job("ai_reports", reports.run, deps=["dailyreview", "us_etf", "fund_price"]),
 ]
 
-# 按顺序运行每个爬虫文件，并在每个文件运行后等待10秒钟
-for crawler_file in crawler_files:
-    print(f"Running {crawler_file}...")
-    subprocess.run(['python', crawler_file])
-    print(f"Finished running {crawler_file}. Waiting for 10 seconds before running the next one...")
-    time.sleep(10)
+# 各限速组每秒最多请求数
+rate_limits = {"eastmoney": 10}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行数据下载任务")
+    parser.add_argument("--failed", action="store_true", help="只重跑上一次失败或被跳过的任务")
+    parser.add_argument("--jobs", nargs="+", help="只运行指定的任务")
+    parser.add_argument("--workers", type=int, default=4, help="最大并行任务数")
+    args = parser.parse_args()
+
+    # 数据路径都是相对项目根目录的
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    scheduler = Scheduler(jobs, rate_limits=rate_limits, max_workers=args.workers)
+    only = args.jobs
+    if args.failed:
+        only = scheduler.failed_jobs()
+        if not only:
+            print("上一次运行没有失败的任务。")
+            sys.exit(0)
+    record = scheduler.run(only=only)
+
+    avoided = sum(result.get("calls_avoided", 0) for result in record["jobs"].values())
+    print(f"按交易日历跳过了 {avoided} 次已是最新的请求。")
 
-print("All crawlers have been executed successfully.")
\ No newline at end of file
+    failed = [name for name, result in record["jobs"].items() if result["status"] != "success"]
+    if failed:
+        print(f"以下任务未成功: {', '.join(failed)}，可使用 --failed 重跑。")
+        sys.exit(1)
+    print(f"All crawlers have been executed successfully in {record['wall_time']}s.")
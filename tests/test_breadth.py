@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from dataloader.breadth import close_matrix, market_breadth, rolling_means
+
+
+def make_panel(n_stocks=30, periods=400, suspend_ratio=0.05, seed=0):
+    # 随机游走的成份股长表，部分股票上市较晚，并随机剔除一些交易日模拟停牌
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2022-01-03", periods=periods, name='日期')
+    frames = []
+    for i in range(n_stocks):
+        listed = dates[rng.integers(0, periods // 2):] if i % 5 == 0 else dates
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(listed))))
+        keep = rng.random(len(listed)) >= suspend_ratio
+        frames.append(pd.DataFrame({'股票代码': f"{i:06d}", '收盘': close[keep]}, index=listed[keep]))
+    return pd.concat(frames).sort_index(kind='stable')
+
+
+def groupby_breadth(panel, windows):
+    # 原来 stockwidth.combined_plots 中 groupby + rolling 的写法，作为参照
+    df = panel.copy()
+    result = {}
+    for w in windows:
+        ma = df.groupby('股票代码')['收盘'].transform(lambda x: x.rolling(window=w).mean())
+        result[f"MA{w}"] = (df['收盘'] > ma).groupby(level=0).mean() * 100
+    return pd.DataFrame(result)
+
+
+def test_market_breadth_matches_groupby_reference():
+    panel = make_panel()
+    windows = (5, 20, 50, 200)
+    expected = groupby_breadth(panel, windows)
+    result = market_breadth(panel, windows)
+    pd.testing.assert_index_equal(result.index, expected.index, check_names=False)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), atol=1e-9)
+
+
+def test_start_only_trims_the_output():
+    panel = make_panel()
+    full = market_breadth(panel)
+    trimmed = market_breadth(panel, start="2023-01-02")
+    assert trimmed.index[0] >= pd.Timestamp("2023-01-02")
+    pd.testing.assert_frame_equal(trimmed, full.loc["2023-01-02":])
+
+
+def test_rolling_means_skip_suspended_days():
+    # 停牌日不占窗口：第二只股票缺第 2 天，它的 3 日均线在第 4 天才形成
+    panel = pd.DataFrame({'股票代码': ["a"] * 4 + ["b"] * 3,
+                          '收盘': [1.0, 2.0, 3.0, 4.0, 10.0, 30.0, 40.0]},
+                         index=pd.DatetimeIndex(["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05",
+                                                 "2024-01-02", "2024-01-04", "2024-01-05"], name='日期'))
+    dates, symbols, matrix = close_matrix(panel)
+    ma = rolling_means(matrix, windows=(3,))[3]
+    assert list(symbols) == ["a", "b"]
+    np.testing.assert_allclose(ma[:, 0], [np.nan, np.nan, 2.0, 3.0])
+    np.testing.assert_allclose(ma[:, 1], [np.nan, np.nan, np.nan, 80 / 3], rtol=1e-6)
+
+
+def test_empty_panel():
+    result = market_breadth(pd.DataFrame(columns=['股票代码', '收盘']))
+    assert result.empty and list(result.columns) == ["MA20", "MA50", "MA200"]
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("altair")
+from charts import downsample, lttb
+
+
+def _walk(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(0, 1, n))
+
+
+def test_lttb_keeps_endpoints_and_order():
+    values = _walk()
+    rows = lttb(values, 500)
+    assert len(rows) == 500
+    assert rows[0] == 0 and rows[-1] == len(values) - 1
+    assert (np.diff(rows) > 0).all()
+
+
+def test_lttb_keeps_spikes():
+    # 单日的尖峰和深坑必须保留，否则图上看不到最高点和最低点
+    values = _walk()
+    values[1234] = values.max() + 50
+    values[3456] = values.min() - 50
+    rows = lttb(values, 300)
+    assert values.argmax() in rows and values.argmin() in rows
+    assert values[rows].max() == values.max() and values[rows].min() == values.min()
+
+
+def test_lttb_short_series_and_missing_values():
+    np.testing.assert_array_equal(lttb(np.arange(10.0), 20), np.arange(10))
+    values = _walk(1000)
+    values[100:150] = np.nan
+    rows = lttb(values, 100)
+    assert len(rows) == 100 and rows[0] == 0 and rows[-1] == 999
+
+
+def test_downsample_takes_the_same_rows_for_all_columns():
+    values = _walk(3000)
+    df = pd.DataFrame({'日期': pd.bdate_range("2012-01-02", periods=3000).strftime('%Y-%m-%d'),
+                       '收盘': values, 'MA20': pd.Series(values).rolling(20).mean()})
+    assert downsample(df, '收盘', 5000) is df
+    result = downsample(df, '收盘', 400)
+    assert len(result) == 400
+    pd.testing.assert_frame_equal(result, df.iloc[lttb(values, 400)])
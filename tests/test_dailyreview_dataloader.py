@@ -0,0 +1,51 @@
+from datetime import datetime
+import pytest
+
+from dataloader import fetcher, providers
+from dataloader.dailyreview_dataloader import ETFStatsService
+from dataloader.synthetic_provider import SyntheticProvider
+from dataloader.trade_calendar import TradeCalendar
+
+ETF_LISTS = {"宽基": {"上证50ETF": "510050", "沪深300": "510300"},
+             "行业": {"证券ETF": "512880", "芯片ETF": "159995", "沪深300": "510300"}}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = SyntheticProvider(start="2024-01-02")
+    previous = providers.set_provider(provider)
+    monkeypatch.setattr(fetcher.time, "sleep", lambda seconds: None)
+    yield provider
+    providers.set_provider(previous)
+
+
+def _service(tmp_path):
+    calendar = TradeCalendar("cn", cache_dir=str(tmp_path / "calendar"))
+    return ETFStatsService(ETF_LISTS, "20240102", datetime.now().strftime('%Y%m%d'),
+                           root=str(tmp_path / "store"), calendar=calendar)
+
+
+def test_update_history_keeps_fetched_data_and_returns_failures(provider, tmp_path):
+    fund_etf_hist_em = provider.fund_etf_hist_em
+
+    def failing_hist(symbol, **kwargs):
+        if symbol == "159995":
+            raise ConnectionError(f"模拟的网络错误: {symbol}")
+        return fund_etf_hist_em(symbol=symbol, **kwargs)
+
+    provider.fund_etf_hist_em = failing_hist
+    service = _service(tmp_path)
+    rows, avoided, failures = service.update_history()
+    assert rows > 0 and avoided == 0
+    assert list(failures) == ["159995"]
+    # 其余代码照常写入并出现在视图中
+    views = service.get_views()
+    assert sorted(views["宽基"]['ETF代码']) == ["510050", "510300"]
+    assert sorted(views["行业"]['ETF代码']) == ["510300", "512880"]
+
+    # 重跑时只下载失败的代码
+    provider.fund_etf_hist_em = fund_etf_hist_em
+    before = provider.calls["fund_etf_hist_em"]
+    _, avoided, failures = _service(tmp_path).update_history()
+    assert failures == {} and avoided == 3
+    assert provider.calls["fund_etf_hist_em"] - before == 1
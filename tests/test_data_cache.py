@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+import data_cache
+from data_cache import DataCache
+
+
+def _frame(rows):
+    return pd.DataFrame({'收盘': np.arange(rows, dtype=np.float64)})
+
+
+def test_version_change_reloads():
+    cache = DataCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return _frame(10)
+
+    first = cache.get("a", "v1", loader)
+    first.iloc[0, 0] = -1   # 返回的是副本，修改不影响缓存
+    assert cache.get("a", "v1", loader).iloc[0, 0] == 0
+    assert len(loads) == 1
+    cache.get("a", "v2", loader)
+    assert len(loads) == 2
+    assert cache.stats()["命中"] == 1 and cache.stats()["未命中"] == 2
+
+
+def test_evicts_least_recently_used_over_budget():
+    size = data_cache._sizeof(_frame(1000))
+    cache = DataCache(budget_bytes=int(size * 2.5))
+    cache.get("a", 1, lambda: _frame(1000))
+    cache.get("b", 1, lambda: _frame(1000))
+    cache.get("a", 1, lambda: pytest.fail("a 仍在缓存中"))   # a 变为最近使用
+    cache.get("c", 1, lambda: _frame(1000))
+    assert cache.evictions == 1 and cache.nbytes <= cache.budget_bytes
+    # b 被淘汰，a 和 c 仍在
+    cache.get("a", 1, lambda: pytest.fail("a 不应被淘汰"))
+    cache.get("c", 1, lambda: pytest.fail("c 不应被淘汰"))
+    reloaded = []
+    cache.get("b", 1, lambda: reloaded.append(1) or _frame(1000))
+    assert reloaded == [1]
+
+    # 超过预算的单个对象不进入缓存
+    cache.get("big", 1, lambda: _frame(10000))
+    assert cache.stats()["条目数"] == 2
+
+
+def test_read_csv_reloads_after_file_changes(tmp_path, monkeypatch):
+    cache = DataCache()
+    monkeypatch.setattr(data_cache, "get_cache", lambda: cache)
+    path = str(tmp_path / "statistics.csv")
+    _frame(3).to_csv(path, index=False)
+    assert len(data_cache.read_csv(path)) == 3
+    assert len(data_cache.read_csv(path, lambda p: pytest.fail("文件未变化，不应重新读取"))) == 3
+
+    _frame(5).to_csv(path, index=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert len(data_cache.read_csv(path)) == 5
@@ -0,0 +1,67 @@
+import threading
+import pytest
+
+from dataloader.fetcher import TokenBucket, call_with_retry, fetch_concurrently
+
+
+class FlakyFetch:
+    """前 failures 次调用抛出 ConnectionError，之后返回 item * 10；always_fail 中的 item 始终失败"""
+
+    def __init__(self, failures=0, always_fail=()):
+        self.failures = failures
+        self.always_fail = set(always_fail)
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, item):
+        with self._lock:
+            self.calls[item] = self.calls.get(item, 0) + 1
+            count = self.calls[item]
+        if item in self.always_fail or count <= self.failures:
+            raise ConnectionError(f"模拟的网络错误: {item}")
+        return item * 10
+
+
+def test_fetch_concurrently_retries_transient_errors():
+    fetch = FlakyFetch(failures=2)
+    results, failures, stats = fetch_concurrently(fetch, list(range(20)), max_workers=4, retries=3, backoff=0)
+    assert results == {i: i * 10 for i in range(20)}
+    assert failures == {}
+    assert all(count == 3 for count in fetch.calls.values())
+    assert (stats.total, stats.succeeded, stats.failed) == (20, 20, 0)
+
+
+def test_fetch_concurrently_reports_permanent_failures():
+    fetch = FlakyFetch(always_fail={3, 7})
+    results, failures, stats = fetch_concurrently(fetch, list(range(10)), max_workers=4, retries=2, backoff=0)
+    assert set(failures) == {3, 7}
+    assert all(isinstance(error, ConnectionError) for error in failures.values())
+    assert set(results) == set(range(10)) - {3, 7}
+    # 首次调用加 2 次重试
+    assert fetch.calls[3] == fetch.calls[7] == 3
+    assert (stats.succeeded, stats.failed) == (8, 2)
+
+
+def test_fetch_concurrently_on_result_streams_results():
+    received = {}
+    results, failures, _ = fetch_concurrently(FlakyFetch(), [1, 2, 3], backoff=0,
+                                              on_result=lambda item, result: received.update({item: result}))
+    assert results == {}
+    assert failures == {}
+    assert received == {1: 10, 2: 20, 3: 30}
+
+
+def test_call_with_retry_acquires_a_token_per_attempt():
+    class CountingLimiter(TokenBucket):
+        acquired = 0
+
+        def acquire(self):
+            type(self).acquired += 1
+
+    limiter = CountingLimiter(rate=1000)
+    fetch = FlakyFetch(failures=2)
+    assert call_with_retry(fetch, 5, retries=3, backoff=0, limiter=limiter) == 50
+    assert CountingLimiter.acquired == 3
+
+    with pytest.raises(ConnectionError):
+        call_with_retry(FlakyFetch(always_fail={1}), 1, retries=1, backoff=0)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataloader import fund_store
+from dataloader.fund_store import FundRankIndex
+from dataloader.synthetic_provider import SyntheticProvider
+
+
+@pytest.fixture(scope="module")
+def rank():
+    provider = SyntheticProvider(n_funds=2000)
+    return fund_store.build_fund_rank(provider.fund_open_fund_rank_em("全部"), provider.fund_name_em())
+
+
+def reference(rank, column, n, category, exclude_c):
+    # 原来页面上的写法：按类别和 C 类份额筛选，缺失值按 0 处理后排序
+    df = rank if category == "全部" else rank[rank['类别'] == category]
+    if exclude_c:
+        df = df[~df['基金简称'].str.contains('C', case=False)]
+    values = df[column].fillna(0).astype(np.float32)
+    top = values.sort_values(ascending=False, kind='stable').head(n)
+    tail = values.sort_values(ascending=True, kind='stable').head(n).sort_values(ascending=False, kind='stable')
+    return df, top.to_numpy(), tail.to_numpy()
+
+
+@pytest.mark.parametrize("category", ["全部", "股票型", "债券型", "QDII"])
+@pytest.mark.parametrize("exclude_c", [True, False])
+def test_top_and_tail_matches_pandas_sort(rank, category, exclude_c):
+    index = FundRankIndex(rank)
+    for column in ('今年来', '近3年'):
+        df, expected_top, expected_tail = reference(rank, column, 10, category, exclude_c)
+        top, tail = index.top_and_tail(column, 10, category=category, exclude_c=exclude_c)
+        # 同值的基金先后顺序不作要求，逐项比较数值，并检查每只基金都在筛选范围内、数值对得上
+        np.testing.assert_array_equal(top[column].fillna(0).to_numpy(), expected_top)
+        np.testing.assert_array_equal(tail[column].fillna(0).to_numpy(), expected_tail)
+        values = df.set_index('基金代码')[column].fillna(0).astype(np.float32)
+        for result in (top, tail):
+            assert result['基金代码'].is_unique
+            np.testing.assert_array_equal(values.loc[result['基金代码']].to_numpy(),
+                                          result[column].fillna(0).to_numpy())
+
+
+def test_missing_values_rank_as_zero():
+    df = pd.DataFrame({'基金代码': ["000001", "000002", "000003", "000004"],
+                       '基金简称': ["甲A", "乙A", "丙A", "丁C"],
+                       '日期': pd.Timestamp("2024-06-28"),
+                       '今年来': [5.0, np.nan, -3.0, 9.0],
+                       '手续费': "0.15%", '类别': "股票型"})
+    top, tail = FundRankIndex(df).top_and_tail('今年来', 2)
+    assert top['基金代码'].tolist() == ["000001", "000002"]
+    assert tail['基金代码'].tolist() == ["000002", "000003"]
+    # 类别不存在时返回空表
+    top, tail = FundRankIndex(df).top_and_tail('今年来', 2, category="FOF")
+    assert top.empty and tail.empty
+
+
+def test_lookup_keeps_order_and_skips_unknown_codes(rank):
+    index = FundRankIndex(rank)
+    codes = rank['基金代码'].tolist()
+    wanted = [codes[5], "999999", codes[1], codes[5], codes[300]]
+    result = index.lookup(wanted, columns=['基金代码', '基金简称', '今年来'])
+    assert result['基金代码'].tolist() == [codes[5], codes[1], codes[300]]
+    expected = rank.set_index('基金代码').loc[result['基金代码']]
+    assert result['基金简称'].tolist() == expected['基金简称'].tolist()
+    np.testing.assert_array_equal(result['今年来'].to_numpy(), expected['今年来'].astype(np.float32).to_numpy())
+
+
+def test_load_reuses_instance_until_the_rank_changes(rank, tmp_path):
+    root = str(tmp_path)
+    assert FundRankIndex.load(root) is None
+    fund_store.write_fund_rank(rank, root)
+    first = FundRankIndex.load(root)
+    assert FundRankIndex.load(root) is first and len(first) == len(rank)
+    fund_store.write_fund_rank(rank.head(100), root)
+    assert len(FundRankIndex.load(root)) == 100
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataloader import indicators
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    indicators.clear_cache()
+    yield
+    indicators.clear_cache()
+
+
+def make_prices(n_symbols=4, periods=300, seed=0, gaps=True):
+    # 随机游走的 日期×品种 价格表，部分品种上市较晚，并挖掉一段连续缺失
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=periods, name='日期')
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (periods, n_symbols)), axis=0)),
+                          index=dates, columns=[f"{i:06d}" for i in range(n_symbols)])
+    if gaps:
+        prices.iloc[:30, 1] = np.nan
+        prices.iloc[100:104, 2] = np.nan
+        prices.iloc[200, 3] = np.nan
+    return prices
+
+
+def test_moving_averages_match_pandas_rolling():
+    prices = make_prices()
+    close = prices.iloc[:, 0]
+    result = indicators.moving_averages(close, windows=(5, 20))
+    for w in (5, 20):
+        pd.testing.assert_series_equal(result[f"MA{w}"], close.rolling(w).mean(), check_names=False)
+
+    # 二维输入：列为 (MA20, 品种)，窗口内有缺失值时为 NaN
+    result = indicators.moving_averages(prices, windows=(5, 20))
+    for w in (5, 20):
+        pd.testing.assert_frame_equal(result[f"MA{w}"], prices.rolling(w).mean())
+
+
+def test_rolling_std_matches_pandas_for_large_prices():
+    # 价格很大、波动很小时，一次性的平方和写法会丢精度
+    prices = make_prices(gaps=False) * 1e4 + 1e7
+    pd.testing.assert_frame_equal(indicators.rolling_std(prices, 20), prices.rolling(20).std(), rtol=1e-6)
+
+
+def test_ema_matches_pandas_across_nan_gaps():
+    prices = make_prices()
+    for span in (5, 12):
+        expected = prices.ewm(span=span, adjust=False).mean()
+        pd.testing.assert_frame_equal(indicators.ema(prices, span), expected)
+
+    s = pd.Series([np.nan, 1, 2, np.nan, np.nan, 10, 11], dtype=float)
+    pd.testing.assert_series_equal(indicators.ema(s, 3), s.ewm(alpha=0.5, adjust=False).mean())
+
+
+def test_rsi_and_macd_match_pandas():
+    close = make_prices().iloc[:, 2]
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+    expected = 100 - 100 / (1 + gain / loss)
+    expected.iloc[:14] = np.nan
+    pd.testing.assert_series_equal(indicators.rsi(close, 14), expected)
+
+    dif, dea, hist = indicators.macd(close)
+    expected_dif = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    pd.testing.assert_series_equal(dif, expected_dif)
+    pd.testing.assert_series_equal(dea, expected_dif.ewm(span=9, adjust=False).mean())
+    pd.testing.assert_series_equal(hist, dif - dea)
+
+
+def test_bollinger_and_drawdown_match_pandas():
+    close = make_prices().iloc[:, 0]
+    mid, lower, upper = indicators.bollinger(close, 20, 2)
+    std = close.rolling(20).std()
+    pd.testing.assert_series_equal(mid, close.rolling(20).mean())
+    pd.testing.assert_series_equal(lower, mid - 2 * std)
+    pd.testing.assert_series_equal(upper, mid + 2 * std)
+
+    pd.testing.assert_series_equal(indicators.drawdown(close), close / close.cummax() - 1)
+
+
+def test_ndarray_input_returns_ndarray():
+    prices = make_prices()
+    result = indicators.sma(prices.to_numpy()[:, 0], 10)
+    assert isinstance(result, np.ndarray) and result.ndim == 1
+    np.testing.assert_allclose(result, prices.iloc[:, 0].rolling(10).mean().to_numpy())
+
+
+def test_memoize_separates_columns_and_index_types():
+    prices = make_prices(gaps=False)
+    key = ("index_data/sym_000300", "v1")
+    first = indicators.sma(prices.iloc[:, 0], 10, key=key)
+    assert indicators.sma(prices.iloc[:, 0], 10, key=key) is first
+
+    # 同一 key 下的另一列、或索引为字符串日期的调用方，不会拿到上面的结果
+    other = indicators.sma(prices.iloc[:, 1], 10, key=key)
+    pd.testing.assert_series_equal(other, prices.iloc[:, 1].rolling(10).mean())
+    by_str = prices.iloc[:, 0].copy()
+    by_str.index = by_str.index.strftime('%Y-%m-%d')
+    assert indicators.sma(by_str, 10, key=key).index.equals(by_str.index)
+
+    # 版本变化后重新计算
+    assert indicators.sma(prices.iloc[:, 0], 10, key=(key[0], "v2")) is not first
@@ -0,0 +1,85 @@
+import os
+from types import SimpleNamespace
+
+from dataloader import llm
+
+
+def test_fingerprint_depends_on_messages_model_and_temperature():
+    messages = llm.build_messages("你是一位股票分析师", "上证指数 3000 点")
+    key = llm.fingerprint(messages)
+    assert llm.fingerprint(llm.build_messages("你是一位股票分析师", "上证指数 3000 点")) == key
+    assert llm.fingerprint(llm.build_messages("你是一位股票分析师", "上证指数 3001 点")) != key
+    assert llm.fingerprint(messages, model="other-model") != key
+    assert llm.fingerprint(messages, temperature=0.2) != key
+
+
+def test_summary_cache_get_put_and_expiry(tmp_path, monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(llm.time, "time", lambda: now[0])
+    cache = llm.SummaryCache(str(tmp_path), ttl_hours=1)
+    assert cache.get("missing") is None
+
+    cache.put("fresh", "今日市场震荡", model=llm.MODEL)
+    entry = cache.get("fresh")
+    assert entry["text"] == "今日市场震荡" and entry["model"] == llm.MODEL
+
+    now[0] += 1800
+    cache.put("newer", "明日关注成交量")
+    now[0] += 2400   # fresh 已超过 1 小时，newer 还没有
+    assert cache.get("fresh") is None
+    assert cache.get("newer")["text"] == "明日关注成交量"
+
+    # 损坏的文件读取时视为不存在，清理时一并删除
+    with open(os.path.join(str(tmp_path), "broken.json"), "w", encoding="utf-8") as f:
+        f.write("{")
+    assert cache.get("broken") is None
+    assert cache.purge() == 2
+    assert sorted(os.listdir(str(tmp_path))) == ["newer.json"]
+
+
+def _chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def test_render_stream_throttles_by_size():
+    renders = []
+    chunks = ["一二三四五六七八九十"] * 100
+    text = llm.render_stream(iter(chunks), lambda text, done: renders.append((len(text), done)),
+                             interval=3600, min_chars=200)
+    assert text == "".join(chunks)
+    # 每累计 200 字刷新一次，最后再完整刷新一次
+    assert renders == [(200, False), (400, False), (600, False), (800, False), (1000, False), (1000, True)]
+
+
+def test_render_stream_throttles_by_interval(monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(llm.time, "perf_counter", lambda: next(clock) * 0.03)
+    renders = []
+    llm.render_stream(iter(["字"] * 20), lambda text, done: renders.append(done), interval=0.1, min_chars=10_000)
+    # 每段间隔 0.03s，约每 4 段刷新一次
+    assert renders.count(False) == 5
+    assert renders[-1] is True
+
+
+def test_render_stream_renders_short_replies_once():
+    renders = []
+    assert llm.render_stream(iter(["很短"]), lambda text, done: renders.append((text, done))) == "很短"
+    assert renders == [("很短", True)]
+
+
+def test_stream_chat_records_usage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3)
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return iter([_chunk("你"), _chunk("好"), _chunk("！"), _chunk(usage=usage)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    messages = llm.build_messages("系统", "数据")
+    assert "".join(llm.stream_chat(messages, name="test", client=client)) == "你好！"
+    assert requests[0]["stream_options"] == {"include_usage": True}
+    entry, = llm.read_usage()
+    assert (entry["名称"], entry["提示词tokens"], entry["生成tokens"]) == ("test", 12, 3)
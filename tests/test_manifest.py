@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from dataloader import stock_store
+from dataloader.manifest import frame_checksum
+from dataloader.storage import PartitionedStore
+
+
+def _index_data(start, periods, base=100.0):
+    dates = pd.bdate_range(start, periods=periods, name='日期')
+    return pd.DataFrame({'收盘': base + np.arange(periods, dtype=float)}, index=dates)
+
+
+def test_last_date_and_rows_come_from_the_manifest(tmp_path):
+    store = PartitionedStore(str(tmp_path))
+    store.append("index_data/sym_000300", _index_data("2024-01-02", 10))
+    store.append("index_data/sym_000300", _index_data("2024-01-16", 5))
+    entry = store.manifest.get("index_data/sym_000300")
+    assert (entry["first_date"], entry["last_date"], entry["rows"]) == ("2024-01-02", "2024-01-22", 15)
+    assert store.last_date("index_data/sym_000300") == pd.Timestamp("2024-01-22")
+
+    # 清单缺失时从最新分区读取
+    store.manifest.remove("index_data/sym_000300")
+    assert store.last_date("index_data/sym_000300") == pd.Timestamp("2024-01-22")
+    assert store.last_date("missing") is None
+
+
+def test_version_changes_on_every_write(tmp_path):
+    store = PartitionedStore(str(tmp_path))
+    assert store.version("index_data/sym_000300") is None
+    store.append("index_data/sym_000300", _index_data("2024-01-02", 10))
+    first = store.version("index_data/sym_000300")
+    store.append("index_data/sym_000300", _index_data("2024-01-16", 1))
+    assert store.version("index_data/sym_000300") not in (None, first)
+
+
+def test_compact_rebuilds_the_entry_from_content(tmp_path):
+    store = PartitionedStore(str(tmp_path))
+    store.append("index_data/sym_000300", _index_data("2024-01-02", 10))
+    # 重叠写入使累加的行数偏大，合并后按实际内容修正
+    store.append("index_data/sym_000300", _index_data("2024-01-10", 5, base=200.0))
+    assert store.manifest.get("index_data/sym_000300")["rows"] == 15
+    store.compact("index_data/sym_000300")
+    entry = store.manifest.get("index_data/sym_000300")
+    assert entry["rows"] == 11
+    assert entry["checksum"] == frame_checksum(store.read("index_data/sym_000300").reset_index())
+
+
+def test_checksum_ignores_row_order():
+    df = pd.DataFrame({'日期': pd.bdate_range("2024-01-02", periods=5), '收盘': np.arange(5.0)})
+    assert frame_checksum(df) == frame_checksum(df.iloc[::-1])
+    assert frame_checksum(df) != frame_checksum(df.assign(收盘=df['收盘'] + 1))
+
+
+def test_per_stock_watermarks(tmp_path):
+    root = str(tmp_path)
+    dates = pd.bdate_range("2024-01-02", periods=10, name='日期')
+    panel = pd.concat([pd.DataFrame({'股票代码': "000001", '收盘': 1.0}, index=dates),
+                       pd.DataFrame({'股票代码': "000002", '收盘': 2.0}, index=dates[:6])])
+    stock_store.append_stocks(panel, root)
+    watermarks = stock_store.read_watermarks(root)
+    assert watermarks["000001"] == dates[-1] and watermarks["000002"] == dates[5]
@@ -0,0 +1,51 @@
+import os
+import numpy as np
+import pandas as pd
+
+from dataloader import fund_store, stock_store
+from dataloader.migrate_h5 import migrate_all
+from dataloader.storage import PartitionedStore
+
+
+def _constituents(codes, periods=30):
+    dates = pd.bdate_range("2024-01-02", periods=periods, name='日期')
+    return pd.concat([pd.DataFrame({'股票代码': code, '收盘': 10.0 + np.arange(periods)}, index=dates)
+                      for code in codes])
+
+
+def test_migrate_index_all_to_shared_stock_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    with pd.HDFStore("data/index_all.h5", mode='w') as h5:
+        h5["sym_000300"] = _constituents(["000001", "000002"])
+        h5["sym_399006"] = _constituents(["000002", "300750"])
+    root = str(tmp_path / "store")
+
+    migrate_all(root)
+    assert stock_store.index_members("000300", root) == ["000001", "000002"]
+    assert stock_store.index_members("399006", root) == ["000002", "300750"]
+    stocks = stock_store.read_stocks(["000001", "000002", "300750"], root)
+    # 两个指数共有的股票只保存一份
+    assert len(stocks) == 3 * 30
+    assert PartitionedStore(root).last_date(stock_store.STOCKS_DATASET) == pd.Timestamp("2024-02-12")
+
+    # 再次运行时已存在的数据集不会重复写入
+    migrate_all(root)
+    assert len(stock_store.read_stocks(["000001", "000002", "300750"], root)) == 3 * 30
+
+
+def test_migrate_fund_nav_to_long_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    dates = pd.date_range("2024-01-02", periods=10, freq='B', name='净值日期')
+    with pd.HDFStore("data/fund_human.h5", mode='w') as h5:
+        for i, code in enumerate(["000001", "110011"]):
+            h5[f"sym_{code}"] = pd.DataFrame({'单位净值': 1.0 + i + np.arange(10) / 100}, index=dates)
+    root = str(tmp_path / "store")
+
+    migrate_all(root)
+    nav = fund_store.read_nav("110011", root)
+    assert len(nav) == 10 and nav['单位净值'].iloc[-1] == 2.09
+    watermarks = fund_store.nav_watermarks(root)
+    assert sorted(watermarks.index) == ["000001", "110011"]
+    assert (watermarks == pd.Timestamp("2024-01-15")).all()
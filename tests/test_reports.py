@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+from dataloader import llm, reports
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeAsyncClient:
+    """模拟 AsyncOpenAI 的流式接口，记录并发数；输入中含 fail 的请求抛出异常，含 empty 的返回空内容"""
+
+    def __init__(self):
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, stream, temperature, stream_options):
+        self.requests.append(messages)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            content = messages[-1]["content"]
+            if "fail" in content:
+                raise ConnectionError("模拟的网络错误")
+            text = "" if "empty" in content else f"报告：{content}"
+            usage = SimpleNamespace(prompt_tokens=len(content), completion_tokens=len(text))
+            chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 3]))],
+                                      usage=None) for i in range(0, len(text), 3)]
+            return FakeStream(chunks + [SimpleNamespace(choices=[], usage=usage)])
+        finally:
+            self.active -= 1
+
+
+def _requests(*names):
+    return [(name, llm.build_messages("系统提示词", f"{name} 的数据")) for name in names]
+
+
+def test_generate_reports_uses_cache_and_limits_concurrency(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = llm.SummaryCache(str(tmp_path / "ai_cache"))
+    client = FakeAsyncClient()
+    requests = _requests(*[f"r{i}" for i in range(6)])
+
+    generated, cached, failures = asyncio.run(
+        reports.generate_reports(requests, cache, None, None, max_concurrency=2, client=client))
+    assert (generated, cached, failures) == (6, 0, {})
+    assert client.max_active <= 2
+    for name, messages in requests:
+        assert cache.get(llm.fingerprint(messages))["text"] == f"报告：{name} 的数据"
+    assert len(llm.read_usage()) == 6
+
+    # 输入没变时全部命中缓存，不再请求
+    generated, cached, failures = asyncio.run(
+        reports.generate_reports(requests, cache, None, None, client=client))
+    assert (generated, cached, failures) == (0, 6, {})
+    assert len(client.requests) == 6
+
+
+def test_generate_reports_collects_failures(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = llm.SummaryCache(str(tmp_path / "ai_cache"))
+    requests = _requests("ok", "fail", "empty")
+
+    generated, cached, failures = asyncio.run(
+        reports.generate_reports(requests, cache, None, None, client=FakeAsyncClient()))
+    assert (generated, cached) == (1, 0)
+    assert set(failures) == {"fail", "empty"}
+    assert failures["fail"].startswith("ConnectionError")
+    assert cache.get(llm.fingerprint(requests[1][1])) is None
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from dataloader import derived_store, stock_store
+from dataloader.breadth import close_matrix, market_breadth, rolling_means
+from dataloader.rolling_state import RollingState
+from dataloader.storage import PartitionedStore
+from test_breadth import make_panel
+
+WINDOWS = (5, 20, 50)
+
+
+def test_daily_updates_match_full_recompute():
+    panel = make_panel(periods=300)
+    dates = panel.index.unique().sort_values()
+    split = dates[200]
+    state = RollingState.from_panel(panel[panel.index < split], WINDOWS)
+
+    expected = market_breadth(panel, WINDOWS)
+    for date in dates[dates >= split]:
+        breadth = state.breadth(date, panel.loc[[date]].set_index('股票代码')['收盘'])
+        np.testing.assert_allclose([breadth[w] for w in WINDOWS], expected.loc[date].to_numpy(), atol=1e-9)
+
+    # 每只股票最新的均线与宽矩阵算法一致
+    _, symbols, matrix = close_matrix(panel)
+    means = rolling_means(matrix, WINDOWS)
+    last_valid = (~np.isnan(matrix)).cumsum(axis=0).argmax(axis=0)
+    current = state.current_means().reindex(symbols)
+    for w in WINDOWS:
+        np.testing.assert_allclose(current[f"MA{w}"], means[w][last_valid, np.arange(len(symbols))], rtol=1e-5)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    state = RollingState.from_panel(make_panel(periods=100), WINDOWS)
+    path = str(tmp_path / "state.npz")
+    state.save(path)
+    loaded = RollingState.load(path)
+    assert loaded.windows == state.windows and loaded.last_date == state.last_date
+    pd.testing.assert_frame_equal(loaded.current_means(), state.current_means())
+    assert RollingState.load(str(tmp_path / "missing.npz")) is None
+
+
+def _write_index(root, panel, symbol="000300"):
+    closes = panel.groupby(level=0)['收盘'].mean().to_frame()
+    closes.index.name = '日期'
+    PartitionedStore(root).append(f"index_data/sym_{symbol}", closes)
+
+
+def test_incremental_derived_series_match_rebuild(tmp_path, capsys):
+    root = str(tmp_path)
+    panel = make_panel(periods=300)
+    dates = panel.index.unique().sort_values()
+    lagging = "000003"
+    old = panel[(panel.index < dates[250]) & ~((panel['股票代码'] == lagging) & (panel.index >= dates[245]))]
+    stock_store.append_stocks(old, root)
+    stock_store.write_membership({"000300": sorted(panel['股票代码'].unique())}, root)
+    _write_index(root, old)
+    derived_store.rebuild_breadth("000300", root, WINDOWS)
+    derived_store.rebuild_index_ma("000300", root, WINDOWS)
+
+    # 正常的增量：其余股票追加新的交易日，只读新增数据
+    new = panel[(panel.index >= dates[250]) & (panel['股票代码'] != lagging)]
+    stock_store.append_stocks(new[new.index < dates[260]], root)
+    _write_index(root, new[new.index < dates[260]])
+    assert derived_store.update_width_derived(["000300"], root, WINDOWS) == 2 * 10
+    assert derived_store.verify("000300", root, WINDOWS) == []
+
+    # 落后的股票补下载了已处理日期的数据，市场宽度需要整表重算
+    late = panel[(panel['股票代码'] == lagging) & (panel.index >= dates[245]) & (panel.index < dates[260])]
+    stock_store.append_stocks(late, root)
+    capsys.readouterr()
+    derived_store.update_width_derived(["000300"], root, WINDOWS)
+    assert "全量重算市场宽度" in capsys.readouterr().out
+    assert derived_store.verify("000300", root, WINDOWS) == []
+    stored = derived_store.read_breadth("000300", root)
+    expected = market_breadth(panel[panel.index < dates[260]], WINDOWS)
+    np.testing.assert_allclose(stored.to_numpy(np.float64), expected.to_numpy(), atol=1e-4)
+
+
+def test_index_ma_update_skips_missing_closes(tmp_path):
+    root = str(tmp_path)
+    closes = pd.DataFrame({'收盘': 100 + np.arange(80.0)}, index=pd.bdate_range("2024-01-02", periods=80, name='日期'))
+    store = PartitionedStore(root)
+    store.append("index_data/sym_000300", closes.iloc[:70])
+    derived_store.rebuild_index_ma("000300", root, WINDOWS)
+
+    new = closes.iloc[70:].copy()
+    new.iloc[[3, -1], 0] = np.nan
+    store.append("index_data/sym_000300", new)
+    assert derived_store.update_index_ma("000300", root, WINDOWS) == 8
+    # 最后一天仍缺失，下一次更新没有新数据
+    assert derived_store.update_index_ma("000300", root, WINDOWS) == 0
+    stored = derived_store.read_index_ma("000300", root)
+    assert stored['收盘'].notna().all() and stored.index[-1] == closes.index[-2]
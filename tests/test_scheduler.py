@@ -0,0 +1,44 @@
+import pytest
+
+from dataloader.scheduler import Job, Scheduler, read_run_log
+
+
+def _scheduler(tmp_path, calls, fail=()):
+    def make(name):
+        def func(limiter=None):
+            calls.append(name)
+            if name in fail:
+                raise ConnectionError(f"模拟的网络错误: {name}")
+            return {"rows": 1, "calls_avoided": 0}
+        return func
+
+    jobs = [Job("a", make("a")), Job("b", make("b"), deps=["a"]), Job("c", make("c"))]
+    return Scheduler(jobs, log_path=str(tmp_path / "run_log.json"))
+
+
+def test_failed_dependency_skips_dependents(tmp_path):
+    calls = []
+    scheduler = _scheduler(tmp_path, calls, fail={"a"})
+    record = scheduler.run()
+    assert sorted(calls) == ["a", "c"]
+    assert {name: result["status"] for name, result in record["jobs"].items()} == \
+        {"a": "failed", "b": "skipped", "c": "success"}
+    assert sorted(scheduler.failed_jobs()) == ["a", "b"]
+    assert len(read_run_log(scheduler.log_path)) == 1
+
+
+def test_run_rejects_unknown_job_names(tmp_path):
+    calls = []
+    scheduler = _scheduler(tmp_path, calls)
+    with pytest.raises(ValueError, match="widht"):
+        scheduler.run(only=["a", "widht"])
+    assert calls == []
+
+    assert sorted(scheduler.run(only=["c"])["jobs"]) == ["c"]
+
+
+def test_unknown_dependency_and_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        Scheduler([Job("a", lambda limiter=None: 0, deps=["missing"])])
+    with pytest.raises(ValueError):
+        Scheduler([Job("a", lambda limiter=None: 0, deps=["b"]), Job("b", lambda limiter=None: 0, deps=["a"])])
@@ -0,0 +1,71 @@
+import glob
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from dataloader.storage import PartitionedStore
+
+
+def _prices(start, periods, codes=("000001", "000002"), base=10.0):
+    dates = pd.bdate_range(start, periods=periods, name='日期')
+    frames = [pd.DataFrame({'股票代码': code, '收盘': base + np.arange(periods, dtype=float)}, index=dates)
+              for code in codes]
+    return pd.concat(frames)
+
+
+def _part_files(root, dataset):
+    return glob.glob(os.path.join(root, *dataset.split('/'), "*", "part-*.parquet"))
+
+
+def test_append_partitions_by_year_and_dedupes_on_read(tmp_path):
+    store = PartitionedStore(str(tmp_path))
+    first = _prices("2023-12-20", 10)
+    assert store.append("stocks", first, keys=['股票代码']) == 20
+    partitions = sorted(os.listdir(tmp_path / "stocks"))
+    assert partitions == ["_meta.json", "year=2023", "year=2024"]
+
+    # 重叠的日期以最后写入的一行为准
+    second = _prices("2024-01-02", 5, base=100.0)
+    store.append("stocks", second)
+    df = store.read("stocks")
+    assert not df.reset_index().duplicated(['日期', '股票代码']).any()
+    assert len(df) == 2 * len(first.index.union(second.index).unique())
+    latest = df[df['股票代码'] == "000001"].loc["2024-01-02":"2024-01-08", '收盘']
+    assert latest.tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+
+def test_read_filters_columns_dates_and_symbols(tmp_path):
+    store = PartitionedStore(str(tmp_path))
+    store.append("stocks", _prices("2023-06-01", 300, codes=("000001", "000002", "000003")), keys=['股票代码'])
+    df = store.read("stocks", columns=['收盘'], start="2024-01-01", end="2024-02-01",
+                    filters=ds.field('股票代码').isin(["000002"]))
+    assert set(df.columns) == {'股票代码', '收盘'}
+    assert df.index.min() >= pd.Timestamp("2024-01-01") and df.index.max() <= pd.Timestamp("2024-02-01")
+    assert df['股票代码'].unique().tolist() == ["000002"]
+
+
+def test_compact_merges_parts_without_changing_content(tmp_path):
+    store = PartitionedStore(str(tmp_path))
+    for i in range(4):
+        store.append("stocks", _prices("2024-01-02", 20 + i, base=10.0 + i), keys=['股票代码'])
+    before = store.read("stocks")
+    assert len(_part_files(str(tmp_path), "stocks")) == 4
+
+    assert store.compact("stocks") == 1
+    assert len(_part_files(str(tmp_path), "stocks")) == 1
+    pd.testing.assert_frame_equal(store.read("stocks"), before)
+    assert store.compact("stocks") == 0
+
+
+def test_write_table_round_trip_and_drop(tmp_path):
+    store = PartitionedStore(str(tmp_path))
+    table = pd.DataFrame({'指数代码': ["000300", "000300"], '股票代码': ["000001", "000002"]})
+    store.write_table("stock_hist/membership", table)
+    pd.testing.assert_frame_equal(store.read_table("stock_hist/membership"), table)
+    assert store.read_table("missing") is None
+
+    store.append("stocks", _prices("2024-01-02", 3), keys=['股票代码'])
+    assert store.datasets() == ["stocks"]
+    store.drop("stocks")
+    assert not store.exists("stocks") and store.read("stocks").empty
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from dataloader import trade_calendar
+from dataloader.trade_calendar import TradeCalendar, _write_dates
+
+
+def test_bundled_cn_calendar_skips_holidays(tmp_path):
+    calendar = TradeCalendar("cn", cache_dir=str(tmp_path))
+    # 2024 年国庆休市 10 月 1 日至 7 日
+    assert calendar.last_session("2024-10-07") == pd.Timestamp("2024-09-30")
+    assert calendar.is_current("2024-09-30", "2024-10-06")
+    assert not calendar.is_current("2024-09-27", "2024-10-06")
+
+
+def test_us_calendar_follows_nyse_holidays(tmp_path):
+    calendar = TradeCalendar("us", cache_dir=str(tmp_path), bundle_dir=str(tmp_path / "none"))
+    # 2024-07-04 独立日，2024-11-28 感恩节
+    assert calendar.last_session("2024-07-04") == pd.Timestamp("2024-07-03")
+    assert calendar.last_session("2024-11-28") == pd.Timestamp("2024-11-27")
+
+
+def test_cache_takes_precedence_over_bundle(tmp_path):
+    cache_dir = tmp_path / "cache"
+    _write_dates(pd.DatetimeIndex(["2024-01-02", "2024-01-03", "2024-01-05"]), str(cache_dir / "cn_trade_dates.csv"))
+    calendar = TradeCalendar("cn", cache_dir=str(cache_dir))
+    assert calendar.last_session("2024-01-04") == pd.Timestamp("2024-01-03")
+
+
+def test_uncovered_dates_fall_back_to_weekdays(tmp_path):
+    calendar = TradeCalendar("cn", cache_dir=str(tmp_path), bundle_dir=str(tmp_path))
+    assert len(calendar.sessions()) == 0
+    # 周六、周日回退到周五
+    assert calendar.last_session("2024-06-08") == pd.Timestamp("2024-06-07")
+    assert calendar.last_session("2024-06-09") == pd.Timestamp("2024-06-07")
+    assert calendar.last_session("2024-06-10") == pd.Timestamp("2024-06-10")
+
+
+def test_ensure_covers_keeps_calendar_when_refresh_fails(tmp_path, monkeypatch):
+    def offline():
+        raise ConnectionError("没有网络")
+
+    monkeypatch.setattr(trade_calendar, "fetch_cn_sessions", offline)
+    calendar = TradeCalendar("cn", cache_dir=str(tmp_path / "cache"))
+    bundled = len(calendar.sessions())
+    assert calendar.ensure_covers("2099-01-05") is False
+    assert len(calendar.sessions()) == bundled
+    # 日历之外的日期按工作日处理
+    assert calendar.last_session("2099-01-04") == pd.Timestamp("2099-01-02")
+
+
+def test_refresh_offline_restores_the_bundle(tmp_path):
+    calendar = TradeCalendar("cn", cache_dir=str(tmp_path))
+    sessions = calendar.refresh(offline=True)
+    assert (tmp_path / "cn_trade_dates.csv").exists()
+    assert sessions[0] == pd.Timestamp("2000-01-04")
@@ -0,0 +1,84 @@
+from datetime import datetime
+import pytest
+
+from dataloader import stock_store
+from dataloader.synthetic_provider import SyntheticProvider, ThrottledError
+from dataloader.trade_calendar import TradeCalendar
+from dataloader.width_dataloader import fetch_index_all
+
+SYMBOLS = ["000300", "399006"]
+START_DATE = "20240102"
+
+
+def _provider():
+    return SyntheticProvider(start="2024-01-02", n_stocks=40, n_constituents=10)
+
+
+def _fetch(provider, tmp_path, **kwargs):
+    calendar = TradeCalendar("cn", cache_dir=str(tmp_path / "calendar"))
+    end_date = datetime.now().strftime('%Y%m%d')
+    return fetch_index_all(SYMBOLS, START_DATE, end_date, root=str(tmp_path / "store"), provider=provider,
+                           calendar=calendar, rate=None, backoff=0, **kwargs)
+
+
+def test_fetch_index_all_with_synthetic_provider(tmp_path):
+    provider = _provider()
+    rows, skipped = _fetch(provider, tmp_path)
+    root = str(tmp_path / "store")
+
+    members = {symbol: stock_store.index_members(symbol, root) for symbol in SYMBOLS}
+    assert all(len(codes) == 10 for codes in members.values())
+    codes = sorted(set(members["000300"]) | set(members["399006"]))
+    assert rows > 0 and skipped == 0
+    stored = stock_store.read_stocks(codes, root, columns=['收盘'])
+    assert len(stored) == rows
+    assert sorted(stored['股票代码'].unique()) == codes
+    # 合并后每只股票只下载一次
+    assert provider.calls["stock_zh_a_hist"] == len(codes)
+
+    # 第二次运行：所有股票都已是最新，只请求成份关系
+    rows, skipped = _fetch(provider, tmp_path)
+    assert (rows, skipped) == (0, len(codes))
+    assert provider.calls["stock_zh_a_hist"] == len(codes)
+
+
+def test_fetch_index_all_retries_constituent_requests(tmp_path):
+    provider = _provider()
+    index_stock_cons = provider.index_stock_cons
+    attempts = []
+
+    def flaky_cons(symbol):
+        # 每个指数的第一次请求被限流
+        attempts.append(symbol)
+        if attempts.count(symbol) == 1:
+            raise ThrottledError(f"429 Too Many Requests: {symbol}")
+        return index_stock_cons(symbol=symbol)
+
+    provider.index_stock_cons = flaky_cons
+    rows, _ = _fetch(provider, tmp_path, retries=2)
+    assert rows > 0
+    assert attempts == [SYMBOLS[0], SYMBOLS[0], SYMBOLS[1], SYMBOLS[1]]
+
+
+def test_fetch_index_all_fails_after_writing_the_rest(tmp_path):
+    provider = _provider()
+    stock_zh_a_hist = provider.stock_zh_a_hist
+    broken = sorted(provider.index_stock_cons(SYMBOLS[0])['品种代码'])[:2]
+
+    def failing_hist(symbol, **kwargs):
+        if symbol in broken:
+            raise ConnectionError(f"模拟的网络错误: {symbol}")
+        return stock_zh_a_hist(symbol=symbol, **kwargs)
+
+    provider.stock_zh_a_hist = failing_hist
+    with pytest.raises(RuntimeError) as excinfo:
+        _fetch(provider, tmp_path, retries=1)
+    assert all(code in str(excinfo.value) for code in broken)
+
+    # 其余股票已经写入，重跑时只下载失败的两只
+    watermarks = stock_store.read_watermarks(str(tmp_path / "store"))
+    assert not set(broken) & set(watermarks.dropna().index)
+    provider.stock_zh_a_hist = stock_zh_a_hist
+    before = provider.calls["stock_zh_a_hist"]
+    _fetch(provider, tmp_path)
+    assert provider.calls["stock_zh_a_hist"] - before == len(broken)